@@ -1,11 +1,23 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
-import gc
 import os
-import shutil
 from datetime import datetime
+from core.sniff import format_counter
+from core.loaders import LOAD_METHODS, REPLACE_MODES
+from core.pipeline import EXEC_MODES, default_workers, process_uploads
+from core.cache import upload_cache
+from core.archive import discard, file_archiver
+from core import zcanr030
+from core.zcanr030 import process_file as process_zcanr030, to_db_frame, replace_predicate, group_predicate, business_key, amount_cols, summarize, combine_summaries
+from core.summary import dashboard_step
+from core.dedup import KeyIndex, duplicate_note
+from core.migrations import table_spec
+from core.schema import concat_frames, frame_bytes
+from core.metrics import StageLog
+from core.export import export_version
+from core.jobs import upload_jobs
+from core.upload import OVERWRITE, SWAP, APPEND, DELTA, db_url, run_upload
+from ui import show_messages, preview_frame, show_metrics, download_panel, job_panel, pool_panel, dedup_panel, resume_panel
 
 # --- 1. ตั้งค่าหน้าเว็บ & Path ---
 st.set_page_config(page_title="Smart Multi-Group Uploader", layout="wide")
@@ -20,57 +32,7 @@ for folder in [BASE_DIR, ARCHIVE_DIR]:
     if not os.path.exists(folder):
         os.makedirs(folder)
 
-# --- 2. ฟังก์ชัน Smart Read (อ่านไฟล์ได้ทุกรูปแบบโดยไม่ต้องมี Excel ติดตั้ง) ---
-# Mapping dictionary สำหรับแปลงชื่อคอลัมน์จากภาษาไทยเป็นอังกฤษ
-mapping_dict = {
-    'ประเภทธุรกิจ': 'bus_type', 'คลาสบัญชี': 'acc_class', 'ชื่อ กฟฟ.(TRSG)': 'pea_name_trsg',
-    'กฟฟ.(TRSG)': 'pea_code_main','สาย': 'line_code', 'หมายเลขผู้ใช้ไฟฟ้า': 'ca_no',
-    'ชื่อ-สกุล': 'customer_name', 'เลขที่เอกสาร CA': 'ca_doc_no', 'สัญญา': 'contract_no',
-    'คู่ค้าทางธุรกิจ': 'bp_no', 'บิลเดือน': 'bill_month', 'เงินที่ค้างชำระ': 'outstanding_amount',
-    'ค่าภาษีฯ': 'tax_amount', 'ประเภทการชำระเงิน': 'payment_type', 'บัญชีแยกประเภททั่วไป': 'gl_account',
-    'ประเภทอัตรา': 'rate_type', 'วันที่เอกสาร': 'doc_date', 'วันที่ครบกำหนด': 'due_date',
-    'ประเภทเอกสาร': 'doc_type', 'รายการหลัก': 'main_item', 'รายการย่อย': 'sub_item',
-    'ล๊อคการติดตามหนี้': 'dunning_lock', 'เลขที่เอกสารผ่อนชำระ': 'installment_doc_no',
-    'วันครบกำหนดแจ้งเตือน': 'notice_due_date', 'ผลการวางหนังสือแจ้งเตือน': 'notice_result'
-}
-
-def smart_read_file(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    try:
-        if ext == '.xlsx':
-            return pd.read_excel(file_path, engine='openpyxl', header=17)
-        else:
-            # สำหรับ .xls ลองอ่านแบบมาตรฐานก่อน
-            try:
-                return pd.read_excel(file_path, engine='xlrd', header=17)
-            except Exception:
-                # ลองอ่านแบบ UTF-16 TSV (มักเป็นไฟล์ที่ Export จากระบบอื่น)
-                try:
-                    # ค้นหา Header Programmatically (เพราะตำแหน่งอาจเปลี่ยนไปตามการ Export)
-                    df_check = pd.read_csv(file_path, sep='\t', encoding='utf-16', header=None, names=range(100), on_bad_lines='skip', nrows=50)
-                    mask = df_check.apply(lambda r: r.astype(str).str.contains('หมายเลขผู้ใช้ไฟฟ้า').any(), axis=1)
-                    if mask.any():
-                        h_idx = df_check[mask].index[0]
-                        df = pd.read_csv(file_path, sep='\t', encoding='utf-16', header=h_idx, on_bad_lines='skip', low_memory=False)
-                        df.columns = [str(c).strip() for c in df.columns]
-                        return df
-                    else:
-                        return pd.read_csv(file_path, sep='\t', encoding='utf-16', header=17, on_bad_lines='skip')
-                except Exception:
-                    # ถ้าพัง แสดงว่าเป็นไฟล์ .xls ปลอม (โครงสร้างภายในเป็น HTML/XML)
-                    dfs = pd.read_html(file_path)
-                    df = dfs[0]
-                    # ตั้งหัวตารางจากแถวที่ 17 (Index 16)
-                    df.columns = [str(c).strip() for c in df.iloc[16]]
-                    df = df.iloc[17:].reset_index(drop=True)
-                    return df
-    except Exception as e:
-        # ถ้ายังพังอีก ลองอ่านแบบปกติ (CSV/UTF-8)
-        try:
-            return pd.read_csv(file_path, header=17, on_bad_lines='skip')
-        except Exception:
-            st.error(f"❌ ไม่สามารถอ่านไฟล์ {os.path.basename(file_path)}: {e}")
-            return None
+# --- 2. ฟังก์ชัน Smart Read / Clean อยู่ใน core/zcanr030.py (ใช้ร่วมกับ Process Pool ได้) ---
 
 # --- 3. ส่วนการตั้งค่า Database & Group (Sidebar) ---
 st.sidebar.header("🔌 Database Connection")
@@ -106,224 +68,185 @@ year_list = [str(y) for y in range(2024, 2033)]
 
 st.sidebar.divider()
 st.sidebar.header("⚙️ ตั้งค่าการอัปโหลด")
+load_method = st.sidebar.radio(
+    "วิธีนำเข้าข้อมูล MySQL",
+    LOAD_METHODS,
+    index=0,
+    help="INSERT: to_sql แบบเดิม | LOAD DATA: ส่งไฟล์ TSV ชั่วคราวให้ MySQL นำเข้าเอง เร็วกว่ามากสำหรับข้อมูลจำนวนมาก (Server ต้องเปิด local_infile)"
+)
 upload_mode = st.sidebar.radio(
     "โหมดการอัปโหลด",
-    ["ล้างข้อมูลเดิม อัปโหลดใหม่ (Overwrite)", "เพิ่มเติมข้อมูลเดิม (Append)"],
+    ["ล้างข้อมูลเดิม อัปโหลดใหม่ (Overwrite)", "เพิ่มเติมข้อมูลเดิม (Append)", "อัปเดตเฉพาะที่เปลี่ยน (Delta)"],
     index=0,
-    help="Overwrite: ลบข้อมูลเก่าของกลุ่มที่เลือกก่อน | Append: เพิ่มข้อมูลต่อท้ายโดยไม่ลบ"
+    help="Overwrite: ลบข้อมูลเก่าของกลุ่มที่เลือกก่อน | Append: เพิ่มข้อมูลต่อท้ายโดยไม่ลบ | Delta: เทียบ hash ตาม business key แล้วเขียนเฉพาะแถวใหม่/ที่เปลี่ยน"
+)
+
+replace_mode = REPLACE_MODES[0]
+if "Overwrite" in upload_mode:
+    replace_mode = st.sidebar.radio(
+        "วิธีแทนที่ข้อมูลเดิม",
+        REPLACE_MODES,
+        index=0,
+        help="Atomic Swap: นำเข้าลงตาราง staging ก่อน แล้วแทนที่แถวเดิมของขอบเขตนี้ใน transaction เดียว (ทั้งตาราง: RENAME TABLE) Dashboard จะไม่เห็นตารางว่างหรือข้อมูลครึ่งๆ กลางๆ เวลาขึ้นกับขนาดข้อมูลที่แทนที่ ไม่ใช่ทั้งตาราง (ต้องมีสิทธิ์ CREATE / DROP / ALTER)"
+    )
+use_swap = "Overwrite" in upload_mode and replace_mode == REPLACE_MODES[1]
+use_delta = "Delta" in upload_mode
+delete_vanished = False
+if use_delta:
+    delete_vanished = st.sidebar.checkbox(
+        "ลบแถวที่ไม่มีในไฟล์ใหม่",
+        value=False,
+        help="key (" + ", ".join(business_key) + ") ที่มีใน Database แต่ไม่มีในไฟล์ชุดนี้จะถูกลบ (ใช้เมื่ออัปโหลดข้อมูลครบทั้งเขต)"
+    )
+
+drop_duplicates = st.sidebar.checkbox(
+    "ตัดแถวซ้ำข้ามไฟล์",
+    value=True,
+    help="ไฟล์ export ที่ช่วงข้อมูลทับกัน: แถวที่ key (" + ", ".join(business_key) + ") เคยมาจากไฟล์ก่อนหน้าจะไม่ถูกนำเข้าซ้ำ"
+)
+
+full_refresh = st.sidebar.checkbox(
+    "Refresh Dashboard ทั้งตาราง",
+    value=False,
+    help="ปกติ refresh เฉพาะกลุ่ม/บิลเดือนที่อัปโหลด (summary table + Procedure แบบจำกัดขอบเขต) เลือกเมื่อต้องการสรุปใหม่ทั้งหมด"
 )
 
 st.sidebar.warning(f"โหมด: {upload_mode.split(' ')[0]} เฉพาะข้อมูลที่ขึ้นต้นด้วย '{selected_group}'")
 
+read_mode = st.sidebar.radio(
+    "โหมดการอ่านไฟล์",
+    ["ปกติ (อ่านทั้งไฟล์)", "Streaming (อ่านทีละชุด)"],
+    index=0,
+    help="Streaming: อ่านไฟล์ UTF-16 TSV ทีละชุดและทำความสะอาดทันที เหมาะกับไฟล์สิ้นเดือนขนาดใหญ่ (ใช้หน่วยความจำตามขนาดชุด ไม่ใช่ขนาดไฟล์)"
+)
+stream_chunk_rows = 200000
+if "Streaming" in read_mode:
+    stream_chunk_rows = st.sidebar.number_input("จำนวนแถวต่อชุด", min_value=10000, max_value=2000000, value=200000, step=50000)
+
+exec_mode = st.sidebar.radio(
+    "การประมวลผลไฟล์",
+    EXEC_MODES,
+    index=0,
+    help="ขนาน: อ่านและทำความสะอาดหลายไฟล์พร้อมกันด้วย Process Pool (เหมาะกับการอัปโหลด 10-20 ไฟล์)"
+)
+exec_workers = default_workers()
+if exec_mode == EXEC_MODES[1]:
+    exec_workers = st.sidebar.number_input("จำนวน Worker", min_value=1, max_value=32, value=default_workers(), step=1)
+
+resumable = st.sidebar.checkbox("บันทึก checkpoint ระหว่างนำเข้า", value=True,
+                                help="เก็บข้อมูลที่ clean แล้วไว้ในเครื่องและบันทึกจุดที่ commit ทุกชุด การเชื่อมต่อหลุดแล้วทำต่อได้โดยไม่ลบ/อ่านไฟล์ใหม่")
+keep_archive = st.sidebar.checkbox("เก็บไฟล์ต้นฉบับใน Completed_Archive", value=True,
+                                   help="เขียนไฟล์ด้วย thread เบื้องหลังหลังอ่านเสร็จ ไม่ทำให้การประมวลผลช้าลง")
+
 # --- 4. ส่วนการ Upload และประมวลผล ---
 uploaded_files = st.file_uploader("เลือกไฟล์ Excel (xls/xlsx) : ZBLR030", type=["xlsx", "xls"], accept_multiple_files=True)
 
 df_final = pd.DataFrame()
+df_summary = None  # ยอดรวมต่อ กฟฟ./บิลเดือน/ประเภทธุรกิจ ที่สรุปไว้ตอน clean
+metrics = StageLog("ZCANR030")  # เวลา/หน่วยความจำของรอบนี้ (แสดงท้ายหน้า)
+fresh_files = 0
+dataset_keys = []  # cache key ของไฟล์ที่รวมใน df_final (ใช้เป็น version ของไฟล์ดาวน์โหลด)
 
 if uploaded_files:
     all_dataframes = []
-    session_filenames = []  # เก็บรายชื่อไฟล์ที่ประมวลผลสำเร็จในรอบนี้
-
-    with st.spinner('⏳ กำลังประมวลผลไฟล์...'):
-        for uploaded_file in uploaded_files:
-            # กรองไฟล์ชั่วคราว ~$ ออก
-            if uploaded_file.name.startswith("~$"):
+    all_summaries = []
+    archived_paths = []  # ไฟล์ต้นฉบับใน Archive ของรอบนี้
+    dedup = KeyIndex(business_key)  # hash ของ key จากไฟล์ที่รวมแล้ว (ทีละไฟล์ ไม่ต้องรวม DataFrame ก่อน)
+
+    with st.spinner('⏳ กำลังประมวลผลไฟล์...'), metrics.stage('process_files') as stage_files:
+        # อ่านจากหน่วยความจำโดยตรง ไฟล์ที่เคยประมวลผลแล้ว (เนื้อหาและตัวเลือกเดิม) ใช้ผลจาก cache
+        uploads = [(f.name, f.getvalue()) for f in uploaded_files if not f.name.startswith("~$")]
+        results = process_uploads(process_zcanr030, uploads, {"selected_group": selected_group, "streaming": "Streaming" in read_mode, "chunk_rows": int(stream_chunk_rows)}, report="ZCANR030", cache=upload_cache,
+                                  parallel=(exec_mode == EXEC_MODES[1]), max_workers=int(exec_workers))
+        for res, source, from_cache, key in results:
+            show_messages(res.messages)
+            if res.status == 'done':
+                # ไฟล์ที่ใช้ผลจาก cache ก็ถูกเก็บใน Archive ไว้ตั้งแต่รอบก่อน (ปุ่มส่งเข้า MySQL rerun แล้วทุกไฟล์เป็น cache hit)
+                archived_paths.append(os.path.join(ARCHIVE_DIR, res.name))
+            if res.df is not None:
+                df_file, n_dup = dedup.take(res.df, res.name) if drop_duplicates else (res.df, 0)
+                if n_dup:
+                    show_messages([duplicate_note(res.name, n_dup)])
+                all_dataframes.append(df_file)
+                # ไฟล์ที่ตัดแถวซ้ำ สรุปใหม่จากแถวที่เหลือ
+                all_summaries.append(summarize(df_file) if n_dup else res.summary)
+                dataset_keys.append(key)
+            if from_cache:
+                st.caption(f"⚡ {res.name}: ใช้ผลจาก cache (ไฟล์ไม่เปลี่ยนแปลง)")
+                metrics.add('cache_hit', 0.0, len(res.df) if res.df is not None else 0, res.name)
                 continue
-
-            temp_path = os.path.join(BASE_DIR, uploaded_file.name)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # อ่านไฟล์ด้วย Smart Read
-            df_temp = smart_read_file(temp_path)
-            
-            if df_temp is not None:
-                len_raw = len(df_temp)
-                
-                # 1. Clean columns and rename
-                df_temp.columns = [str(c).strip() for c in df_temp.columns]
-                df_temp = df_temp.rename(columns=mapping_dict)
-                
-                # 2. Ensure all expected columns exist (even if empty)
-                for eng_col in mapping_dict.values():
-                    if eng_col not in df_temp.columns:
-                        df_temp[eng_col] = np.nan
-                
-                # 3. Select and order columns
-                ordered_cols = list(dict.fromkeys(mapping_dict.values()))
-                df_temp = df_temp[ordered_cols].copy()
-
-                # 4. Clean text and convert empty to NaN
-                for col in df_temp.select_dtypes(include=['object']).columns:
-                    df_temp[col] = df_temp[col].fillna("").astype(str).str.strip().replace(['', 'nan', 'NaN', 'None'], np.nan)
-
-                # 5. Filter group and group cleaning
-                if 'pea_code_main' in df_temp.columns:
-                    mask_group = df_temp['pea_code_main'].astype(str).str.startswith(selected_group, na=False)
-                    df_temp = df_temp[mask_group].copy()
-                
-                len_group = len(df_temp)
-
-                # 6. Filter out headers and empty rows
-                if 'ca_no' in df_temp.columns:
-                    header_labels = ['หมายเลขผู้ใช้ไฟฟ้า', 'ca_no', 'เลขที่เอกสาร CA', 'สัญญา']
-                    df_temp = df_temp[~df_temp['ca_no'].astype(str).isin(header_labels)]
-                    # Ensure ca_no has digits
-                    df_temp = df_temp[df_temp['ca_no'].astype(str).str.contains(r'\d', na=False)]
-
-                # Drop purely NaN rows
-                df_temp = df_temp.dropna(how='all')
-
-                if not df_temp.empty:
-                    len_clean = len(df_temp)
-
-                    # Manage numbers
-                    for col in ['outstanding_amount', 'tax_amount']:
-                        if col in df_temp.columns:
-                            df_temp[col] = df_temp[col].astype(str).str.replace(',', '').pipe(pd.to_numeric, errors='coerce').fillna(0.00)
-
-                    # Manage bill_month
-                    if 'bill_month' in df_temp.columns:
-                        df_temp = df_temp[df_temp['bill_month'].notna()]
-                        df_temp['bill_month'] = df_temp['bill_month'].astype(str).apply(
-                            lambda x: f"{x.split('/')[1]}-{x.split('/')[0].zfill(2)}-01" if '/' in x else x
-                        )
-                        df_temp = df_temp[df_temp['bill_month'].str.match(r'\d{4}-\d{2}-\d{2}', na=False)]
-
-                    if not df_temp.empty:
-                        all_dataframes.append(df_temp)
-                        total_out = df_temp['outstanding_amount'].sum() if 'outstanding_amount' in df_temp.columns else 0
-                        st.write(f"📊 **{uploaded_file.name}**: อ่านได้ {len_raw:,} แถว | กลุ่ม {selected_group} {len_group:,} แถว | Cleaned {len(df_temp):,} แถว | ยอดรวม: {total_out:,.2f}")
-                    else:
-                        st.warning(f"⚠️ ไฟล์ {uploaded_file.name}: ไม่มีข้อมูลที่ถูกต้องหลังจากทำความสะอาด")
-                else:
-                    st.warning(f"⚠️ ไฟล์ {uploaded_file.name}: ไม่มีข้อมูลกลุ่ม '{selected_group}' หรือแถวว่าง (อ่านได้ {len_raw:,} แถว)")
-                
-                # ย้ายไป Archive และลบไฟล์ชั่วคราว
-                shutil.move(temp_path, os.path.join(ARCHIVE_DIR, uploaded_file.name))
-                session_filenames.append(uploaded_file.name)
+            fresh_files += 1
+            metrics.extend(res.stages)
+            if res.status == 'done' and keep_archive:
+                # เก็บไฟล์ต้นฉบับใน Archive ด้วย thread เบื้องหลัง (ไม่รอเขียนไฟล์)
+                file_archiver.submit(source, ARCHIVE_DIR)
+            elif res.status == 'read_error':
+                # ไฟล์ที่อ่านไม่ได้คงไว้ในโฟลเดอร์ convert ให้ตรวจสอบเหมือนเดิม
+                file_archiver.submit(source, BASE_DIR)
+            else:
+                discard(source)
+        stage_files['rows'] = sum(len(df) for df in all_dataframes)
+
+    dedup_panel(dedup)
+    if format_counter:
+        st.caption("🔎 เส้นทางการอ่านไฟล์ (สะสม): " + " | ".join(f"{k} {v:,} ไฟล์" for k, v in format_counter.most_common()))
+    cache_stats = upload_cache.stats()
+    st.caption(f"🗃️ Cache: hit {cache_stats['hits']:,} (disk {cache_stats['disk_hits']:,}) | miss {cache_stats['misses']:,} | "
+               f"evict {cache_stats['evictions']:,} | ในหน่วยความจำ {cache_stats['entries']:,} ไฟล์ ({cache_stats['mem_bytes'] / 1024**2:,.1f} MB)")
+    for path, err in file_archiver.take_errors():
+        st.warning(f"⚠️ เก็บไฟล์ {os.path.basename(path)} ไม่สำเร็จ: {err}")
 
     if all_dataframes:
-        df_final = pd.concat(all_dataframes, ignore_index=True)
+        with metrics.stage('concat', rows=sum(len(df) for df in all_dataframes)):
+            df_final = concat_frames(all_dataframes)
+            df_summary = combine_summaries(all_summaries)
+        st.caption(f"🧮 หน่วยความจำข้อมูลรวม: {frame_bytes(df_final) / 1024**2:,.1f} MB")
         st.divider()
         st.subheader(f"📊 ตัวอย่างข้อมูลรวมกลุ่ม {selected_group} ({len(df_final):,} แถว)")
-        st.dataframe(df_final.head(10).fillna("Null"))
+        st.dataframe(preview_frame(df_final))
 
 # --- 5. ส่วนส่งข้อมูลเข้า MySQL & Download ---
 if not df_final.empty:
     col1, col2 = st.columns(2)
     
     with col1:
-        # ปุ่ม Download CSV
-        csv = df_final.to_csv(index=False).encode('utf-8-sig')
-        st.download_button(
-            label="📥 ดาวน์โหลดข้อมูล Cleaned (CSV)",
-            data=csv,
-            file_name=f"cleaned_data_group_{selected_group}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+        # ปุ่ม Download (สร้างไฟล์เมื่อกดเท่านั้น, CSV / gzip / zstd / Parquet) version รวมการตัดแถวซ้ำ (key ที่ใช้ตัด)
+        download_panel(df_final, export_version("ZCANR030", dataset_keys, drop_duplicates, business_key), f"cleaned_data_group_{selected_group}", to_db_frame, metrics)
 
     with col2:
-        # ปุ่มส่งเข้า MySQL
+        # ปุ่มส่งเข้า MySQL: ส่งเป็นงานเบื้องหลัง ทำต่อแม้ rerun / ปิดแท็บ (ดูสถานะที่ส่วนงานอัปโหลดด้านล่าง)
         if st.button(f"📤 ส่งข้อมูลกลุ่ม {selected_group} เข้า MySQL", type="primary", use_container_width=True):
-            try:
-                conn_str = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
-                engine = create_engine(conn_str, pool_pre_ping=True)
-                
-                # ใช้ engine.connect() แทน begin() เพื่อให้จัดการ commit แยกชุดได้
-                with engine.connect() as conn:
-                    # 🚩 จัดการข้อมูลเก่าตามโหมดที่เลือก
-                    if "Overwrite" in upload_mode:
-                        if upload_scope == "อัพโหลดเฉพาะ E":
-                            st.warning(f"🗑️ กำลังล้างข้อมูลทั้งหมดในตาราง {table_name} (TRUNCATE)...")
-                            conn.execute(text(f"TRUNCATE TABLE {table_name}"))
-                            conn.commit()
-                            status_del = st.empty()
-                            status_del.write(f"✅ ล้างข้อมูลทั้งหมดในตาราง {table_name} เรียบร้อยแล้ว")
-                        else:
-                            st.warning(f"🗑️ กำลังล้างข้อมูลเก่าของกลุ่ม {selected_group}...")
-                            
-                            # นับจำนวนแถวที่จะลบก่อนเพื่อให้แสดง % ได้
-                            count_query = text(f"SELECT COUNT(*) FROM {table_name} WHERE pea_code_main LIKE :pattern")
-                            total_to_delete = conn.execute(count_query, {"pattern": f"{selected_group}%"}).scalar()
-                            
-                            progress_del = st.progress(0)
-                            status_del = st.empty()
-                            
-                            total_deleted = 0
-                            if total_to_delete > 0:
-                                while True:
-                                    # ลบบันทึกทีละชุด (50,000 แถว) เพื่อป้องกัน Timeout/Lock
-                                    delete_query = text(f"DELETE FROM {table_name} WHERE pea_code_main LIKE :pattern LIMIT 50000")
-                                    result = conn.execute(delete_query, {"pattern": f"{selected_group}%"})
-                                    conn.commit()  # ทำการ commit ทันทีในแต่ละชุด
-                                    
-                                    rows_deleted = result.rowcount
-                                    total_deleted += rows_deleted
-                                    
-                                    percent = min(total_deleted / total_to_delete, 1.0)
-                                    progress_del.progress(percent)
-                                    status_del.write(f"✅ ลบข้อมูลแล้ว: {total_deleted:,} / {total_to_delete:,} แถว ({percent*100:.1f}%)")
-                                    
-                                    if rows_deleted == 0:
-                                        break
-                            else:
-                                progress_del.progress(1.0)
-                                status_del.write("✅ ไม่พบข้อมูลเก่าที่ต้องลบ")
-                    else:
-                        st.info(f"⏭️ โหมด Append: ข้ามขั้นตอนการลบข้อมูลเก่าของกลุ่ม {selected_group}")
-
-                    # ⏳ นำเข้าข้อมูลใหม่แบบ Append (แบ่งชุดการอัปเดต UI แต่ใช้ chunk 1000 ข้างใน)
-                    st.info(f"⏳ กำลังนำเข้าข้อมูลใหม่ {len(df_final):,} แถว...")
-                    total_rows = len(df_final)
-                    ui_batch_size = 20000 # อัปเดตหน้าจอทุก 20,000 แถว
-                    progress_up = st.progress(0)
-                    status_up = st.empty()
-                    
-                    for start_idx in range(0, total_rows, ui_batch_size):
-                        end_idx = min(start_idx + ui_batch_size, total_rows)
-                        chunk = df_final.iloc[start_idx:end_idx]
-                        
-                        # ยังคงใช้ chunksize=1000 เพื่อความปลอดภัยของ Server ตามเดิม
-                        chunk.to_sql(table_name, con=engine, if_exists='append', index=False, chunksize=1000, method='multi')
-                        
-                        percent = min(end_idx / total_rows, 1.0)
-                        progress_up.progress(percent)
-                        status_up.write(f"🚀 อัปโหลดแล้ว: {end_idx:,} / {total_rows:,} แถว ({percent*100:.1f}%)")
-                
-                # รัน Procedures
-                st.info("⚙️ กำลังประมวลผล Stored Procedures...")
-                
-                with engine.begin() as conn:
-                    # Procedure 1
-                    conn.execute(text("CALL sp_refresh_dashboard_master();"))
-                    
-                    # Procedure 2
-                    #conn.execute(text("CALL sp_update_kpi_debt_reduction(:period)"), {"period": period_param})
-                    
-                st.success("✅ ดำเนินการอัปเดต Procedures เสร็จเรียบร้อย")
-                
+            # เขต E อย่างเดียวเดิมใช้ TRUNCATE จึงแทนที่ทั้งตาราง, เลือกเขตแทนที่เฉพาะแถวของกลุ่ม
+            replace_where, replace_params = replace_predicate(selected_group, whole_table=(upload_scope == "อัพโหลดเฉพาะ E"))
+            if use_delta:
+                # Delta เทียบ/ลบเฉพาะแถวของกลุ่มที่เลือกเสมอ (ไม่ใช่ทั้งตารางแบบ TRUNCATE)
+                replace_where, replace_params = group_predicate(selected_group)
+            count_where, count_params = group_predicate(selected_group)
+            mode = SWAP if use_swap else OVERWRITE if "Overwrite" in upload_mode else DELTA if use_delta else APPEND
+            job = upload_jobs.submit(
+                f"กลุ่ม {selected_group} → {table_name} ({len(df_final):,} แถว, {upload_mode.split(' ')[0]})",
+                run_upload, df_final, db_url(db_user, db_pass, db_host, db_name), table_name, load_method, mode,
+                report="ZCANR030", to_db=to_db_frame, replace_where=replace_where, replace_params=replace_params,
+                # ลบบันทึกทีละชุด (50,000 แถว) commit ทุกชุด เพื่อป้องกัน Timeout/Lock
+                delete_batch=50000, business_key=business_key, amount_cols=amount_cols, delete_vanished=delete_vanished,
+                # อัปเดต summary table แล้ว refresh Dashboard เฉพาะกลุ่ม/บิลเดือนที่อัปโหลด
+                procedures=[dashboard_step(df_summary, selected_group, mode, table_name, replace_where, replace_params,
+                                           delete_vanished=delete_vanished, full_refresh=full_refresh)],
                 # ตรวจสอบจำนวนแถวใน DB จริงอีกครั้งเพื่อความมั่นใจ
-                with engine.connect() as conn:
-                    verify_query = text(f"SELECT COUNT(*) FROM {table_name} WHERE pea_code_main LIKE :pattern")
-                    db_count = conn.execute(verify_query, {"pattern": f"{selected_group}%"}).scalar()
-
-                st.balloons()
-                st.success(f"🚀 อัปโหลดกลุ่ม {selected_group} สำเร็จ! (ข้อมูลชุดนี้: {len(df_final):,} แถว | ยอดรวมใน Database: {db_count:,} แถว)")
-                
-                # --- 🚩 ลบไฟล์ใน Archive อัตโนมัติหลังอัปโหลดสำเร็จ ---
-                if session_filenames:
-                    st.info("🗑️ กำลังลบไฟล์ต้นฉบับออกจาก Archive เพื่อประหยัดพื้นที่...")
-                    for fname in session_filenames:
-                        fpath = os.path.join(ARCHIVE_DIR, fname)
-                        if os.path.exists(fpath):
-                            os.remove(fpath)
-                    st.success("✅ ลบไฟล์ต้นฉบับเรียบร้อยแล้ว")
-                
-                del df_final
-                gc.collect()
-
-            except Exception as e:
-                st.error(f"❌ Database Error: {e}")
-                if 'engine' in locals(): engine.dispose()
\ No newline at end of file
+                verify=(f"SELECT COUNT(*) FROM {table_name} WHERE {count_where}", count_params),
+                # ตารางปลายทางเป็น DATE + pea_group + index (สร้าง/ปรับโครงสร้างครั้งแรกที่อัปโหลด)
+                schema=table_spec(zcanr030),
+                # ลบไฟล์ใน Archive อัตโนมัติหลังอัปโหลดสำเร็จ
+                cleanup_paths=archived_paths,
+                # เก็บข้อมูล + checkpoint ทุกชุด ล้มเหลวแล้วทำต่อได้จากส่วนงานค้าง
+                resumable=resumable,
+            )
+            st.success(f"📨 ส่งงาน `{job.id}` เข้าคิวแล้ว ปิดแท็บหรือทำงานอื่นต่อได้ งานยังทำต่อเบื้องหลัง")
+
+# --- 6. งานอัปโหลดเบื้องหลัง (สถานะ / ยกเลิก / ประวัติ) ---
+job_panel(upload_jobs, "ZCANR030")
+resume_panel(upload_jobs, "ZCANR030", db_url(db_user, db_pass, db_host, db_name))
+
+# --- 7. Metrics (เวลา / หน่วยความจำ / connection pool) ---
+show_metrics(metrics, persist=fresh_files > 0)
+pool_panel()
@@ -0,0 +1,225 @@
+"""วัดความเร็ว/หน่วยความจำของการอ่าน + clean ทั้งสามรายงาน ด้วยไฟล์จำลองทุกรูปแบบที่ reader รองรับ
+
+ตัวอย่าง:
+    python bench.py generate zcanr030 --variants utf16_tsv html --sizes 100k --out D:\\bench
+    python bench.py run --sizes 10k,100k,1m --label before-arrow
+    python bench.py run --reports zcakr005 --variants xlsx --sizes 500k --repeat 3 --label after-arrow
+    python bench.py compare                # เทียบสองรอบล่าสุด
+    python bench.py compare RUN_A RUN_B
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from core import synth, zcakr005, zcanr030, zwmr019
+from core.metrics import METRICS_FILE, peak_mb, rss_mb, sample_peak
+
+DEFAULT_OUT = os.path.join(tempfile.gettempdir(), "dept_bench")
+RESULTS_FILE = os.environ.get("DEPT_BENCH_FILE", os.path.join(os.path.dirname(METRICS_FILE), "bench_results.jsonl"))
+MODULES = {'zcanr030': zcanr030, 'zcakr005': zcakr005, 'zwmr019': zwmr019}
+
+
+def log_line(msg):
+    print(f"[{datetime.now():%H:%M:%S}] {msg}", flush=True)
+
+
+def parse_size(text):
+    # 10k / 1.5m / 5M / 20000
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def parse_sizes(text):
+    return [parse_size(s) for s in text.split(",") if s.strip()]
+
+
+def file_params(report, args):
+    if report == 'zcanr030':
+        return {"selected_group": args.group, "streaming": args.streaming, "chunk_rows": args.chunk_rows}
+    if report == 'zwmr019':
+        return {"activity_type": "ต่อกลับ"}
+    return {}
+
+
+def ensure_file(report, variant, rows, args):
+    # ใช้ไฟล์เดิมถ้าเคยสร้างแล้ว (ชื่อไฟล์บอก report / รูปแบบ / จำนวนแถว / seed)
+    path = synth.synth_path(args.out, report, variant, rows, args.seed)
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        synth.write_report(report, variant, rows, path, seed=args.seed, header_every=args.header_every)
+        log_line(f"สร้าง {os.path.basename(path)} ({os.path.getsize(path) / 1024**2:,.1f} MB) {time.perf_counter() - start:,.1f} วินาที")
+    return path
+
+
+def bench_case(report, path, params):
+    """รันใน process ใหม่ทุกครั้ง peak memory จึงเป็นของกรณีนี้เท่านั้น"""
+    module = MODULES[report]
+    start = time.perf_counter()
+    res = module.process_file(path, **params)
+    stages = list(res.stages or [])
+    if res.df is not None:
+        t = time.perf_counter()
+        with sample_peak() as mem:
+            db = module.to_db_frame(res.df)
+        seconds = time.perf_counter() - t
+        stages.append({"stage": "to_db", "seconds": seconds, "rows": len(db), "rows_per_s": len(db) / seconds if seconds else None,
+                       "peak_mb": mem["peak_mb"]})
+        del db
+    return {
+        "kind": res.kind, "status": res.status, "rows_out": len(res.df) if res.df is not None else 0,
+        "seconds": time.perf_counter() - start, "rss_mb": rss_mb(), "peak_mb": peak_mb(), "stages": stages,
+    }
+
+
+def _run_isolated(report, path, params):
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(bench_case, report, path, params).result()
+
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def cmd_generate(args):
+    for variant in args.variants:
+        for rows in args.sizes:
+            try:
+                log_line(ensure_file(args.report, variant, rows, args))
+            except ValueError as e:
+                log_line(f"ข้าม {variant} {rows:,} แถว: {e}")
+    return 0
+
+
+def cmd_run(args):
+    run_id = uuid.uuid4().hex[:12]
+    ts = datetime.now().isoformat(timespec='seconds')
+    records = []
+    log_line(f"run {run_id} ({args.label or 'ไม่มี label'})")
+    for report in args.reports:
+        for variant in args.variants:
+            for rows in args.sizes:
+                try:
+                    path = ensure_file(report, variant, rows, args)
+                except ValueError as e:
+                    log_line(f"ข้าม {report} {variant} {rows:,} แถว: {e}")
+                    continue
+                case = {"run_id": run_id, "ts": ts, "label": args.label, "report": report, "variant": variant,
+                        "rows": rows, "file_mb": round(os.path.getsize(path) / 1024**2, 2), "streaming": args.streaming}
+                for repeat in range(args.repeat):
+                    out = _run_isolated(report, path, file_params(report, args))
+                    base = {**case, "repeat": repeat, "status": out["status"], "rows_out": out["rows_out"]}
+                    for s in out["stages"]:
+                        records.append({**base, "stage": s["stage"], "seconds": s["seconds"], "rows_per_s": s.get("rows_per_s"), "peak_mb": s.get("peak_mb")})
+                    records.append({**base, "stage": "total", "seconds": out["seconds"], "rows_per_s": rows / out["seconds"],
+                                    "peak_mb": out["peak_mb"]})
+                    log_line(f"{report:<9} {variant:<11} {rows:>9,} แถว  {out['seconds']:>8.2f} วินาที  "
+                             f"{rows / out['seconds']:>12,.0f} แถว/วินาที  peak {_fmt(out['peak_mb'], ',.0f')} MB  ({out['status']}, {out['rows_out']:,} แถว)")
+    if not records:
+        return 1
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    print_stages(records)
+    log_line(f"บันทึกผลใน {RESULTS_FILE} (run_id {run_id})")
+    return 0
+
+
+def load_results():
+    if not os.path.exists(RESULTS_FILE):
+        return []
+    with open(RESULTS_FILE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def best_of(records):
+    # เวลาดีที่สุดของแต่ละ (report, รูปแบบ, จำนวนแถว, ขั้นตอน) จากหลายรอบ repeat
+    best = {}
+    for r in records:
+        key = (r["report"], r["variant"], r["rows"], r["stage"])
+        if key not in best or r["seconds"] < best[key]["seconds"]:
+            best[key] = r
+    return best
+
+
+def print_stages(records):
+    print(f"\n{'report':<9} {'variant':<11} {'rows':>9} {'stage':<14} {'seconds':>9} {'rows/s':>12} {'peak MB':>8}")
+    for (report, variant, rows, stage), r in sorted(best_of(records).items()):
+        print(f"{report:<9} {variant:<11} {rows:>9,} {stage:<14} {r['seconds']:>9.3f} {_fmt(r['rows_per_s'], ',.0f'):>12} {_fmt(r['peak_mb'], ',.0f'):>8}")
+
+
+def cmd_compare(args):
+    results = load_results()
+    run_ids = list(dict.fromkeys(r["run_id"] for r in results))
+    if args.runs:
+        base_id, new_id = args.runs
+    elif len(run_ids) >= 2:
+        base_id, new_id = run_ids[-2:]
+    else:
+        log_line("ต้องมีผลอย่างน้อยสองรอบ (python bench.py run)")
+        return 1
+    base = best_of([r for r in results if r["run_id"] == base_id])
+    new = best_of([r for r in results if r["run_id"] == new_id])
+    labels = {r["run_id"]: r.get("label") or r["run_id"] for r in results}
+    print(f"base: {labels.get(base_id, base_id)}  →  new: {labels.get(new_id, new_id)}\n")
+    print(f"{'report':<9} {'variant':<11} {'rows':>9} {'stage':<14} {'base s':>9} {'new s':>9} {'speedup':>8} {'peak MB':>15}")
+    for key in sorted(set(base) & set(new)):
+        b, n = base[key], new[key]
+        speedup = b["seconds"] / n["seconds"] if n["seconds"] else None
+        peak = f"{_fmt(b.get('peak_mb'), ',.0f')} → {_fmt(n.get('peak_mb'), ',.0f')}"
+        print(f"{key[0]:<9} {key[1]:<11} {key[2]:>9,} {key[3]:<14} {b['seconds']:>9.3f} {n['seconds']:>9.3f} {_fmt(speedup, '.2f'):>7}x {peak:>15}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark การอ่าน/clean ไฟล์ SAP ด้วยไฟล์จำลอง")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    files = argparse.ArgumentParser(add_help=False)
+    files.add_argument("--variants", nargs="+", choices=list(synth.VARIANTS), default=synth.available_variants())
+    files.add_argument("--sizes", type=parse_sizes, default=parse_sizes("10k,100k"), help="เช่น 10k,100k,1m,5m")
+    files.add_argument("--out", default=DEFAULT_OUT, help="โฟลเดอร์เก็บไฟล์จำลอง (สร้างครั้งเดียวแล้วใช้ซ้ำ)")
+    files.add_argument("--seed", type=int, default=0)
+    files.add_argument("--header-every", type=int, default=synth.HEADER_EVERY, help="หัวตารางซ้ำทุกกี่แถว (0 = ไม่ซ้ำ)")
+
+    gen = sub.add_parser("generate", parents=[files], help="สร้างไฟล์จำลองอย่างเดียว")
+    gen.add_argument("report", choices=sorted(MODULES))
+    gen.set_defaults(func=cmd_generate)
+
+    run = sub.add_parser("run", parents=[files], help="วัดเวลา/หน่วยความจำแล้วบันทึกผล")
+    run.add_argument("--reports", nargs="+", choices=sorted(MODULES), default=sorted(MODULES))
+    run.add_argument("--repeat", type=int, default=1, help="รันซ้ำกี่รอบต่อกรณี (สรุปใช้รอบที่เร็วที่สุด)")
+    run.add_argument("--label", help="ชื่อรอบนี้ เช่น ชื่อ branch / การเปลี่ยนแปลงที่ทดสอบ")
+    run.add_argument("--group", choices=["D", "E", "F"], default="E", help="ZCANR030: เขตที่กรอง")
+    run.add_argument("--streaming", action="store_true", help="ZCANR030: อ่านไฟล์ข้อความทีละชุด")
+    run.add_argument("--chunk-rows", type=int, default=200000)
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="เทียบผลสองรอบ (ค่าเริ่มต้น: สองรอบล่าสุด)")
+    cmp_.add_argument("runs", nargs="*", help="run_id ของรอบฐานและรอบใหม่")
+    cmp_.set_defaults(func=cmd_compare)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "compare" and args.runs and len(args.runs) != 2:
+        parser.error("ระบุ run_id สองค่า หรือไม่ระบุเลย")
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# Shared reading / cleaning logic used by app.py and the pages/ scripts.
+# ห้าม import streamlit ในแพ็กเกจนี้ เพื่อให้เรียกใช้นอกหน้าเว็บได้
@@ -0,0 +1,80 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from core.source import MemoryFile, source_name
+
+
+class Archiver:
+    """เก็บไฟล์ต้นฉบับลงโฟลเดอร์ Archive ด้วย thread เบื้องหลัง (ไม่อยู่บนเส้นทางอ่าน/clean)
+
+    MemoryFile เขียนเป็นไฟล์ใหม่, spill file (path) ย้ายเข้าไปเลยไม่ต้องเขียนซ้ำ
+    """
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self._pending = {}  # target path -> Future
+        self._lock = threading.Lock()
+        self._errors = []
+
+    def submit(self, source, target_dir):
+        target = os.path.join(target_dir, source_name(source))
+        fut = self._pool.submit(self._store, source, target)
+        with self._lock:
+            self._pending[target] = fut
+        fut.add_done_callback(lambda f: self._done(target, f))
+        return target
+
+    @staticmethod
+    def _store(source, target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if isinstance(source, MemoryFile):
+            # เขียนไฟล์ .part แล้วเปลี่ยนชื่อ ไฟล์ที่เขียนไม่เสร็จจึงไม่ถูกนำเข้าซ้ำโดย ingest.py watch
+            with open(target + ".part", "wb") as f:
+                f.write(source.data)
+            os.replace(target + ".part", target)
+        else:
+            shutil.move(source, target)
+            discard(source)
+
+    def _done(self, target, fut):
+        with self._lock:
+            if self._pending.get(target) is fut:
+                del self._pending[target]
+            if fut.exception() is not None:
+                self._errors.append((target, fut.exception()))
+
+    def pending(self, target_dir=None):
+        with self._lock:
+            return [p for p in self._pending if target_dir is None or os.path.dirname(p) == target_dir]
+
+    def wait(self, timeout=None):
+        # รอไฟล์ที่ยังเขียนไม่เสร็จ (เช่นก่อนลบไฟล์ใน Archive หลังอัปโหลดเข้า Database)
+        with self._lock:
+            futures = list(self._pending.values())
+        wait(futures, timeout=timeout)
+
+    def take_errors(self):
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+
+def discard(source):
+    # ทิ้ง source ที่ไม่เก็บ: MemoryFile ไม่ต้องทำอะไร, spill file ลบไฟล์และโฟลเดอร์ชั่วคราวของมัน
+    if source is None or isinstance(source, MemoryFile):
+        return
+    try:
+        if os.path.exists(source):
+            os.remove(source)
+        # โฟลเดอร์ชั่วคราวของ upload_source (rmdir ลบได้เฉพาะโฟลเดอร์ว่าง)
+        folder = os.path.dirname(source)
+        if os.path.basename(folder).startswith("upload_"):
+            os.rmdir(folder)
+    except OSError:
+        pass
+
+
+# archiver ระดับ process ใช้ร่วมกันทุกหน้า (เขียนทีละไฟล์ตามลำดับที่ส่งเข้ามา)
+file_archiver = Archiver()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from core.pipeline import pack_frame, unpack_frame
+from core.schema import frame_bytes
+from core.source import make_private_dir, user_dir
+
+DEFAULT_MAX_MEM_BYTES = 1024 * 1024 * 1024      # 1 GB
+DEFAULT_MAX_DISK_BYTES = 4 * 1024 * 1024 * 1024  # 4 GB
+DEFAULT_DISK_DIR = user_dir("upload_cache")
+
+
+def _code_version():
+    # hash ของซอร์สใน core/ ทั้งหมด: แก้ขั้นตอนอ่าน/clean เมื่อไหร่ ผลใน cache รุ่นเก่า (รวมบนดิสก์) ใช้ไม่ได้ทันที
+    core_dir = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.blake2b(digest_size=8)
+    for name in sorted(os.listdir(core_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(core_dir, name), "rb") as f:
+                h.update(name.encode('utf-8') + b"\0" + f.read())
+    return h.hexdigest()
+
+
+CACHE_VERSION = _code_version()
+
+
+def content_hash(buffer):
+    # hash เนื้อไฟล์ทั้งไฟล์ (รับ bytes / memoryview ได้โดยไม่ copy)
+    return hashlib.blake2b(buffer, digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """LRU cache ของผล process_file (FileResult) แยกตาม hash ไฟล์ + พารามิเตอร์ที่มีผลต่อการ clean
+
+    เก็บในหน่วยความจำ และเขียนลงดิสก์ (Arrow/pickle) ไปพร้อมกัน ทั้งสองชั้นจำกัดขนาดและไล่ออกแบบ LRU
+    """
+
+    def __init__(self, max_mem_bytes=DEFAULT_MAX_MEM_BYTES, disk_dir=DEFAULT_DISK_DIR, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_mem_bytes = max_mem_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._mem = OrderedDict()  # key -> (FileResult, nbytes)
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir and not make_private_dir(disk_dir):
+            self.disk_dir = None  # โฟลเดอร์ของผู้ใช้อื่น ใช้เฉพาะหน่วยความจำ
+
+    @staticmethod
+    def make_key(buffer, report, params):
+        # key = hash เนื้อไฟล์ + ชนิดรายงาน + พารามิเตอร์ที่ json ได้ (group, activity type, ฯลฯ) + version ของโค้ด
+        raw = json.dumps([content_hash(buffer), report, params, CACHE_VERSION], sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key][0]
+        res = self._load_disk(key)
+        with self._lock:
+            if res is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self.put(key, res, write_disk=False)
+        return res
+
+    def put(self, key, res, write_disk=True):
+        nbytes = frame_bytes(res.df)
+        if nbytes > self.max_mem_bytes:
+            # ใหญ่เกินหน่วยความจำที่กำหนด เก็บลงดิสก์อย่างเดียว
+            if write_disk:
+                self._save_disk(key, res)
+            return
+        with self._lock:
+            if key in self._mem:
+                self._mem_bytes -= self._mem.pop(key)[1]
+            self._mem[key] = (res, nbytes)
+            self._mem_bytes += nbytes
+            # ตัวที่ถูกไล่ออกจากหน่วยความจำยังอยู่บนดิสก์
+            while self._mem_bytes > self.max_mem_bytes and len(self._mem) > 1:
+                _, (_, old_bytes) = self._mem.popitem(last=False)
+                self._mem_bytes -= old_bytes
+                self.evictions += 1
+        if write_disk:
+            self._save_disk(key, res)
+
+    def _save_disk(self, key, res):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(res._replace(df=pack_frame(res.df)), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._trim_disk()
+
+    def _load_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                res = pickle.load(f)
+            os.utime(path)  # อัปเดตเวลาใช้งานล่าสุดสำหรับ LRU บนดิสก์
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return res._replace(df=unpack_frame(res.df))
+
+    def _trim_disk(self):
+        try:
+            entries = [os.path.join(self.disk_dir, f) for f in os.listdir(self.disk_dir) if f.endswith(".pkl")]
+            entries = sorted(((os.path.getmtime(p), os.path.getsize(p), p) for p in entries))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for f in os.listdir(self.disk_dir):
+                if f.endswith(".pkl"):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, f))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(self._mem), "mem_bytes": self._mem_bytes,
+            }
+
+
+# cache ระดับ process: Streamlit rerun ใช้ module เดิม จึงใช้ร่วมกันได้ทุกหน้า/ทุก session
+upload_cache = ResultCache()
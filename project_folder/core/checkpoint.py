@@ -0,0 +1,217 @@
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from core.migrations import TableSpec, ensure_table
+from core.source import make_private_dir, user_dir
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # ไม่มี pyarrow เก็บข้อมูลเป็น pickle แทน
+    pq = None
+
+# งานนำเข้าที่ทำต่อได้ (resumable load)
+# journal อยู่ใน database เดียวกับตารางปลายทาง: committed_rows อัปเดตใน transaction เดียวกับชุดข้อมูลที่ commit
+# ข้อมูลหลัง to_db + แผนของงาน (kwargs ของ run_upload) อยู่ในเครื่องที่ LOADS_DIR/<load_id>/ ทำต่อได้โดยไม่อ่าน/clean ไฟล์ใหม่
+JOURNAL_TABLE = os.environ.get("DEPT_LOAD_JOURNAL", "dept_load_journal")
+# แผนอ่านกลับด้วย pickle จึงเก็บในโฟลเดอร์เฉพาะผู้ใช้ (core.source.user_dir) ไม่ใช่ temp ที่ใช้ร่วมกัน
+LOADS_DIR = os.environ.get("DEPT_LOADS_DIR", user_dir("loads"))
+
+# prepare: ยังไม่ลบข้อมูลเดิม/ยังไม่เตรียม staging | write: เขียนต่อจาก committed_rows
+# finish: เขียนครบแล้ว เหลือ procedures | done: procedures commit แล้ว | abandoned: ถูกทิ้ง/มีงานใหม่ของตารางเดียวกันแทน
+PREPARE, WRITE, FINISH, DONE, ABANDONED = 'prepare', 'write', 'finish', 'done', 'abandoned'
+
+JOURNAL_SPEC = TableSpec(
+    columns={
+        'load_id': "VARCHAR(48) NOT NULL", 'report': "VARCHAR(32)", 'table_name': "VARCHAR(64) NOT NULL",
+        'mode': "VARCHAR(16) NOT NULL", 'stage': "VARCHAR(16) NOT NULL", 'total_rows': "BIGINT NOT NULL",
+        'committed_rows': "BIGINT NOT NULL DEFAULT 0", 'error': "TEXT",
+        'started_at': "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+        'updated_at': "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+    },
+    primary_key=['load_id'],
+)
+
+_PLAN = "plan.pkl"
+_active = set()  # load_id ที่กำลังทำงานใน process นี้ (ไม่แสดงเป็นงานค้าง)
+_lock = threading.Lock()
+
+
+def new_load_id(report=None):
+    return f"{(report or 'load').lower()}-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def load_dir(load_id, base_dir=LOADS_DIR):
+    return os.path.join(base_dir, load_id)
+
+
+def _data_path(load_id, base_dir):
+    return os.path.join(load_dir(load_id, base_dir), "data.parquet" if pq is not None else "data.pkl")
+
+
+def _db_name(engine):
+    # ใช้จับคู่งานค้างกับ database (ไม่เก็บรหัสผ่านลงดิสก์)
+    return engine.url.render_as_string(hide_password=True)
+
+
+class LoadJournal:
+    """สถานะของงานนำเข้าหนึ่งงาน (แถวใน JOURNAL_TABLE)
+
+    checkpoint(conn, rows) เรียกก่อน commit ของแต่ละชุด: ชุดข้อมูลกับจุด checkpoint commit พร้อมกันหรือไม่ commit ทั้งคู่
+    ทำต่อจึงเริ่มที่แถว committed (ค่าใน journal ตอนเปิดงาน) ได้โดยไม่มีแถวซ้ำหรือหาย
+    """
+
+    def __init__(self, load_id, engine, stage=PREPARE, committed=0, total=0):
+        self.load_id = load_id
+        self.engine = engine
+        self.stage = stage
+        self.committed = committed
+        self.total = total
+
+    def checkpoint(self, conn, rows):
+        conn.execute(text(f"UPDATE `{JOURNAL_TABLE}` SET committed_rows = :n WHERE load_id = :id"),
+                     {"n": int(rows), "id": self.load_id})
+
+    def set_stage(self, stage, conn=None):
+        # conn: อยู่ใน transaction ของขั้นตอนนั้น (เช่น procedures) ไม่ระบุ = commit ทันที
+        sql = text(f"UPDATE `{JOURNAL_TABLE}` SET stage = :stage, error = NULL WHERE load_id = :id")
+        if conn is not None:
+            conn.execute(sql, {"stage": stage, "id": self.load_id})
+        else:
+            with self.engine.begin() as own:
+                own.execute(sql, {"stage": stage, "id": self.load_id})
+        self.stage = stage
+
+    def fail(self, error):
+        # บันทึก error ให้ดูภายหลัง (connection หลุดอยู่ก็ข้ามไป สถานะใน journal ยังถูกต้อง)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"UPDATE `{JOURNAL_TABLE}` SET error = :error WHERE load_id = :id"),
+                             {"error": str(error)[:2000], "id": self.load_id})
+        except Exception:
+            pass
+
+
+def _write_data(df, path):
+    if pq is not None:
+        df.to_parquet(path, index=False, compression='zstd')
+    else:
+        df.to_pickle(path)
+
+
+def read_data(load_id, base_dir=LOADS_DIR):
+    path = _data_path(load_id, base_dir)
+    return pd.read_parquet(path) if pq is not None else pd.read_pickle(path)
+
+
+def read_plan(load_id, base_dir=LOADS_DIR):
+    with open(os.path.join(load_dir(load_id, base_dir), _PLAN), "rb") as f:
+        return pickle.load(f)
+
+
+def pending_loads(report=None, base_dir=LOADS_DIR):
+    """งานค้างในเครื่องนี้ (ล่าสุดก่อน): [{load_id, report, table_name, mode, total_rows, db, created}]"""
+    if not os.path.isdir(base_dir) or not make_private_dir(base_dir):
+        return []
+    loads = []
+    for load_id in os.listdir(base_dir):
+        with _lock:
+            if load_id in _active:
+                continue
+        try:
+            meta = read_plan(load_id, base_dir)["meta"]
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError):
+            continue  # ยังเขียนไม่เสร็จ / ไฟล์เสีย
+        if report is None or meta["report"] == report:
+            loads.append(meta)
+    return sorted(loads, key=lambda m: m["created"], reverse=True)
+
+
+def abandon_load(load_id, engine=None, base_dir=LOADS_DIR):
+    # ทิ้งงานค้าง: ลบข้อมูลในเครื่อง + journal เป็น abandoned (staging ที่ค้างถูก DROP ตอนนำเข้าครั้งถัดไป)
+    if engine is not None:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"UPDATE `{JOURNAL_TABLE}` SET stage = :stage WHERE load_id = :id AND stage <> :done"),
+                             {"stage": ABANDONED, "id": load_id, "done": DONE})
+        except Exception:
+            pass
+    shutil.rmtree(load_dir(load_id, base_dir), ignore_errors=True)
+
+
+def start_load(engine, df_db, plan, report=None, base_dir=LOADS_DIR):
+    """เก็บข้อมูล + แผนลงเครื่อง แล้วเพิ่มแถวใน journal คืน LoadJournal
+
+    งานค้างเดิมของตารางเดียวกันใน database เดียวกันถูกทิ้ง (ทำต่อหลังจากมีงานใหม่จะได้ข้อมูลผิด)
+    """
+    ensure_table(engine, JOURNAL_TABLE, JOURNAL_SPEC)
+    db = _db_name(engine)
+    for meta in pending_loads(base_dir=base_dir):
+        if meta["db"] == db and meta["table_name"] == plan["table_name"]:
+            abandon_load(meta["load_id"], engine, base_dir)
+
+    load_id = new_load_id(report)
+    with _lock:
+        _active.add(load_id)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"INSERT INTO `{JOURNAL_TABLE}` (load_id, report, table_name, mode, stage, total_rows, committed_rows) "
+                "VALUES (:id, :report, :table_name, :mode, :stage, :total, 0)"),
+                {"id": load_id, "report": report, "table_name": plan["table_name"], "mode": plan["mode"],
+                 "stage": PREPARE, "total": len(df_db)})
+        if not make_private_dir(base_dir):
+            raise PermissionError(f"{base_dir} เป็นของผู้ใช้อื่น")
+        os.makedirs(load_dir(load_id, base_dir))
+        _write_data(df_db, _data_path(load_id, base_dir))
+        meta = {"load_id": load_id, "report": report, "table_name": plan["table_name"], "mode": plan["mode"],
+                "total_rows": len(df_db), "db": db, "created": time.time()}
+        # plan เขียนหลังข้อมูล: โฟลเดอร์ที่ยังไม่มี plan ไม่ถูกนับเป็นงานค้าง
+        tmp_path = os.path.join(load_dir(load_id, base_dir), _PLAN + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"meta": meta, "plan": plan}, f)
+        os.replace(tmp_path, os.path.join(load_dir(load_id, base_dir), _PLAN))
+    except Exception:
+        # ยังไม่ได้แตะข้อมูลเดิม ไม่ต้องเก็บไว้ทำต่อ
+        release_load(LoadJournal(load_id, engine), finished=True, base_dir=base_dir)
+        raise
+    return LoadJournal(load_id, engine, PREPARE, 0, len(df_db))
+
+
+def claim_load(load_id):
+    # กันกดทำต่อซ้ำระหว่างที่งานเดิมยังอยู่ในคิว: คืน False ถ้ามีงานของ load_id นี้อยู่แล้ว
+    with _lock:
+        if load_id in _active:
+            return False
+        _active.add(load_id)
+        return True
+
+
+def open_load(engine, load_id):
+    """LoadJournal ของงานค้างจาก journal (ขั้นตอนและจำนวนแถวที่ commit แล้ว)"""
+    ensure_table(engine, JOURNAL_TABLE, JOURNAL_SPEC)
+    with engine.connect() as conn:
+        row = conn.execute(text(f"SELECT stage, committed_rows, total_rows FROM `{JOURNAL_TABLE}` WHERE load_id = :id"),
+                           {"id": load_id}).fetchone()
+    if row is None:
+        raise ValueError(f"ไม่พบงาน {load_id} ใน {JOURNAL_TABLE}")
+    if row[0] == ABANDONED:
+        raise ValueError(f"งาน {load_id} ถูกทิ้งแล้ว (มีการนำเข้าใหม่ของตารางเดียวกัน)")
+    with _lock:
+        _active.add(load_id)
+    return LoadJournal(load_id, engine, row[0], int(row[1]), int(row[2]))
+
+
+def release_load(load, finished, base_dir=LOADS_DIR):
+    # จบงาน: สำเร็จลบข้อมูลในเครื่อง, ไม่สำเร็จเก็บไว้ทำต่อ (แสดงเป็นงานค้าง)
+    with _lock:
+        _active.discard(load.load_id)
+    if finished:
+        shutil.rmtree(load_dir(load.load_id, base_dir), ignore_errors=True)
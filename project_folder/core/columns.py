@@ -0,0 +1,114 @@
+import json
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# กติกาจับคู่หนึ่งคอลัมน์: exact = ชื่อหัวตารางที่ตรงทั้งคำ, contains = คำที่ถ้าพบในหัวตารางถือว่าเป็นคอลัมน์นี้
+Column = namedtuple('Column', ['target', 'exact', 'contains'], defaults=((), ()))
+# รูปแบบรายงานหนึ่งรายงาน: header = HeaderSpec สำหรับหาแถวหัวตาราง, required = คอลัมน์ที่ขาดไม่ได้
+ReportLayout = namedtuple('ReportLayout', ['name', 'header', 'columns', 'required'])
+# rename: {หัวตารางในไฟล์: ชื่อคอลัมน์}, missing: คอลัมน์ที่ไม่พบ (รวม required)
+Resolution = namedtuple('Resolution', ['rename', 'missing', 'missing_required'])
+
+# เพิ่มชื่อหัวตารางแบบใหม่ของ SAP ได้โดยไม่ต้องแก้โค้ด เช่น
+# {"ZCAKR005": {"approve_date": ["Approve Date"], "ca_no": {"contains": ["Cont. Acct"]}}}
+ALIASES_FILE = os.environ.get(
+    "DEPT_COLUMN_ALIASES",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "column_aliases.json"),
+)
+
+_LAYOUTS = {}
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_header(c):
+    # ช่องว่างพิเศษ / ช่องว่างซ้อนจาก Excel ถือเป็นหัวตารางเดียวกัน
+    return _SPACES.sub(' ', str(c).replace('\xa0', ' ')).strip()
+
+
+def register_layout(layout):
+    _LAYOUTS[layout.name] = layout
+    compile_layout.cache_clear()
+    resolve_columns.cache_clear()
+    return layout
+
+
+def target_columns(layout):
+    return list(dict.fromkeys(col.target for col in layout.columns))
+
+
+def _load_extra_aliases(name):
+    try:
+        with open(ALIASES_FILE, encoding="utf-8") as f:
+            extra = json.load(f).get(name, {})
+    except FileNotFoundError:
+        return {}
+    # รูปแบบย่อ: list = exact
+    return {target: v if isinstance(v, dict) else {"exact": v} for target, v in extra.items()}
+
+
+@lru_cache(maxsize=None)
+def compile_layout(name):
+    """รวมกติกาของรายงานเป็น (dict exact, regex ของคำ contains ทั้งหมด, {คำ: (ลำดับ, คอลัมน์)}) ครั้งเดียวต่อ process"""
+    layout = _LAYOUTS[name]
+    extra = _load_extra_aliases(name)
+    exact = {}
+    contains = []
+    for col in layout.columns:
+        more = extra.get(col.target, {})
+        # ชื่อภาษาอังกฤษเองก็ใช้ได้ (ไฟล์ที่ export จากระบบนี้กลับมานำเข้าใหม่)
+        for alias in (col.target, *col.exact, *more.get("exact", ())):
+            exact.setdefault(normalize_header(alias), col.target)
+        for kw in (*col.contains, *more.get("contains", ())):
+            contains.append((normalize_header(kw), col.target))
+    # กติกาที่มาก่อนชนะ (เหมือน if/elif เดิม): regex เดียวเรียงคำตามลำดับกติกา + lookahead
+    # ทุกตำแหน่งจะได้คำที่ลำดับน้อยสุดที่เริ่มตรงนั้น แล้วเลือกลำดับน้อยสุดของทั้งหัวตาราง
+    rank = {}
+    for kw, target in contains:
+        rank.setdefault(kw, (len(rank), target))
+    pattern = re.compile('(?=(' + '|'.join(map(re.escape, rank)) + '))') if rank else None
+    return exact, pattern, rank
+
+
+def _match_contains(header, pattern, rank):
+    if pattern is None:
+        return None
+    best = min((rank[m.group(1)] for m in pattern.finditer(header)), default=None)
+    return best[1] if best else None
+
+
+@lru_cache(maxsize=256)
+def resolve_columns(name, columns):
+    """จับคู่หัวตาราง (tuple) กับชื่อคอลัมน์ของรายงาน name; cache ตามชุดหัวตาราง ไฟล์รูปแบบเดิมจึงไม่ต้องจับคู่ใหม่
+
+    หัวตารางหลายช่องที่ได้ชื่อเดียวกัน ใช้ช่องแรก (ช่องถัดไปถูกทิ้ง)
+    """
+    layout = _LAYOUTS[name]
+    exact, pattern, rank = compile_layout(name)
+    rename = {}
+    used = set()
+    for c in columns:
+        header = normalize_header(c)
+        target = exact.get(header) or _match_contains(header, pattern, rank)
+        if target and target not in used:
+            rename[c] = target
+            used.add(target)
+    missing = tuple(t for t in target_columns(layout) if t not in used)
+    return Resolution(rename, missing, tuple(t for t in layout.required if t not in used))
+
+
+def apply_layout(df, layout, extra_cols=()):
+    # rename + เลือก/เรียงคอลัมน์ในครั้งเดียว คอลัมน์ที่ไม่พบจะเป็น NaN (ดู resolve_columns().missing)
+    res = resolve_columns(layout.name, tuple(df.columns))
+    df = df.loc[:, list(res.rename)]
+    df.columns = list(res.rename.values())
+    return df.reindex(columns=target_columns(layout) + [c for c in extra_cols if c not in res.rename.values()])
+
+
+def missing_note(res, ignore=()):
+    # ข้อความเตือนคอลัมน์ที่หาไม่เจอ (แทนการเติม NaN เงียบ ๆ) หรือ None
+    missing = [c for c in res.missing if c not in ignore]
+    if not missing:
+        return None
+    return ('warning', "⚠️ ไม่พบคอลัมน์ " + ", ".join(missing) + " ในไฟล์ (เว้นว่างไว้) หาก SAP เปลี่ยนชื่อหัวตาราง เพิ่มชื่อใหม่ได้ที่ column_aliases.json")
@@ -0,0 +1,88 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ตารางเดือนไทย (ตัวย่อและชื่อเต็ม) -> เลขเดือน
+THAI_MONTHS = {
+    'ม.ค.': 1, 'ก.พ.': 2, 'มี.ค.': 3, 'เม.ย.': 4, 'พ.ค.': 5, 'มิ.ย.': 6,
+    'ก.ค.': 7, 'ส.ค.': 8, 'ก.ย.': 9, 'ต.ค.': 10, 'พ.ย.': 11, 'ธ.ค.': 12,
+    'มกราคม': 1, 'กุมภาพันธ์': 2, 'มีนาคม': 3, 'เมษายน': 4, 'พฤษภาคม': 5, 'มิถุนายน': 6,
+    'กรกฎาคม': 7, 'สิงหาคม': 8, 'กันยายน': 9, 'ตุลาคม': 10, 'พฤศจิกายน': 11, 'ธันวาคม': 12,
+}
+
+_ISO_RE = r'^(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})'
+_DMY_RE = r'^(?P<d>\d{1,2})[./-](?P<m>\d{1,2})[./-](?P<y>\d{4}|\d{2})(?:\s|$)'
+_MY_RE = r'^(?P<m>\d{1,2})[./](?P<y>\d{4})$'
+_THAI_RE = r'^(?P<m>' + '|'.join(re.escape(k) for k in sorted(THAI_MONTHS, key=len, reverse=True)) + r')\s*[-/ ]?\s*(?P<y>\d{4}|\d{2})$'
+
+
+def _normalize_year(y, buddhist=False):
+    # ปี 2 หลักของรูปแบบตัวเลข (dd.mm.yy) เป็น ค.ศ. 20xx, ปี 4 หลักคงตามที่เขียน (ไฟล์ SAP เป็น ค.ศ.)
+    # buddhist (เดือนไทย): ปี 2 หลัก < 60 ถือเป็น ค.ศ. (26 -> 2026), >= 60 ถือเป็น พ.ศ. (69 -> 2569 -> 2026)
+    # และปี 4 หลักที่เกิน 2400 เป็น พ.ศ. ให้ลบ 543
+    short = (y.str.len() <= 2).to_numpy()
+    y = y.astype(float).to_numpy()
+    if not buddhist:
+        return np.where(short, 2000 + y, y)
+    y = np.where(short, np.where(y < 60, 2000 + y, 2500 + y - 543), y)
+    return np.where(y > 2400, y - 543, y)
+
+
+def _assemble(y, m, d, index, buddhist=False):
+    parts = pd.DataFrame({'year': _normalize_year(y, buddhist), 'month': m.astype(float), 'day': d.astype(float)}, index=index)
+    # หน่วย us รองรับปีถึง 294,000 ปีที่คงไว้ตามไฟล์ (เช่น 2569) จึงไม่หลุดช่วงเหมือน datetime64[ns]
+    return pd.to_datetime(parts, errors='coerce').astype('datetime64[us]')
+
+
+def parse_dates(s, dayfirst=True):
+    """แปลงทั้งคอลัมน์เป็น datetime64 ครั้งเดียว (vectorized ด้วย regex + lookup table)
+
+    รองรับ YYYY-MM-DD[ เวลา], dd.mm.yyyy / dd/mm/yyyy, MM/YYYY, เดือนไทยย่อ + ปี 2/4 หลัก (พ.ศ./ค.ศ.)
+    แปลง พ.ศ. -> ค.ศ. เฉพาะรูปแบบเดือนไทย รูปแบบตัวเลขเก็บปีตามที่เขียน (03/2569 -> 2569-03-01 เหมือนเดิม)
+    ค่าที่ไม่ตรงรูปแบบใดเลยจะลองด้วย pd.to_datetime ทั่วไป ที่เหลือเป็น NaT
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.tz_localize(None) if getattr(s.dt, 'tz', None) is not None else s
+    out = pd.Series(pd.NaT, index=s.index, dtype='datetime64[us]')
+    text = s.astype(object).where(s.notna(), None).astype(str).str.strip()
+    todo = s.notna() & ~text.isin(['', 'nan', 'NaN', 'None', 'NaT'])
+
+    for pattern in (_ISO_RE, _DMY_RE, _MY_RE):
+        if not todo.any():
+            return out
+        parts = text[todo].str.extract(pattern)
+        hit = parts['y'].notna()
+        if hit.any():
+            p = parts[hit]
+            day = p['d'] if 'd' in p else pd.Series(1, index=p.index)
+            out.loc[p.index] = _assemble(p['y'], p['m'], day, p.index)
+            todo.loc[p.index] = False
+
+    if todo.any():
+        parts = text[todo].str.extract(_THAI_RE)
+        hit = parts['y'].notna()
+        if hit.any():
+            p = parts[hit]
+            month = p['m'].map(THAI_MONTHS)
+            out.loc[p.index] = _assemble(p['y'], month, pd.Series(1, index=p.index), p.index, buddhist=True)
+            todo.loc[p.index] = False
+
+    if todo.any():
+        # รูปแบบอื่นที่ไม่รู้จัก (ปกติมีน้อยมาก) ใช้ parser ทั่วไปของ pandas
+        out.loc[todo] = pd.to_datetime(text[todo], dayfirst=dayfirst, errors='coerce', format='mixed')
+    return out
+
+
+def format_dates(df, formats):
+    # แปลงคอลัมน์วันที่ที่ parse แล้วกลับเป็น string ตามรูปแบบที่ตารางใน MySQL ใช้อยู่ (ทำตอนส่งออกเท่านั้น)
+    converted = {}
+    for col, fmt in formats.items():
+        if col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]):
+            converted[col] = df[col].dt.strftime(fmt)
+    return df.assign(**converted) if converted else df
+
+
+def in_month(s, year, month):
+    # mask ของแถวที่วันที่ (datetime64) อยู่ในเดือน/ปีที่เลือก
+    return (s.dt.year == year) & (s.dt.month == month)
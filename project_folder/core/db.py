@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from core.loaders import engine_kwargs
+
+# ขนาด pool ต่อ engine (ต่อฐานข้อมูล/ผู้ใช้) เปลี่ยนได้ด้วย env
+POOL_SIZE = int(os.environ.get("DEPT_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.environ.get("DEPT_DB_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = int(os.environ.get("DEPT_DB_POOL_TIMEOUT", "30"))
+# MySQL ตัด connection ที่ว่างเกิน wait_timeout จึงเปิดใหม่ก่อนถึงเวลานั้น (วินาที)
+POOL_RECYCLE = int(os.environ.get("DEPT_DB_POOL_RECYCLE", "3600"))
+
+_engines = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _engine_key(url, method):
+    # engine ที่เปิด local_infile แยกจาก engine ปกติ (ไม่เปิดสิทธิ์อ่านไฟล์ให้ทุก connection)
+    return url, bool(engine_kwargs(method).get("connect_args", {}).get("local_infile"))
+
+
+def _watch(engine, stats):
+    # นับการเปิด connection ใหม่เทียบกับการยืมจาก pool เพื่อดูว่าใช้ซ้ำได้จริง
+    pool = engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, record):
+        stats["connects"] += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        stats["checkouts"] += 1
+        stats["peak_in_use"] = max(stats["peak_in_use"], pool.checkedout())
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        stats["invalidated"] += 1
+
+
+def get_engine(url, method=None):
+    """engine ระดับ process ต่อ (url, local_infile) ใช้ซ้ำข้ามหน้า/session/rerun และ ingest.py รอบ watch
+
+    connection คืนเข้า pool หลังใช้ ห้าม dispose engine ที่ได้จากฟังก์ชันนี้เอง (ใช้ dispose_engines)
+    """
+    key = _engine_key(url, method)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT,
+                                   pool_recycle=POOL_RECYCLE, **engine_kwargs(method))
+            stats = {"connects": 0, "checkouts": 0, "peak_in_use": 0, "invalidated": 0, "created": time.time()}
+            _watch(engine, stats)
+            _engines[key], _stats[key] = engine, stats
+    return engine
+
+
+def pool_stats(url=None):
+    # สถานะ pool ของทุก engine (หรือเฉพาะ url) ไม่แสดงรหัสผ่าน
+    with _lock:
+        items = [(key, engine, dict(_stats[key])) for key, engine in _engines.items() if url is None or key[0] == url]
+    rows = []
+    for (engine_url, infile), engine, stats in items:
+        pool = engine.pool
+        checkouts = stats["checkouts"]
+        rows.append({
+            "database": make_url(engine_url).render_as_string(hide_password=True), "local_infile": infile,
+            "pool_size": pool.size(), "in_use": pool.checkedout(), "idle": pool.checkedin(), "overflow": pool.overflow(),
+            "peak_in_use": stats["peak_in_use"], "connects": stats["connects"], "checkouts": checkouts,
+            "reuse_pct": round((1 - stats["connects"] / checkouts) * 100, 1) if checkouts else None,
+            "invalidated": stats["invalidated"], "age_s": round(time.time() - stats["created"]),
+        })
+    return rows
+
+
+def dispose_engines():
+    # ปิดทุก connection (เช่นจบ process ของ ingest.py)
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+        _stats.clear()
+    for engine in engines:
+        engine.dispose()
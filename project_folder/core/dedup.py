@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+
+class KeyIndex:
+    """ดัชนี hash (uint64) ของ business key จากไฟล์ที่รวมไปแล้ว ใช้ตัดแถวที่ซ้ำข้ามไฟล์แบบทีละไฟล์
+
+    แถวใน key เดียวกันภายในไฟล์เดียวเป็นข้อมูลจริง (เช่นหลายรายการต่อเอกสาร) จึงตัดเฉพาะ key ที่เคยมาจากไฟล์ก่อนหน้า
+    เก็บแค่ hash 8 byte ต่อ key หน่วยความจำจึงไม่โตตามจำนวนคอลัมน์/ขนาดไฟล์
+    """
+
+    def __init__(self, key_cols):
+        self.key_cols = list(key_cols)
+        self._seen = np.empty(0, dtype=np.uint64)  # เรียงไว้สำหรับ searchsorted
+        self.counts = []  # [(ชื่อไฟล์, แถวที่รับ, แถวที่ซ้ำ)]
+
+    def hashes(self, df):
+        # category hash ตามค่า (ไม่ใช่ code) ไฟล์ที่ category ต่างกันจึงได้ hash เดียวกัน
+        return pd.util.hash_pandas_object(df[self.key_cols], index=False).to_numpy(dtype=np.uint64)
+
+    def _contains(self, h):
+        if not len(self._seen):
+            return np.zeros(len(h), dtype=bool)
+        pos = np.searchsorted(self._seen, h).clip(max=len(self._seen) - 1)
+        return self._seen[pos] == h
+
+    def take(self, df, name=None):
+        """คืน (df ที่ตัดแถวซ้ำกับไฟล์ก่อนหน้าแล้ว, จำนวนแถวที่ตัด) แล้วจำ key ของไฟล์นี้ไว้"""
+        if df is None or df.empty:
+            return df, 0
+        h = self.hashes(df)
+        dup = self._contains(h)
+        dropped = int(dup.sum())
+        self._seen = np.union1d(self._seen, h[~dup])
+        self.counts.append((name, len(df) - dropped, dropped))
+        return (df[~dup] if dropped else df), dropped
+
+    @property
+    def dropped(self):
+        return sum(n for _, _, n in self.counts)
+
+
+def duplicate_note(name, n):
+    if not n:
+        return None
+    return ('warning', f"🔁 ไฟล์ {name}: ตัด {n:,} แถวที่ business key ซ้ำกับไฟล์ก่อนหน้า (ไม่นำเข้าซ้ำ)")
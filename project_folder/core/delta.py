@@ -0,0 +1,160 @@
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from core.loaders import write_frame
+
+# insert: แถวที่ต้องเขียน (key ใหม่ + key ที่เปลี่ยน), replace_keys: key ที่ต้องลบแถวเดิมก่อนเขียน
+# vanished_keys: key ที่มีใน DB แต่ไม่มีในไฟล์ใหม่, unchanged: จำนวนแถวที่เหมือนเดิม
+DeltaPlan = namedtuple('DeltaPlan', ['insert', 'new_keys', 'replace_keys', 'vanished_keys', 'unchanged'])
+
+ROW_HASH_HEX = 12  # ใช้ 48 bit แรกของ MD5 ต่อแถว (รวมต่อ key ด้วย SUM จึงไม่ล้น BIGINT)
+KEY_BATCH_ROWS = 5000
+# generated column ที่เก็บ hash ต่อแถวไว้ในตาราง (hash_columns) ไม่ต้องคำนวณ MD5 ทั้งขอบเขตใหม่ทุกครั้งที่อัปโหลด
+KEY_HASH, ROW_HASH = 'key_hash', 'row_hash'
+
+
+# --- ค่าที่ใช้ hash ต้องได้สตริงเดียวกันทั้งฝั่ง MySQL และ pandas ---
+# ค่าว่าง/NULL = '', จำนวนเงิน = ทศนิยม 2 ตำแหน่ง, อย่างอื่นเป็นข้อความตามที่เขียนลง DB (to_db_frame)
+
+def _sql_value(col, amount_cols):
+    if col in amount_cols:
+        return f"COALESCE(CAST(CAST(ROUND(`{col}`, 2) AS DECIMAL(20,2)) AS CHAR), '')"
+    return f"COALESCE(CAST(`{col}` AS CHAR), '')"
+
+
+def _sql_md5(cols, amount_cols):
+    return "MD5(CONCAT_WS('|', " + ", ".join(_sql_value(c, amount_cols) for c in cols) + "))"
+
+
+def _sql_row_hash(cols, amount_cols):
+    return f"CAST(CONV(LEFT({_sql_md5(cols, amount_cols)}, {ROW_HASH_HEX}), 16, 10) AS UNSIGNED)"
+
+
+def hash_columns(columns, key_cols, amount_cols=()):
+    """นิยาม generated column key_hash / row_hash (STORED) สำหรับ TableSpec.generated
+
+    columns ต้องเป็นคอลัมน์ที่ to_db_frame เขียนลงตาราง ตามลำดับเดียวกัน (row hash ฝั่ง pandas ใช้ลำดับคอลัมน์ของ frame)
+    """
+    amount_cols = set(amount_cols)
+    return {KEY_HASH: f"CHAR(32) AS ({_sql_md5(key_cols, amount_cols)}) STORED",
+            ROW_HASH: f"BIGINT UNSIGNED AS ({_sql_row_hash(columns, amount_cols)}) STORED"}
+
+
+def has_hash_columns(conn, table_name):
+    rows = conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t "
+        "AND COLUMN_NAME IN (:k, :r)"), {"t": table_name, "k": KEY_HASH, "r": ROW_HASH}).scalar()
+    return rows == 2
+
+
+def _text_values(s, is_amount):
+    # คืน list ของสตริงต่อแถว; format เฉพาะค่าที่ไม่ซ้ำแล้ว take ตาม code (เร็วกว่า format ทุกแถว)
+    if is_amount:
+        # + 0.0 ทำให้ -0.0 เป็น 0.0 (MySQL DECIMAL ไม่มี -0.00)
+        codes, uniques = pd.factorize(s.astype('float64').round(2) + 0.0)
+        lookup = np.array([f"{v:.2f}" for v in uniques] + [''], dtype=object)
+    elif isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        lookup = np.array([str(c) for c in s.cat.categories] + [''], dtype=object)
+    else:
+        return s.astype(object).where(s.notna(), '').astype(str).tolist()
+    return lookup[codes].tolist()  # code -1 (ค่าว่าง) ได้ช่องสุดท้าย ''
+
+
+def _joined(df, cols, amount_cols):
+    return ['|'.join(row) for row in zip(*(_text_values(df[c], c in amount_cols) for c in cols))]
+
+
+def row_hashes(df_db, key_cols, amount_cols=()):
+    """คืน (key hash แบบ hex ต่อแถว, row hash 48 bit ต่อแถว) จาก frame ที่แปลงเป็นรูปแบบ DB แล้ว"""
+    amount_cols = set(amount_cols)
+    keys = np.array([hashlib.md5(v.encode('utf-8')).hexdigest() for v in _joined(df_db, key_cols, amount_cols)], dtype=object)
+    rows = np.array([int(hashlib.md5(v.encode('utf-8')).hexdigest()[:ROW_HASH_HEX], 16)
+                     for v in _joined(df_db, list(df_db.columns), amount_cols)], dtype=np.int64)
+    return keys, rows
+
+
+def fetch_remote_hashes(conn, table_name, columns, key_cols, amount_cols=(), where=None, params=None, stored=False):
+    # ให้ MySQL รวม hash ต่อ key เอง ส่งกลับมาแค่ (key, จำนวนแถว, ผลรวม row hash)
+    # stored: อ่านจาก generated column key_hash / row_hash แทนการคำนวณ MD5 ทุกแถวใหม่
+    amount_cols = set(amount_cols)
+    key_hash = f"`{KEY_HASH}`" if stored else _sql_md5(key_cols, amount_cols)
+    row_hash = f"`{ROW_HASH}`" if stored else _sql_row_hash(columns, amount_cols)
+    sql = (f"SELECT {key_hash} AS k, COUNT(*) AS n, SUM({row_hash}) AS h "
+           f"FROM `{table_name}`" + (f" WHERE {where}" if where else "") + " GROUP BY k")
+    rows = conn.execute(text(sql), params or {}).fetchall()
+    return pd.DataFrame({'n': np.array([int(r[1]) for r in rows], dtype=np.int64),
+                         'h': np.array([int(r[2]) for r in rows], dtype=np.int64)},
+                        index=pd.Index([r[0] for r in rows], name='k', dtype=object))
+
+
+def plan_delta(df_db, remote, key_cols, amount_cols=()):
+    """เทียบ hash ต่อ key: key ที่จำนวนแถวหรือผลรวม row hash ต่างกันถือว่าเปลี่ยน (แทนที่ทุกแถวของ key นั้น)
+
+    รองรับ key ซ้ำหลายแถว (เช่นรายการย่อยซ้ำ) โดยไม่ขึ้นกับลำดับแถว
+    """
+    keys, rows = row_hashes(df_db, key_cols, amount_cols)
+    # row hash 48 bit รวมได้ถึง 32,767 แถวต่อ key ก่อนล้น int64
+    local = pd.Series(rows, index=pd.Index(keys, dtype=object, name='k')).groupby(level=0, sort=False).agg(['size', 'sum'])
+    local.columns = ['n', 'h']
+    joined = local.join(remote, how='left', rsuffix='_db')
+    is_new = joined['n_db'].isna()
+    changed = ~is_new & ((joined['n'] != joined['n_db']) | (joined['h'] != joined['h_db']))
+    mask = pd.Index(keys, dtype=object).isin(joined.index[is_new | changed])
+    return DeltaPlan(
+        insert=df_db[mask],
+        new_keys=list(joined.index[is_new]),
+        replace_keys=list(joined.index[changed]),
+        vanished_keys=list(remote.index.difference(local.index)),
+        unchanged=int((~mask).sum()),
+    )
+
+
+def delete_keys(conn, table_name, keys, key_cols, amount_cols=(), where=None, params=None, stored=False):
+    # ใส่ key ลงตารางชั่วคราวแล้ว DELETE ... JOIN ครั้งเดียว (ไม่ต้องมี index บนคอลัมน์ธุรกิจ)
+    if not keys:
+        return 0
+    conn.execute(text("DROP TEMPORARY TABLE IF EXISTS `tmp_delta_keys`"))
+    conn.execute(text("CREATE TEMPORARY TABLE `tmp_delta_keys` (k CHAR(32) PRIMARY KEY)"))
+    for start in range(0, len(keys), KEY_BATCH_ROWS):
+        conn.execute(text("INSERT INTO `tmp_delta_keys` (k) VALUES (:k)"), [{"k": k} for k in keys[start:start + KEY_BATCH_ROWS]])
+    key_hash = f"t.`{KEY_HASH}`" if stored else _sql_md5(key_cols, set(amount_cols))
+    sql = (f"DELETE t FROM `{table_name}` t JOIN `tmp_delta_keys` d ON d.k = {key_hash}"
+           + (f" WHERE {where}" if where else ""))
+    deleted = conn.execute(text(sql), params or {}).rowcount
+    conn.execute(text("DROP TEMPORARY TABLE `tmp_delta_keys`"))
+    conn.commit()
+    return deleted
+
+
+def delta_load(df_db, table_name, engine, method, key_cols, amount_cols=(), where=None, params=None,
+               delete_vanished=False, progress=None, on_stage=None):
+    """Append แบบ delta: เขียนเฉพาะ key ใหม่ / key ที่ข้อมูลเปลี่ยน และลบ key ที่หายไปถ้า delete_vanished
+
+    where/params จำกัดขอบเขตแถวเดิมที่นำมาเทียบและลบ (เขตที่เลือก) ต้องระบุเสมอเมื่อไฟล์มีเฉพาะบางเขต
+    ตารางที่มี key_hash / row_hash (hash_columns) ใช้ hash ที่เก็บไว้แทนการคำนวณใหม่
+    ลบแถวเดิมแล้วค่อยเขียนแถวใหม่ (ไม่ใช่ transaction เดียว เช่นเดียวกับโหมด Overwrite แบบ DELETE)
+    คืน dict สรุปจำนวนแถว
+    """
+    notify = on_stage or (lambda msg: None)
+    columns = list(df_db.columns)
+    with engine.connect() as conn:
+        stored = has_hash_columns(conn, table_name)
+        notify("อ่าน hash ของข้อมูลเดิมใน Database" if stored else "คำนวณ hash ของข้อมูลเดิมใน Database")
+        remote = fetch_remote_hashes(conn, table_name, columns, key_cols, amount_cols, where, params, stored)
+        notify(f"เทียบกับข้อมูลใหม่ {len(df_db):,} แถว ({len(remote):,} key ใน Database)")
+        plan = plan_delta(df_db, remote, key_cols, amount_cols)
+        drop_keys = plan.replace_keys + (plan.vanished_keys if delete_vanished else [])
+        notify(f"ลบแถวเดิมของ {len(drop_keys):,} key")
+        deleted = delete_keys(conn, table_name, drop_keys, key_cols, amount_cols, where, params, stored)
+
+    notify(f"เขียนแถวใหม่/ที่เปลี่ยน {len(plan.insert):,} แถว")
+    written = write_frame(plan.insert, table_name, engine, method, progress) if len(plan.insert) else 0
+    return {
+        "planned": len(plan.insert), "inserted": written, "deleted": deleted, "unchanged": plan.unchanged, "new_keys": len(plan.new_keys),
+        "changed_keys": len(plan.replace_keys), "vanished_keys": len(plan.vanished_keys),
+    }
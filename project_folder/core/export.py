@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+try:
+    import zstandard
+except ImportError:  # ไม่มี zstandard จะไม่แสดงตัวเลือก CSV (zstd)
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # ไม่มี pyarrow จะไม่แสดงตัวเลือก Parquet
+    pa = pq = None
+
+from core.source import make_private_dir, user_dir
+
+# ext: นามสกุลไฟล์, mime: สำหรับปุ่มดาวน์โหลด, kind: csv / gzip / zstd / parquet
+ExportFormat = namedtuple('ExportFormat', ['ext', 'mime', 'kind'])
+EXPORT_FORMATS = {
+    "CSV": ExportFormat(".csv", "text/csv", "csv"),
+    "CSV (gzip)": ExportFormat(".csv.gz", "application/gzip", "gzip"),
+    "CSV (zstd)": ExportFormat(".csv.zst", "application/zstd", "zstd"),
+    "Parquet": ExportFormat(".parquet", "application/vnd.apache.parquet", "parquet"),
+}
+EXPORT_CHUNK_ROWS = 200000
+DEFAULT_EXPORT_DIR = user_dir("exports")  # ไฟล์ที่ส่งให้ดาวน์โหลดตาม version จึงไม่ใช้ temp ที่ผู้อื่นวางไฟล์ได้
+DEFAULT_MAX_EXPORT_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+
+
+def available_formats():
+    # ตัวเลือกที่ใช้ได้จริงในเครื่องนี้ (ตาม library ที่ติดตั้ง)
+    return [label for label, fmt in EXPORT_FORMATS.items()
+            if not (fmt.kind == 'zstd' and zstandard is None) and not (fmt.kind == 'parquet' and pq is None)]
+
+
+def format_for_path(path):
+    # ingest.py --export: เลือกรูปแบบจากนามสกุล (ไม่ตรงใช้ CSV)
+    for fmt in sorted(EXPORT_FORMATS.values(), key=lambda f: -len(f.ext)):
+        if path.lower().endswith(fmt.ext):
+            return fmt
+    return EXPORT_FORMATS["CSV"]
+
+
+def export_version(report, keys, *extra):
+    """version ของชุดข้อมูล = cache key ของทุกไฟล์ (เนื้อหา + พารามิเตอร์) + ตัวกรองหลังรวมไฟล์ เช่นเดือนที่เลือก"""
+    raw = json.dumps([report, list(keys), list(extra)], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _open_text(path, kind):
+    # BOM (utf-8-sig) ให้ Excel เปิดภาษาไทยได้ เหมือน CSV เดิม
+    if kind == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8-sig', newline='', compresslevel=6)
+    if kind == 'zstd':
+        raw = open(path, 'wb')
+        stream = zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return open(path, 'w', encoding='utf-8-sig', newline='')
+
+
+def write_export(df, path, fmt, to_text=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """เขียน df ลงไฟล์ทีละ chunk (ไม่สร้างข้อความ CSV ทั้งก้อนในหน่วยความจำ) คืนจำนวนแถว
+
+    to_text: ฟังก์ชันแปลงวันที่เป็นรูปแบบใน DB (to_db_frame) ใช้เฉพาะ CSV, Parquet เก็บชนิดข้อมูลจริง
+    เขียนลงไฟล์ .tmp ชื่อสุ่มในโฟลเดอร์เดียวกันแล้วเปลี่ยนชื่อ ไฟล์ที่เขียนไม่เสร็จจึงไม่ถูกใช้เป็น cache
+    และหลาย session ที่ export ชุดเดียวกันพร้อมกันไม่เขียนทับไฟล์ .tmp ของกันและกัน
+    """
+    total = len(df)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        if fmt.kind == 'parquet':
+            writer = None
+            try:
+                for start in range(0, max(total, 1), chunk_rows):
+                    table = pa.Table.from_pandas(df.iloc[start:start + chunk_rows], preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                    writer.write_table(table)
+                    if progress:
+                        progress(min(start + chunk_rows, total), total)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            with _open_text(tmp_path, fmt.kind) as f:
+                for start in range(0, max(total, 1), chunk_rows):
+                    chunk = df.iloc[start:start + chunk_rows]
+                    if to_text is not None:
+                        chunk = to_text(chunk)
+                    chunk.to_csv(f, index=False, header=(start == 0))
+                    if progress:
+                        progress(min(start + chunk_rows, total), total)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return total
+
+
+def export_path(version, fmt, export_dir=DEFAULT_EXPORT_DIR):
+    if not make_private_dir(export_dir):
+        raise PermissionError(f"โฟลเดอร์ export {export_dir} เป็นของผู้ใช้อื่น")
+    return os.path.join(export_dir, f"{version}{fmt.ext}")
+
+
+def cached_export(df, version, fmt, to_text=None, export_dir=DEFAULT_EXPORT_DIR, max_bytes=DEFAULT_MAX_EXPORT_BYTES, progress=None):
+    """คืน path ของไฟล์ export ของชุดข้อมูล version (สร้างเฉพาะครั้งแรก) และลบไฟล์เก่าเกิน max_bytes แบบ LRU"""
+    path = export_path(version, fmt, export_dir)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    write_export(df, path, fmt, to_text, progress=progress)
+    trim_exports(export_dir, max_bytes, keep=path)
+    return path
+
+
+def trim_exports(export_dir=DEFAULT_EXPORT_DIR, max_bytes=DEFAULT_MAX_EXPORT_BYTES, keep=None):
+    try:
+        entries = [os.path.join(export_dir, f) for f in os.listdir(export_dir) if not f.endswith(".tmp")]
+        entries = sorted((os.path.getmtime(p), os.path.getsize(p), p) for p in entries)
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,118 @@
+import csv
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # ไม่มี pyarrow อ่านไฟล์ข้อความด้วย pd.read_csv ตามเดิม
+    pa = pacsv = None
+
+from core.pushdown import filter_table
+from core.source import MemoryFile
+
+# engine อ่านไฟล์ข้อความ (UTF-16 TSV / CSV): arrow = หลาย thread, pandas = pd.read_csv แบบเดิม
+CSV_ENGINE = os.environ.get("DEPT_CSV_ENGINE", "arrow")
+BLOCK_BYTES = 8 * 1024 * 1024  # ขนาดก้อนที่แบ่งให้แต่ละ thread parse
+# ค่าที่ pd.read_csv ถือเป็นค่าว่าง (ให้ผลเหมือนกันทั้งสอง engine)
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+             '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+_NA_SET = frozenset(NA_VALUES)
+
+
+def arrow_enabled():
+    return pacsv is not None and CSV_ENGINE == 'arrow'
+
+
+class BadLines:
+    """invalid_row_handler ของ Arrow: บรรทัดที่คอลัมน์เกินหัวตารางข้ามแล้วนับไว้ (เหมือน on_bad_lines='skip')
+
+    บรรทัดที่คอลัมน์ขาด pd.read_csv เก็บไว้แล้วเติมค่าว่าง จึงเก็บข้อความไว้ parse ต่อท้ายผลลัพธ์
+    """
+
+    def __init__(self, sep):
+        self.sep = sep
+        self.skipped = 0
+        self._short = []
+
+    def __call__(self, row):
+        if row.actual_columns < row.expected_columns:
+            self._short.append(row.text)
+        else:
+            self.skipped += 1
+        return 'skip'
+
+    @property
+    def has_short(self):
+        return bool(self._short)
+
+    def take_short(self, columns):
+        # คืน Arrow table ของบรรทัดที่คอลัมน์ขาด (เติม null ให้ครบ) หรือ None
+        if not self._short:
+            return None
+        rows = []
+        for cells in csv.reader(self._short, delimiter=self.sep):
+            cells = [None if c in _NA_SET else c for c in cells]
+            rows.append(cells + [None] * (len(columns) - len(cells)))
+        self._short = []
+        return pa.table({c: pa.array([r[i] for r in rows], pa.string()) for i, c in enumerate(columns)})
+
+
+def _input(source):
+    # MemoryFile อ่านจาก buffer เดิมโดยไม่ copy
+    return pa.BufferReader(pa.py_buffer(source.data)) if isinstance(source, MemoryFile) else source
+
+
+def _options(fmt, layout, bad, usecols=None, use_threads=True):
+    # utf-8 ให้ Arrow decode เอง (เร็วกว่า และข้าม BOM ให้), encoding อื่นถูกแปลงเป็น UTF-8 แบบ stream ก่อน parse
+    encoding = 'utf8' if fmt.encoding in ('utf-8', 'utf-8-sig') else fmt.encoding
+    read = pacsv.ReadOptions(skip_rows=layout.row + 1, column_names=layout.columns, encoding=encoding,
+                             block_size=BLOCK_BYTES, use_threads=use_threads)
+    parse = pacsv.ParseOptions(delimiter=fmt.sep, invalid_row_handler=bad)
+    # ทุกคอลัมน์เป็นข้อความ (schema ตายตัว ไม่ต้องเดาชนิดข้อมูล) ค่าว่างเป็น null เหมือน pd.read_csv
+    # usecols: decode เฉพาะคอลัมน์ที่รายงานใช้ คอลัมน์อื่นถูกข้ามตั้งแต่ตอน parse
+    columns = usecols or layout.columns
+    convert = pacsv.ConvertOptions(column_types={c: pa.string() for c in columns}, include_columns=usecols or [],
+                                   strings_can_be_null=True, quoted_strings_can_be_null=True, null_values=NA_VALUES)
+    return dict(read_options=read, parse_options=parse, convert_options=convert)
+
+
+def _to_frame(table, bad, columns, skipped, row_filter=None, usecols=None):
+    short = bad.take_short(columns)
+    if short is not None and usecols:
+        short = short.select(usecols)
+    if short is not None:
+        # บรรทัดที่คอลัมน์ขาดต่อท้าย (ลำดับแถวไม่มีผลกับการ clean)
+        table = pa.concat_tables([table, short])
+    # กรองบน Arrow ก่อน to_pandas: แถวนอกเงื่อนไขไม่ถูกสร้างเป็น DataFrame
+    table, dropped = filter_table(table, row_filter)
+    df = table.to_pandas(split_blocks=True)
+    df.attrs['bad_lines'] = skipped
+    df.attrs['filtered_rows'] = dropped
+    return df
+
+
+def read_arrow(source, fmt, layout, row_filter=None, usecols=None):
+    """อ่านไฟล์ข้อความทั้งไฟล์ด้วย Arrow CSV หลาย thread; df.attrs['bad_lines'] คือจำนวนบรรทัดที่ข้าม
+
+    row_filter (core.pushdown.RowFilter) กรองแถวก่อนแปลงเป็น DataFrame จำนวนที่ตัดอยู่ใน attrs['filtered_rows']
+    usecols: หัวตารางดิบที่ต้องการ (None = ทุกคอลัมน์)
+    """
+    bad = BadLines(fmt.sep)
+    table = pacsv.read_csv(_input(source), **_options(fmt, layout, bad, usecols))
+    return _to_frame(table, bad, layout.columns, bad.skipped, row_filter, usecols)
+
+
+def iter_arrow(source, fmt, layout, chunksize=200000, row_filter=None, usecols=None):
+    # streaming: รวม record batch จนได้อย่างน้อย chunksize แถวต่อ DataFrame, attrs['bad_lines'] นับเฉพาะของ chunk นั้น
+    bad = BadLines(fmt.sep)
+    reader = pacsv.open_csv(_input(source), **_options(fmt, layout, bad, usecols))
+    batches, rows, reported = [], 0, 0
+    for batch in reader:
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunksize:
+            skipped, reported = bad.skipped - reported, bad.skipped
+            yield _to_frame(pa.Table.from_batches(batches, reader.schema), bad, layout.columns, skipped, row_filter, usecols)
+            batches, rows = [], 0
+    if batches or bad.has_short or bad.skipped > reported:
+        yield _to_frame(pa.Table.from_batches(batches, reader.schema), bad, layout.columns, bad.skipped - reported, row_filter, usecols)
@@ -0,0 +1,72 @@
+import csv
+import io
+from collections import namedtuple
+
+import pandas as pd
+
+from core.source import open_binary
+
+# keywords: คำที่ต้องพบในแถวหัวตาราง, min_matches: จำนวนคำขั้นต่ำ (กันแถว metadata ด้านบน)
+HeaderSpec = namedtuple('HeaderSpec', ['keywords', 'min_matches'])
+# row: ลำดับบรรทัดจริงของหัวตาราง (นับจาก 0), columns: ชื่อคอลัมน์ที่ strip และไม่ซ้ำกันแล้ว
+HeaderLayout = namedtuple('HeaderLayout', ['row', 'columns'])
+
+PEEK_LINES = 100
+
+
+def dedupe_columns(cells):
+    # ตั้งชื่อแบบเดียวกับ pandas: ช่องว่าง -> Unnamed: i, ชื่อซ้ำ -> ชื่อ.1, ชื่อ.2
+    seen = {}
+    columns = []
+    for i, c in enumerate(cells):
+        name = str(c).replace('\xa0', ' ').strip()
+        if name in ('', 'nan', 'None'):
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def find_header_line(lines, spec):
+    """หาแถวหัวตารางจากบรรทัดข้อความ (vectorized ทั้งชุด) คืน index หรือ -1"""
+    if len(lines) == 0:
+        return -1
+    text = pd.Series(lines, dtype=object).fillna('').astype(str).str.replace('\xa0', ' ', regex=False).str.lower()
+    hits = sum(text.str.contains(kw.lower(), regex=False).astype(int) for kw in spec.keywords)
+    found = hits[hits >= spec.min_matches]
+    return int(found.index[0]) if len(found) else -1
+
+
+def locate_in_lines(lines, spec, sep):
+    # lines คือบรรทัดที่ decode แล้วช่วงต้นไฟล์ (ไม่ต้อง parse เป็น DataFrame)
+    h = find_header_line(lines, spec)
+    if h == -1:
+        return None
+    cells = next(csv.reader([lines[h].rstrip('\r\n')], delimiter=sep))
+    return HeaderLayout(h, dedupe_columns(cells))
+
+
+def locate_in_frame(df, spec, peek_rows=PEEK_LINES):
+    # สำหรับ Excel/HTML ที่อ่านมาแบบ header=None แล้ว: รวมแต่ละแถวเป็นบรรทัดเดียวแบบ vectorized
+    block = df.head(peek_rows).astype(object).where(df.head(peek_rows).notna(), '').astype(str)
+    if block.empty:
+        return None
+    lines = block.iloc[:, 0].str.cat([block.iloc[:, i] for i in range(1, block.shape[1])], sep='\t')
+    h = find_header_line(lines.tolist(), spec)
+    if h == -1:
+        return None
+    return HeaderLayout(h, dedupe_columns(df.iloc[h].tolist()))
+
+
+def read_head_lines(source, encoding, n=PEEK_LINES):
+    lines = []
+    with open_binary(source) as raw, io.TextIOWrapper(raw, encoding=encoding, errors='replace', newline='') as f:
+        for line in f:
+            lines.append(line)
+            if len(lines) >= n:
+                break
+    return lines
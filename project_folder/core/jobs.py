@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from core.metrics import METRICS_FILE
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+STATUS_LABELS = {
+    QUEUED: "⏳ รอคิว", RUNNING: "🚀 กำลังทำงาน", DONE: "✅ สำเร็จ", FAILED: "❌ ล้มเหลว", CANCELLED: "⛔ ยกเลิกแล้ว",
+}
+
+# ประวัติงานอัปโหลด (JSON lines) อยู่ข้างไฟล์ metrics
+JOBS_FILE = os.environ.get("DEPT_JOBS_FILE", os.path.join(os.path.dirname(METRICS_FILE), "upload_jobs.jsonl"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """สถานะของงานหนึ่งงาน (อ่านจากหน้าเว็บได้ระหว่างที่ worker thread เขียน)
+
+    ฟังก์ชันงานเรียก job.log / job.set_stage / job.progress เพื่อรายงานความคืบหน้า
+    job.progress และ job.check_cancelled จะ raise JobCancelled เมื่อผู้ใช้กดยกเลิก (ยกเลิกได้ระหว่างชุดข้อมูล)
+    """
+
+    def __init__(self, title, report=None, listener=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.title = title
+        self.report = report
+        self.status = QUEUED
+        self.stage = ""
+        self.done = 0
+        self.total = 0
+        self.messages = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._listener = listener
+        self._cancel = threading.Event()
+
+    def log(self, level, msg):
+        # level ตรงกับ st.* (info / success / warning / error) เหมือนข้อความของ FileResult
+        self.messages.append((level, msg))
+        if self._listener:
+            self._listener(level, msg)
+
+    def set_stage(self, msg):
+        self.stage = msg
+        self.check_cancelled()
+
+    def progress(self, done, total):
+        self.done, self.total = done, total
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def snapshot(self):
+        return {
+            "job_id": self.id, "title": self.title, "report": self.report, "status": self.status,
+            "created": datetime.fromtimestamp(self.created).isoformat(timespec='seconds'),
+            "seconds": round(self.seconds, 1), "done": self.done, "total": self.total,
+            "error": self.error, "result": {k: v for k, v in (self.result or {}).items() if k != "stages"},
+        }
+
+
+class JobRunner:
+    """คิวงานเบื้องหลังระดับ process: งานยังทำต่อแม้ Streamlit rerun หรือปิดแท็บ
+
+    max_workers=1 ทำให้งานอัปโหลดเรียงคิวทีละงาน (ไม่แย่งลบ/เขียนตารางเดียวกันพร้อมกัน)
+    """
+
+    def __init__(self, max_workers=1, keep=50, history_file=JOBS_FILE):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.keep = keep
+        self.history_file = history_file
+
+    def submit(self, title, fn, *args, **kwargs):
+        """ส่ง fn(job, *args, **kwargs) เข้าคิว คืน Job (ค่าที่ fn คืนเก็บใน job.result)
+
+        kwargs['report'] (ถ้ามี) ใช้จัดกลุ่มงานตามหน้ารายงานด้วย
+        """
+        job = Job(title, kwargs.get('report'))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status, job.finished = CANCELLED, time.time()
+            self._record(job)
+            return
+        job.status, job.started = RUNNING, time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+            job.log('warning', "⛔ งานถูกยกเลิก")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            job.log('error', f"❌ {e}")
+            job.log('expander', ("รายละเอียด error", traceback.format_exc()))
+        finally:
+            job.finished = time.time()
+            self._record(job)
+
+    def _trim(self):
+        # เก็บงานล่าสุดไว้ keep งาน (ไม่ลบงานที่ยังไม่จบ)
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.keep:
+                break
+            if self._jobs[job_id].status in FINISHED:
+                del self._jobs[job_id]
+
+    def _record(self, job):
+        if not self.history_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(job.snapshot(), ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            pass
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, report=None):
+        # งานล่าสุดก่อน
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if report is None or j.report == report]
+
+    def active(self, report=None):
+        return [j for j in self.jobs(report) if j.status not in FINISHED]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job.cancel()
+        return job
+
+
+# runner ระดับ process ใช้ร่วมกันทุกหน้า/ทุก session (เหมือน upload_cache)
+upload_jobs = JobRunner(max_workers=int(os.environ.get("DEPT_UPLOAD_WORKERS", "1")))
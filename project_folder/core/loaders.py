@@ -0,0 +1,263 @@
+import csv
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import text
+
+LOAD_METHODS = ["INSERT (to_sql multi)", "LOAD DATA LOCAL INFILE (Bulk)"]
+REPLACE_MODES = ["ลบข้อมูลเดิมแล้วนำเข้า (DELETE / TRUNCATE)", "ตาราง Staging + สลับตาราง (Atomic Swap)"]
+
+
+def _parse_session(spec):
+    # "foreign_key_checks=0,unique_checks=0" -> [('foreign_key_checks', '0'), ...] (รับเฉพาะชื่อ/ค่าแบบคำเดียว)
+    pairs = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        name, value = name.strip(), value.strip()
+        if not re.fullmatch(r"\w+", name) or not re.fullmatch(r"[\w.]+", value):
+            raise ValueError(f"DEPT_DB_BULK_SESSION ไม่ถูกต้อง: {item}")
+        pairs.append((name, value))
+    return pairs
+
+
+# ตัวแปร session ระหว่างนำเข้าชุดใหญ่ ตั้งบน connection ที่ใช้เขียนแล้วคืนค่า DEFAULT ก่อนคืนเข้า pool
+# unique_checks=0 เร็วขึ้นอีกแต่ MySQL จะไม่ตรวจ unique index รองระหว่างนำเข้า ใช้เมื่อมั่นใจว่าไม่มี key ซ้ำ
+# commit ทำทีละชุดอยู่แล้ว (autocommit ของ connection ปิดตามค่าเริ่มต้นของ SQLAlchemy)
+BULK_SESSION = _parse_session(os.environ.get("DEPT_DB_BULK_SESSION", "foreign_key_checks=0"))
+
+
+@contextmanager
+def bulk_session(conn, settings=None):
+    settings = BULK_SESSION if settings is None else settings
+    for name, value in settings:
+        conn.execute(text(f"SET SESSION {name} = {value}"))
+    try:
+        yield conn
+    finally:
+        try:
+            for name, _ in settings:
+                conn.execute(text(f"SET SESSION {name} = DEFAULT"))
+            conn.commit()
+        except Exception:
+            # คืนค่าไม่ได้ (connection เสีย) ทิ้ง connection นี้แทนการคืนเข้า pool พร้อมค่าที่ค้างอยู่
+            conn.invalidate()
+
+
+def insert_multi(df, table_name, engine, progress=None, ui_batch_size=20000, start=0, checkpoint=None):
+    # วิธีเดิม: to_sql แบบ multi-row INSERT แบ่งชุดเพื่ออัปเดตหน้าจอ
+    total_rows = len(df)
+    written = 0
+    # ใช้ connection เดียวจาก pool ตลอดการนำเข้า (commit ทีละชุด)
+    with engine.connect() as conn, bulk_session(conn):
+        for start_idx in range(start, total_rows, ui_batch_size):
+            end_idx = min(start_idx + ui_batch_size, total_rows)
+            chunk = df.iloc[start_idx:end_idx]
+            # เปิด transaction เอง: to_sql จะ commit เองถ้าไม่มี transaction ค้างอยู่ (checkpoint ต้อง commit พร้อมชุดข้อมูล)
+            if not conn.in_transaction():
+                conn.begin()
+            # ยังคงใช้ chunksize=1000 เพื่อความปลอดภัยของ Server ตามเดิม
+            chunk.to_sql(table_name, con=conn, if_exists='append', index=False, chunksize=1000, method='multi')
+            if checkpoint:
+                checkpoint(conn, end_idx)
+            conn.commit()
+            written += len(chunk)
+            if progress:
+                progress(end_idx, total_rows)
+    return written
+
+
+def _load_data_sql(table_name, columns):
+    col_list = ", ".join(f"`{c}`" for c in columns)
+    # รูปแบบมาตรฐานของ LOAD DATA: ไม่มี quote, \N คือค่า NULL, \\ \t \n \r ในข้อความ escape ด้วย backslash
+    return text(
+        f"LOAD DATA LOCAL INFILE :path INTO TABLE `{table_name}` CHARACTER SET utf8mb4 "
+        f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+        f"LINES TERMINATED BY '\\n' ({col_list})"
+    )
+
+
+# backslash ก่อน: escape ที่เติมทีหลังจะไม่ถูก escape ซ้ำ
+_INFILE_ESCAPES = [('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')]
+
+
+def infile_frame(df):
+    # escape ข้อความสำหรับ LOAD DATA (ข้อความ "NULL" จริงยังเป็นข้อความ ค่าว่างเขียนเป็น \N ผ่าน na_rep)
+    escaped = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            continue
+        s = s.astype('string')
+        if s.str.contains(r'[\\\t\n\r]', regex=True).any():
+            for old, new in _INFILE_ESCAPES:
+                s = s.str.replace(old, new, regex=False)
+            escaped[col] = s
+    return df.assign(**escaped) if escaped else df
+
+
+def bulk_load_infile(df, table_name, engine, progress=None, batch_rows=100000, tmp_dir=None, start=0, checkpoint=None):
+    """นำเข้าด้วย LOAD DATA LOCAL INFILE ทีละชุด (เขียน TSV ชั่วคราวแล้วให้ MySQL อ่านเอง)
+
+    engine ต้องสร้างด้วย connect_args={'local_infile': True}; คืนจำนวนแถวที่ MySQL รายงานว่านำเข้าแล้ว
+    """
+    total_rows = len(df)
+    stmt = _load_data_sql(table_name, list(df.columns))
+    loaded = 0
+    fd, tmp_path = tempfile.mkstemp(suffix='.tsv', dir=tmp_dir)
+    os.close(fd)
+    try:
+        with engine.connect() as conn, bulk_session(conn):
+            for start_idx in range(start, total_rows, batch_rows):
+                end_idx = min(start_idx + batch_rows, total_rows)
+                infile_frame(df.iloc[start_idx:end_idx]).to_csv(
+                    tmp_path, sep='\t', header=False, index=False, na_rep='\\N',
+                    encoding='utf-8', lineterminator='\n', quoting=csv.QUOTE_NONE
+                )
+                result = conn.execute(stmt, {"path": tmp_path.replace('\\', '/')})
+                if checkpoint:
+                    checkpoint(conn, end_idx)
+                conn.commit()
+                loaded += result.rowcount
+                if progress:
+                    progress(end_idx, total_rows)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return loaded
+
+
+def write_frame(df, table_name, engine, method, progress=None, start=0, checkpoint=None):
+    """เขียน df ลงตารางตามวิธีที่เลือกใน Sidebar คืนจำนวนแถวที่เขียนในรอบนี้
+
+    start: เริ่มที่แถวนี้ (ทำต่อจาก checkpoint), checkpoint(conn, แถวที่เขียนครบแล้ว) ถูกเรียกก่อน commit ของทุกชุด
+    """
+    if method == LOAD_METHODS[1]:
+        return bulk_load_infile(df, table_name, engine, progress, start=start, checkpoint=checkpoint)
+    return insert_multi(df, table_name, engine, progress, start=start, checkpoint=checkpoint)
+
+
+def delete_rows(engine, table_name, where=None, params=None, batch_rows=None, progress=None):
+    """ลบแถวเดิมก่อนนำเข้า: where=None คือ TRUNCATE ทั้งตาราง
+
+    batch_rows กำหนดแล้วจะลบทีละชุด (LIMIT) และ commit ทุกชุด ป้องกัน Timeout/Lock; คืนจำนวนแถวที่ลบ (TRUNCATE คืน None)
+    """
+    with engine.connect() as conn:
+        if not where:
+            conn.execute(text(f"TRUNCATE TABLE `{table_name}`"))
+            conn.commit()
+            return None
+        if not batch_rows:
+            result = conn.execute(text(f"DELETE FROM `{table_name}` WHERE {where}"), params or {})
+            conn.commit()
+            return result.rowcount
+
+        # นับจำนวนแถวที่จะลบก่อนเพื่อให้แสดง % ได้
+        total = conn.execute(text(f"SELECT COUNT(*) FROM `{table_name}` WHERE {where}"), params or {}).scalar()
+        deleted = 0
+        while total:
+            result = conn.execute(text(f"DELETE FROM `{table_name}` WHERE {where} LIMIT {int(batch_rows)}"), params or {})
+            conn.commit()
+            deleted += result.rowcount
+            if progress:
+                progress(deleted, total)
+            if result.rowcount == 0:
+                break
+        return deleted
+
+
+def writable_columns(conn, table_name):
+    # คอลัมน์ที่ INSERT ได้ตามลำดับในตาราง (ไม่รวม generated column)
+    rows = conn.execute(text(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t "
+        "AND EXTRA NOT LIKE '%GENERATED%' ORDER BY ORDINAL_POSITION"), {"t": table_name}).fetchall()
+    return [r[0] for r in rows]
+
+
+def staging_table(table_name):
+    return f"{table_name}__staging"
+
+
+def table_exists(engine, table_name):
+    with engine.connect() as conn:
+        return bool(conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"),
+            {"t": table_name}).scalar())
+
+
+def prepare_staging(engine, table_name, on_stage=None):
+    # สร้างตาราง staging ว่างโครงสร้างเดียวกับตารางจริง (ไม่คัดลอกแถวเดิม) คืนชื่อตาราง staging
+    staging = staging_table(table_name)
+    if on_stage:
+        on_stage(f"เตรียมตาราง {staging}")
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS `{staging}`, `{table_name}__old`"))
+        # LIKE คงโครงสร้าง index / partition ของตารางจริงไว้
+        conn.execute(text(f"CREATE TABLE `{staging}` LIKE `{table_name}`"))
+        conn.commit()
+    return staging
+
+
+def swap_in(engine, table_name, replace_where=None, params=None, on_stage=None):
+    """แทนที่แถวเดิมด้วยแถวใน staging แบบ atomic แล้วทิ้ง staging คืนจำนวนแถวเดิมที่ถูกแทนที่ (RENAME คืน None)
+
+    replace_where: DELETE แถวของขอบเขตนั้น + INSERT ... SELECT จาก staging ใน transaction เดียว
+    (ใช้ index ของเงื่อนไข เวลาขึ้นกับขนาดขอบเขต ไม่ใช่ทั้งตาราง; แถวนอกขอบเขตที่เขียนระหว่างนำเข้าไม่หาย)
+    None: RENAME TABLE สลับ staging เข้าแทนทั้งตารางในคำสั่งเดียว
+    ผู้อ่านเห็นข้อมูลชุดเก่าครบจนถึงตอน commit/RENAME ทำซ้ำได้ถ้ายังมี staging อยู่ (ลบขอบเขตเดิมก่อนเสมอ)
+    """
+    staging, old = staging_table(table_name), f"{table_name}__old"
+    if replace_where is None:
+        if on_stage:
+            on_stage(f"สลับ {staging} -> {table_name}")
+        with engine.connect() as conn:
+            conn.execute(text(f"RENAME TABLE `{table_name}` TO `{old}`, `{staging}` TO `{table_name}`"))
+        with engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS `{old}`"))
+            conn.commit()
+        return None
+    if on_stage:
+        on_stage(f"แทนที่ข้อมูลเดิมด้วย {staging}")
+    with engine.begin() as conn:
+        # ระบุคอลัมน์เอง: generated column (pea_group / period) เขียนค่าไม่ได้
+        cols = ", ".join(f"`{c}`" for c in writable_columns(conn, table_name))
+        replaced = conn.execute(text(f"DELETE FROM `{table_name}` WHERE {replace_where}"), params or {}).rowcount
+        conn.execute(text(f"INSERT INTO `{table_name}` ({cols}) SELECT {cols} FROM `{staging}`"))
+    drop_staging(engine, table_name)
+    return replaced
+
+
+def drop_staging(engine, table_name):
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS `{staging_table(table_name)}`"))
+        conn.commit()
+
+
+def swap_load(df, table_name, engine, method, replace_where=None, params=None, progress=None, on_stage=None):
+    """นำเข้าลงตาราง staging ก่อน แล้วแทนที่ข้อมูลเดิมแบบ atomic (swap_in)
+
+    replace_where คือเงื่อนไขเดียวกับที่ใช้ DELETE แถวเดิม (None = แทนที่ทั้งตาราง เหมือน TRUNCATE)
+    ตารางจริงไม่ถูกแตะจนนำเข้า staging ครบ ผู้อ่านจึงไม่เห็นข้อมูลหายหรือครึ่ง ๆ กลาง ๆ
+    on_stage(text) ใช้แจ้งขั้นตอนให้หน้าเว็บ; คืนจำนวนแถวใหม่ที่นำเข้า
+    """
+    staging = prepare_staging(engine, table_name, on_stage)
+    try:
+        if on_stage:
+            on_stage(f"นำเข้าข้อมูลใหม่เข้า {staging}")
+        loaded = write_frame(df, staging, engine, method, progress)
+        swap_in(engine, table_name, replace_where, params, on_stage)
+    except Exception:
+        # ตารางจริงยังไม่ถูกแตะ (transaction ของ swap_in rollback แล้ว) ทิ้ง staging แล้วส่ง error ต่อ
+        drop_staging(engine, table_name)
+        raise
+    return loaded
+
+
+def engine_kwargs(method):
+    # LOAD DATA LOCAL ต้องเปิด local_infile ฝั่ง client (pymysql)
+    kwargs = {"pool_pre_ping": True}
+    if method == LOAD_METHODS[1]:
+        kwargs["connect_args"] = {"local_infile": True}
+    return kwargs
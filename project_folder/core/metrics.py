@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:  # psutil ไม่บังคับ: ไม่มีจะใช้ resource (Linux/macOS) หรือไม่แสดงหน่วยความจำ
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ไฟล์สะสม metrics (JSON lines) ไว้เทียบย้อนหลังรายเดือน เปลี่ยนได้ด้วย env DEPT_METRICS_FILE
+METRICS_FILE = os.environ.get(
+    "DEPT_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "pipeline_metrics.jsonl"),
+)
+# ช่วงเวลาที่ thread สุ่มวัด RSS ระหว่างขั้นตอน (วินาที) สำหรับ peak_mb เปลี่ยนได้ด้วย env DEPT_METRICS_SAMPLE_S
+SAMPLE_INTERVAL = float(os.environ.get("DEPT_METRICS_SAMPLE_S", "0.02"))
+
+
+def rss_mb():
+    """RSS ปัจจุบันของ process เป็น MB หรือ None ถ้าวัดไม่ได้"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024**2
+    try:  # Linux ไม่มี psutil: หน้าที่อยู่ในหน่วยความจำจริง (คอลัมน์ที่ 2 ของ statm)
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_mb():
+    """peak RSS ตลอดอายุ process เป็น MB หรือ None ถ้าวัดไม่ได้ (ใช้เทียบได้เมื่อวัดใน process ใหม่ต่อกรณี เช่น bench.py)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024  # macOS รายงานเป็น bytes, Linux เป็น KB
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return info.peak_wset / 1024**2 if hasattr(info, 'peak_wset') else None  # peak_wset มีเฉพาะ Windows
+    return None
+
+
+@contextmanager
+def sample_peak(interval=None):
+    """วัด RSS สูงสุดระหว่าง block ด้วย thread ที่สุ่มวัดทุก interval วินาที
+
+    yield dict ที่หลังจบ block มี start_mb / end_mb / peak_mb (None ถ้าวัด RSS ไม่ได้)
+    peak_mb รวมค่าตอนเริ่มและตอนจบ จึงไม่ต่ำกว่าทั้งสองค่า; ค่าที่ขึ้นแล้วลงเร็วกว่า interval อาจหลุดได้
+    """
+    interval = SAMPLE_INTERVAL if interval is None else interval
+    info = {"start_mb": rss_mb(), "end_mb": None, "peak_mb": None}
+    if info["start_mb"] is None:
+        yield info
+        return
+    peak = [info["start_mb"]]
+    done = threading.Event()
+
+    def poll():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], rss_mb())
+
+    sampler = threading.Thread(target=poll, name="rss-sampler", daemon=True)
+    sampler.start()
+    try:
+        yield info
+    finally:
+        done.set()
+        sampler.join()
+        info["end_mb"] = rss_mb()
+        info["peak_mb"] = max(peak[0], info["end_mb"])
+
+
+class StageLog:
+    """เก็บเวลา / จำนวนแถว / หน่วยความจำ ของแต่ละขั้นตอนต่อไฟล์
+
+    ขั้นตอนชื่อเดียวกันของไฟล์เดียวกัน (เช่น clean ทีละ chunk) จะถูกรวมเป็นแถวเดียว
+    peak_mb: RSS สูงสุดระหว่างขั้นตอน (สุ่มวัดด้วย sample_peak, สูงสุดของทุก chunk)
+    rss_mb: RSS ตอนจบขั้นตอน (สูงสุดของทุก chunk) | rss_delta_mb: RSS ตอนจบ - ตอนเริ่ม (รวมทุก chunk)
+    ค่าเป็นของทั้ง process: ขั้นตอนที่ทำพร้อมกันหลาย thread จะนับรวมกัน
+    """
+
+    def __init__(self, report=None):
+        self.report = report
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._index = {}
+
+    def add(self, stage, seconds, rows=None, file=None, rss_mb=None, rss_delta_mb=None, peak_mb=None):
+        key = (stage, file)
+        rec = self._index.get(key)
+        if rec is None:
+            rec = {"stage": stage, "file": file, "seconds": 0.0, "rows": None, "rows_per_s": None,
+                   "peak_mb": None, "rss_mb": None, "rss_delta_mb": None, "pid": os.getpid()}
+            self._index[key] = rec
+            self.records.append(rec)
+        rec["seconds"] += seconds
+        if rows is not None:
+            rec["rows"] = (rec["rows"] or 0) + rows
+        if rec["rows"] and rec["seconds"] > 0:
+            rec["rows_per_s"] = rec["rows"] / rec["seconds"]
+        if peak_mb is not None:
+            rec["peak_mb"] = max(rec["peak_mb"] or 0, peak_mb)
+        if rss_mb is not None:
+            rec["rss_mb"] = max(rec["rss_mb"] or 0, rss_mb)
+        if rss_delta_mb is not None:
+            rec["rss_delta_mb"] = (rec["rss_delta_mb"] or 0) + rss_delta_mb
+        return rec
+
+    @contextmanager
+    def stage(self, stage, file=None, rows=None):
+        # ใช้ with log.stage("clean", name) as rec: ... rec["rows"] = n เพื่อระบุจำนวนแถวหลังทำเสร็จ
+        info = {"rows": rows}
+        start = time.perf_counter()
+        try:
+            with sample_peak() as mem:
+                yield info
+        finally:
+            seconds = time.perf_counter() - start
+            delta = mem["end_mb"] - mem["start_mb"] if mem["end_mb"] is not None else None
+            self.add(stage, seconds, info["rows"], file, mem["end_mb"], delta, mem["peak_mb"])
+
+    def extend(self, records):
+        # รวม records ที่ได้จาก worker (FileResult.stages)
+        for r in records or []:
+            self.add(r["stage"], r["seconds"], r["rows"], r["file"], r["rss_mb"], r["rss_delta_mb"],
+                     r.get("peak_mb"))["pid"] = r["pid"]
+
+    def write_jsonl(self, path=METRICS_FILE):
+        if not self.records:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ts = datetime.now().isoformat(timespec='seconds')
+        with open(path, "a", encoding="utf-8") as f:
+            for r in self.records:
+                f.write(json.dumps({"ts": ts, "run_id": self.run_id, "report": self.report, **r}, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def timed(log, stage, file=None, rows=None):
+    # เหมือน log.stage แต่ log เป็น None ได้ (ฟังก์ชัน clean ที่เรียกจากที่อื่นไม่ต้องส่ง log)
+    if log is None:
+        yield {"rows": rows}
+        return
+    with log.stage(stage, file, rows) as info:
+        yield info
@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from core.loaders import bulk_session
+from core.schema import AMOUNT
+
+# โครงสร้างตารางปลายทางที่แอปดูแลเอง
+# columns: {คอลัมน์: ชนิด SQL} ตามลำดับ, generated: {คอลัมน์: นิยาม STORED} ที่ MySQL คำนวณเอง
+# indexes: {ชื่อ index: [คอลัมน์]} สำหรับเงื่อนไขลบ/นับ (replace_predicate) ให้เป็น index range scan
+TableSpec = namedtuple('TableSpec', ['columns', 'generated', 'indexes', 'primary_key'], defaults=({}, {}, ()))
+
+DATE_TYPE = 'DATE'
+KEY_TYPE = 'VARCHAR(64)'  # คอลัมน์ข้อความที่อยู่ใน index (TEXT ทำ index ทั้งค่าไม่ได้)
+AMOUNT_TYPE = 'DECIMAL(18,2)'
+TEXT_TYPE = 'TEXT'
+
+# ข้อความวันที่ที่เคยเขียนไว้ (dd.mm.yyyy / yyyy-mm-dd [hh:mm:ss]) -> yyyy-mm-dd ก่อนเปลี่ยนชนิดเป็น DATE
+_PARSED_DATE = """CASE
+    WHEN `{col}` REGEXP '^[0-9]{{1,2}}[.][0-9]{{1,2}}[.][0-9]{{4}}$' THEN DATE_FORMAT(STR_TO_DATE(`{col}`, '%d.%m.%Y'), '%Y-%m-%d')
+    WHEN `{col}` REGEXP '^[0-9]{{4}}-[0-9]{{1,2}}-[0-9]{{1,2}}' THEN DATE_FORMAT(STR_TO_DATE(SUBSTRING_INDEX(`{col}`, ' ', 1), '%Y-%m-%d'), '%Y-%m-%d')
+    ELSE NULL END"""
+_NORMALISE_DATE = "UPDATE `{table}` SET `{col}` = " + _PARSED_DATE
+# แถวที่มีค่าแต่แปลงไม่ได้ (รูปแบบอื่น / วันที่ผิดเช่น 31.02.2026) จะกลายเป็น NULL
+_UNPARSEABLE_DATE = ("SELECT COUNT(*) FROM `{table}` WHERE TRIM(`{col}`) <> '' AND (" + _PARSED_DATE + ") IS NULL")
+# วันที่ผิด (เช่น 31.02.2026) เป็น NULL แทน error ของ strict mode
+_LENIENT = [("sql_mode", "''")]
+# ยอมให้ค่าที่แปลงไม่ได้เป็น NULL (ค่าเริ่มต้นหยุด migration แล้วแจ้งจำนวนแถว)
+ALLOW_DATE_LOSS = os.environ.get("DEPT_MIGRATE_NULL_BAD_DATES", "") == "1"
+
+
+class MigrationError(ValueError):
+    pass
+
+
+_checked = set()
+_lock = threading.Lock()
+
+
+def table_spec(module):
+    """TableSpec ของรายงานจาก ordered_cols / column_types / db_date_formats / generated_columns / table_indexes ของ module"""
+    generated = getattr(module, 'generated_columns', {})
+    indexes = getattr(module, 'table_indexes', {})
+    keys = {c for cols in indexes.values() for c in cols}
+    columns = {}
+    for col in module.ordered_cols:
+        if col in module.db_date_formats:
+            columns[col] = DATE_TYPE
+        elif col in keys:
+            columns[col] = KEY_TYPE
+        elif module.column_types.get(col) == AMOUNT:
+            columns[col] = AMOUNT_TYPE
+        else:
+            columns[col] = TEXT_TYPE
+    return TableSpec(columns, generated, indexes)
+
+
+def _base(sql_type):
+    return sql_type.split('(')[0].split()[0].lower()
+
+
+def create_sql(table_name, spec):
+    lines = [f"`{c}` {t}" for c, t in spec.columns.items()]
+    lines += [f"`{c}` {d}" for c, d in spec.generated.items()]
+    if spec.primary_key:
+        lines.append("PRIMARY KEY (" + ", ".join(f"`{c}`" for c in spec.primary_key) + ")")
+    lines += [f"INDEX `{name}` (" + ", ".join(f"`{c}`" for c in cols) + ")" for name, cols in spec.indexes.items()]
+    return f"CREATE TABLE IF NOT EXISTS `{table_name}` (\n    " + ",\n    ".join(lines) + "\n)"
+
+
+def _columns(conn, table_name):
+    rows = conn.execute(text(
+        "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"), {"t": table_name}).fetchall()
+    return {name: data_type.lower() for name, data_type in rows}
+
+
+def _indexes(conn, table_name):
+    rows = conn.execute(text(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"), {"t": table_name}).fetchall()
+    return {r[0] for r in rows}
+
+
+def has_table(conn, table_name):
+    return bool(_columns(conn, table_name))
+
+
+def migrate_table(conn, table_name, spec, allow_date_loss=None):
+    """สร้าง/ปรับตารางให้ตรง spec แบบ idempotent คืนรายการขั้นตอนที่ทำ (ว่าง = ตรงอยู่แล้ว)
+
+    ตารางเดิม: เพิ่มคอลัมน์ที่ขาด, คอลัมน์วันที่ที่เป็นข้อความแปลงเป็น DATE, คอลัมน์ใน index เป็น VARCHAR,
+    เพิ่ม generated column และ index (คอลัมน์ข้อความ/จำนวนเงินอื่นคงชนิดเดิม)
+    ข้อความวันที่ที่แปลงไม่ได้: raise MigrationError พร้อมจำนวนแถว ก่อนแก้ตาราง เว้นแต่ allow_date_loss (ค่าเริ่มต้น ALLOW_DATE_LOSS)
+    """
+    allow_date_loss = ALLOW_DATE_LOSS if allow_date_loss is None else allow_date_loss
+    existing = _columns(conn, table_name)
+    if not existing:
+        conn.execute(text(create_sql(table_name, spec)))
+        return [f"สร้างตาราง {table_name}"]
+
+    steps = []
+    for col, sql_type in spec.columns.items():
+        if col not in existing:
+            conn.execute(text(f"ALTER TABLE `{table_name}` ADD COLUMN `{col}` {sql_type}"))
+            steps.append(f"เพิ่มคอลัมน์ {col} {sql_type}")
+        elif sql_type in (DATE_TYPE, KEY_TYPE) and existing[col] != _base(sql_type):
+            lost = 0
+            with bulk_session(conn, _LENIENT):
+                if sql_type == DATE_TYPE and existing[col] not in ('datetime', 'timestamp'):
+                    lost = conn.execute(text(_UNPARSEABLE_DATE.format(table=table_name, col=col))).scalar() or 0
+                    if lost and not allow_date_loss:
+                        raise MigrationError(
+                            f"{table_name}.{col}: วันที่ {lost:,} แถวแปลงเป็น DATE ไม่ได้ (จะกลายเป็น NULL) หยุดการปรับโครงสร้าง "
+                            "ตรวจ/แก้ข้อมูลก่อน หรือตั้ง DEPT_MIGRATE_NULL_BAD_DATES=1 เพื่อยอมรับ")
+                    conn.execute(text(_NORMALISE_DATE.format(table=table_name, col=col)))
+                conn.execute(text(f"ALTER TABLE `{table_name}` MODIFY COLUMN `{col}` {sql_type}"))
+            steps.append(f"{col}: {existing[col]} -> {sql_type}" + (f" (วันที่แปลงไม่ได้ {lost:,} แถวเป็น NULL)" if lost else ""))
+    for col, definition in spec.generated.items():
+        if col not in existing:
+            conn.execute(text(f"ALTER TABLE `{table_name}` ADD COLUMN `{col}` {definition}"))
+            steps.append(f"เพิ่มคอลัมน์ {col} ({definition})")
+    indexes = _indexes(conn, table_name)
+    for name, cols in spec.indexes.items():
+        if name not in indexes:
+            conn.execute(text(f"ALTER TABLE `{table_name}` ADD INDEX `{name}` (" + ", ".join(f"`{c}`" for c in cols) + ")"))
+            steps.append(f"เพิ่ม index {name} ({', '.join(cols)})")
+    return steps
+
+
+def ensure_table(engine, table_name, spec):
+    # ตรวจครั้งเดียวต่อ (database, ตาราง) ต่อ process; ALTER ของ MySQL commit เองอยู่แล้ว
+    key = (engine.url.render_as_string(hide_password=True), table_name)
+    with _lock:
+        if key in _checked:
+            return []
+    with engine.connect() as conn:
+        steps = migrate_table(conn, table_name, spec)
+        conn.commit()
+    with _lock:
+        _checked.add(key)
+    return steps
@@ -0,0 +1,108 @@
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from core.sniff import record_format
+from core.source import DEFAULT_SPILL_DIR, source_name, upload_source
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow ไม่บังคับ: ถ้าไม่มีจะส่ง DataFrame กลับด้วย pickle ปกติ
+    pa = None
+
+# ผลการประมวลผลไฟล์หนึ่งไฟล์ (อ่าน + clean) ที่ส่งกลับมาให้หน้าเว็บแสดงผล
+# messages: [(level, text)] level คือชื่อฟังก์ชันของ st เช่น write / warning / error / info / expander
+# status: done = อ่านได้ (ย้ายเข้า Archive), rejected = ไฟล์ผิดประเภท (ลบทิ้ง), read_error = อ่านไม่ได้ (คงไว้)
+# stages: records เวลา/หน่วยความจำต่อขั้นตอนจาก StageLog (core/metrics.py)
+# summary: ยอดรวมที่สรุประหว่าง clean (เฉพาะรายงานที่มี เช่น zcanr030.summarize) หรือ None
+FileResult = namedtuple('FileResult', ['name', 'df', 'messages', 'kind', 'status', 'stages', 'summary'], defaults=(None, None))
+
+EXEC_MODES = ["ทีละไฟล์ (Sequential)", "ขนาน (Process Pool)"]
+
+
+def default_workers():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def pack_frame(df):
+    # แปลง DataFrame เป็น Arrow IPC bytes เพื่อส่งข้าม process ได้กะทัดรัด
+    if df is None or pa is None:
+        return ('pickle', df)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return ('pickle', df)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return ('arrow', sink.getvalue())
+
+
+def unpack_frame(packed):
+    kind, payload = packed
+    if kind == 'pickle':
+        return payload
+    with pa.ipc.open_stream(payload) as reader:
+        return reader.read_all().to_pandas()
+
+
+def _run_packed(fn, source, params):
+    res = fn(source, **params)
+    return res._replace(df=pack_frame(res.df))
+
+
+def run_files(fn, file_paths, params=None, parallel=False, max_workers=None):
+    """ประมวลผลไฟล์ด้วย fn(source, **params) -> FileResult และ yield ผลตามลำดับไฟล์ที่ส่งเข้ามา
+
+    file_paths เป็น path หรือ MemoryFile (core/source.py) ปนกันได้
+    parallel=True จะกระจายไฟล์ให้ process pool (fn ต้องเป็นฟังก์ชันระดับ module ที่ pickle ได้)
+    """
+    params = params or {}
+    if not parallel or len(file_paths) < 2:
+        for path in file_paths:
+            res = fn(path, **params)
+            record_format(res.kind)
+            yield res
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers or default_workers()) as pool:
+        futures = [pool.submit(_run_packed, fn, path, params) for path in file_paths]
+        # รอผลตามลำดับไฟล์ เพื่อให้ข้อความสถานะออกมาเรียงเหมือนโหมดทีละไฟล์
+        for path, fut in zip(file_paths, futures):
+            try:
+                res = fut.result()
+            except Exception as e:
+                name = source_name(path)
+                res = FileResult(name, ('pickle', None), [('error', f"❌ ประมวลผลไฟล์ {name} ใน worker ไม่สำเร็จ: {e}")], None, 'read_error')
+            record_format(res.kind)
+            yield res._replace(df=unpack_frame(res.df))
+
+
+def process_uploads(fn, uploads, params=None, report=None, cache=None, parallel=False, max_workers=None, spill_dir=DEFAULT_SPILL_DIR):
+    """uploads: [(name, bytes)] จาก file_uploader; ไฟล์ที่เนื้อหา+พารามิเตอร์เดิมอยู่ใน cache จะไม่ถูกอ่านใหม่
+
+    ไฟล์ถูกอ่านจากหน่วยความจำโดยตรง (MemoryFile) ยกเว้นไฟล์ใหญ่เกิน SPILL_BYTES ที่เขียนลง spill_dir ครั้งเดียว
+    yield (FileResult, source, from_cache, key) ตามลำดับไฟล์ โดย source (MemoryFile / path ของ spill) เป็น None
+    เมื่อได้ผลจาก cache และ key คือ cache key (เนื้อหาไฟล์ + พารามิเตอร์) ใช้เป็น version ของข้อมูลได้
+    """
+    params = params or {}
+    plan = []
+    for name, buffer in uploads:
+        key = cache.make_key(buffer, report, params) if cache is not None else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            plan.append((cached, None, key))
+            continue
+        plan.append((None, upload_source(name, buffer, spill_dir), key))
+
+    fresh = run_files(fn, [src for c, src, _ in plan if c is None], params, parallel=parallel, max_workers=max_workers)
+    for cached, source, key in plan:
+        if cached is not None:
+            record_format('cache')
+            yield cached, None, True, key
+            continue
+        res = next(fresh)
+        if key and res.status == 'done':
+            cache.put(key, res)
+        yield res, source, False, key
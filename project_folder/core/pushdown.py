@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+import numpy as np
+
+from core.columns import resolve_columns
+from core.dates import in_month, parse_dates
+from core.schema import clean_text
+
+try:
+    import pyarrow as pa
+except ImportError:  # ไม่มี pyarrow ก็กรองได้เฉพาะ DataFrame
+    pa = None
+
+# เงื่อนไขแถวที่ reader ใช้กรองระหว่างอ่าน (ก่อน clean / ก่อนสร้าง DataFrame เต็มทุกคอลัมน์)
+# report + target: ชื่อ layout และคอลัมน์ปลายทาง (หาหัวตารางดิบด้วย resolve_columns เหมือนตอน clean)
+# match(Series ของค่าดิบคอลัมน์เดียว) -> mask bool, label: ข้อความบอกผู้ใช้ว่ากรองอะไร
+RowFilter = namedtuple('RowFilter', ['report', 'target', 'match', 'label'])
+
+
+def prefix_filter(report, target, prefix):
+    # เช่น pea_code_main ขึ้นต้นด้วยเขตที่เลือก (strip แบบเดียวกับ clean_text)
+    return RowFilter(report, target, lambda s: clean_text(s).str.startswith(prefix).fillna(False).astype(bool),
+                     f"{target} ขึ้นต้นด้วย '{prefix}'")
+
+
+def month_filter(report, target, year, month):
+    # วันที่รูปแบบใดก็ได้ที่ parse_dates รองรับ อยู่ในเดือน/ปีที่เลือก
+    return RowFilter(report, target, lambda s: in_month(parse_dates(s), year, month).fillna(False).astype(bool),
+                     f"{target} เดือน {month:02d}/{year}")
+
+
+def raw_column(row_filter, columns):
+    # หัวตารางดิบของคอลัมน์ที่ใช้กรอง หรือ None (ไม่พบคอลัมน์ = ไม่กรอง ปล่อยให้ขั้น clean ตัดสิน)
+    for raw, target in resolve_columns(row_filter.report, tuple(columns)).rename.items():
+        if target == row_filter.target:
+            return raw
+    return None
+
+
+def filter_frame(df, row_filter):
+    """คืน (df เฉพาะแถวที่เข้าเงื่อนไข, จำนวนแถวที่ตัดทิ้ง)"""
+    col = raw_column(row_filter, df.columns) if row_filter is not None else None
+    if col is None or df.empty:
+        return df, 0
+    mask = row_filter.match(df[col]).to_numpy()
+    dropped = int(len(mask) - mask.sum())
+    return (df[mask] if dropped else df), dropped
+
+
+def filter_table(table, row_filter):
+    # Arrow table: แปลงเป็น pandas เฉพาะคอลัมน์ที่ใช้กรอง คอลัมน์อื่นไม่ถูกสร้างเป็น DataFrame สำหรับแถวที่ตัดทิ้ง
+    col = raw_column(row_filter, table.column_names) if row_filter is not None else None
+    if col is None or table.num_rows == 0:
+        return table, 0
+    mask = np.asarray(row_filter.match(table.column(col).to_pandas()), dtype=bool)
+    dropped = int(len(mask) - mask.sum())
+    return (table.filter(pa.array(mask)) if dropped else table), dropped
+
+
+def filtered_rows(df):
+    # จำนวนแถวที่ reader ตัดทิ้งตามเงื่อนไข (df.attrs['filtered_rows'])
+    return int(df.attrs.get('filtered_rows', 0)) if df is not None else 0
+
+
+def filtered_note(name, n, row_filter):
+    if not n:
+        return None
+    return ('info', f"⏩ ไฟล์ {name}: ข้าม {n:,} แถวตั้งแต่ตอนอ่าน (นอกเงื่อนไข {row_filter.label})")
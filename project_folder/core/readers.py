@@ -0,0 +1,141 @@
+import csv
+from collections import namedtuple
+
+import pandas as pd
+
+from core.columns import resolve_columns
+from core.fastcsv import arrow_enabled, iter_arrow, read_arrow
+from core.header import HeaderLayout, dedupe_columns, locate_in_frame, locate_in_lines, read_head_lines
+from core.pushdown import filter_frame
+from core.schema import clean_amount
+from core.source import open_source, text_read_kwargs
+
+# สิ่งที่รายงานต้องการจาก reader: report = ชื่อ layout (parse เฉพาะหัวตารางที่จับคู่ได้ คอลัมน์อื่นไม่ถูก decode)
+# amounts = คอลัมน์ปลายทางที่เป็นจำนวนเงิน ได้เป็น float64 ตั้งแต่ตอนอ่าน คอลัมน์อื่นเป็นข้อความเสมอ (รหัสไม่เสีย 0 นำหน้า)
+ReadContract = namedtuple('ReadContract', ['report', 'amounts'], defaults=((),))
+
+
+def locate_text_header(source, fmt, spec, fallback_row=None):
+    # อ่านแค่ช่วงต้นไฟล์ครั้งเดียวเพื่อหาหัวตาราง (utf16_tsv / csv)
+    lines = read_head_lines(source, fmt.encoding)
+    layout = locate_in_lines(lines, spec, fmt.sep)
+    if layout is None and fallback_row is not None and fallback_row < len(lines):
+        cells = next(csv.reader([lines[fallback_row].rstrip('\r\n')], delimiter=fmt.sep))
+        layout = HeaderLayout(fallback_row, dedupe_columns(cells))
+    return layout
+
+
+def projection(contract, columns):
+    # หัวตารางดิบที่รายงานใช้ (ตามลำดับในไฟล์) หรือ None = ทุกคอลัมน์
+    if contract is None:
+        return None
+    return list(resolve_columns(contract.report, tuple(columns)).rename) or None
+
+
+def _typed(df, contract):
+    # จำนวนเงิน: ตัด , แล้วเป็น float64 (หัวตารางที่ซ้ำกลางไฟล์ได้ 0.00 แล้วถูกตัดตอน clean)
+    if contract is not None and contract.amounts:
+        for raw, target in resolve_columns(contract.report, tuple(df.columns)).rename.items():
+            if target in contract.amounts:
+                df[raw] = clean_amount(df[raw])
+    return df
+
+
+def _text_read_kwargs(source, fmt, layout, usecols=None):
+    # เริ่มอ่านหลังบรรทัดหัวตารางเลย ไม่ต้อง parse ซ้ำเพื่อหา header; ทุกคอลัมน์เป็น str ไม่เดาชนิดข้อมูล
+    kwargs = dict(sep=fmt.sep, encoding=fmt.encoding, skiprows=layout.row + 1, header=None, dtype=str,
+                  names=layout.columns, on_bad_lines='skip', **text_read_kwargs(source))
+    if usecols:
+        kwargs['usecols'] = usecols
+    return kwargs
+
+
+def _filtered(df, row_filter):
+    df, dropped = filter_frame(df, row_filter)
+    df.attrs['filtered_rows'] = dropped
+    return df
+
+
+def iter_text_chunks(source, fmt, layout, chunksize=200000, row_filter=None, contract=None):
+    # อ่านไฟล์ TSV/CSV ทีละ chunk ทุกคอลัมน์เป็น str เพื่อให้ชนิดข้อมูลตรงกันทุก chunk
+    # row_filter กรองทีละ chunk ระหว่างอ่าน (attrs['filtered_rows'] = จำนวนแถวที่ตัดใน chunk นั้น)
+    usecols = projection(contract, layout.columns)
+    if arrow_enabled():
+        for chunk in iter_arrow(source, fmt, layout, chunksize, row_filter, usecols):
+            yield _typed(chunk, contract)
+        return
+    reader = pd.read_csv(open_source(source), chunksize=chunksize, **_text_read_kwargs(source, fmt, layout, usecols))
+    with reader:
+        for chunk in reader:
+            yield _typed(_filtered(chunk, row_filter), contract)
+
+
+def _frame_with_header(df, spec, fallback_row=None, row_filter=None, contract=None):
+    layout = locate_in_frame(df, spec)
+    if layout is None:
+        if fallback_row is None or fallback_row >= len(df):
+            return None, None
+        layout = HeaderLayout(fallback_row, dedupe_columns(df.iloc[fallback_row].tolist()))
+    body = df.iloc[layout.row + 1:]
+    body.columns = layout.columns
+    usecols = projection(contract, layout.columns)
+    if usecols:
+        body = body[usecols]
+    # กรองก่อน infer_objects / reset_index ไม่ต้องแปลงแถวที่ตัดทิ้ง
+    body, dropped = filter_frame(body, row_filter)
+    body = body.reset_index(drop=True).infer_objects()
+    body.attrs['filtered_rows'] = dropped
+    return _typed(body, contract), layout
+
+
+def read_report(source, fmt, spec, fallback_row=None, row_filter=None, contract=None):
+    """อ่านไฟล์ด้วย reader เดียวตามรูปแบบที่ sniff ได้ และหาหัวตารางด้วย locator เดียวกันทุกหน้า
+
+    source เป็น path หรือ MemoryFile (ไฟล์ที่อัปโหลดอ่านจากหน่วยความจำโดยตรง)
+    row_filter (core.pushdown.RowFilter): กรองแถวระหว่างอ่าน จำนวนที่ตัดทิ้งอยู่ใน df.attrs['filtered_rows']
+    contract (ReadContract): อ่านเฉพาะคอลัมน์ของรายงาน และแปลงจำนวนเงินตอนอ่าน (layout.columns ยังเป็นหัวตารางทั้งหมด)
+    คืนค่า (df, layout) หรือ (None, None) ถ้าไม่พบหัวตาราง
+    """
+    if fmt.kind in ('xlsx', 'xls'):
+        engine = 'openpyxl' if fmt.kind == 'xlsx' else 'xlrd'
+        # อ่านครั้งเดียวแบบ header=None แล้วตั้งหัวตารางจากแถวที่หาเจอ
+        return _frame_with_header(pd.read_excel(open_source(source), engine=engine, header=None), spec, fallback_row, row_filter, contract)
+
+    if fmt.kind == 'html':
+        tables = pd.read_html(open_source(source), encoding=fmt.encoding)
+        for table in tables:
+            # หัวตารางอยู่ใน <th> อยู่แล้ว
+            columns = [str(c) for c in table.columns]
+            if locate_in_lines(["\t".join(columns)], spec, '\t') is not None:
+                table.columns = dedupe_columns(columns)
+                usecols = projection(contract, table.columns)
+                layout = HeaderLayout(-1, list(table.columns))
+                return _typed(_filtered(table[usecols] if usecols else table, row_filter), contract), layout
+            df, layout = _frame_with_header(table, spec, row_filter=row_filter, contract=contract)
+            if df is not None:
+                return df, layout
+        return _frame_with_header(tables[0], spec, fallback_row, row_filter, contract) if tables else (None, None)
+
+    # utf16_tsv / csv: รู้ encoding และตัวคั่นแล้ว ใช้ Arrow CSV หลาย thread (ไม่มี pyarrow ใช้ C engine ของ pandas)
+    layout = locate_text_header(source, fmt, spec, fallback_row)
+    if layout is None:
+        return None, None
+    usecols = projection(contract, layout.columns)
+    if arrow_enabled():
+        return _typed(read_arrow(source, fmt, layout, row_filter, usecols), contract), layout
+    if row_filter is not None:
+        # C engine: อ่านทีละ chunk แล้วกรอง ไม่ต้องเก็บทั้งไฟล์ไว้ก่อนกรอง
+        chunks = list(iter_text_chunks(source, fmt, layout, row_filter=row_filter, contract=contract))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=usecols or layout.columns)
+        df.attrs['filtered_rows'] = sum(c.attrs.get('filtered_rows', 0) for c in chunks)
+        return df, layout
+    return _typed(pd.read_csv(open_source(source), **_text_read_kwargs(source, fmt, layout, usecols)), contract), layout
+
+
+def bad_lines(df):
+    # engine arrow นับบรรทัดที่จำนวนคอลัมน์เกินหัวตารางซึ่งถูกข้าม (pd.read_csv ข้ามเงียบ ๆ ไม่มีจำนวน)
+    return df.attrs.get('bad_lines', 0)
+
+
+def bad_lines_note(name, n):
+    return ('warning', f"⚠️ ไฟล์ {name}: ข้าม {n:,} บรรทัดที่จำนวนคอลัมน์เกินหัวตาราง") if n else None
@@ -0,0 +1,76 @@
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # ไม่มี pyarrow ใช้ string dtype ของ pandas แทน
+    pa = None
+
+# ข้อความ (ID, ชื่อ, เลขเอกสาร) เก็บเป็น Arrow string แทน Python object
+TEXT_DTYPE = pd.StringDtype('pyarrow') if pa is not None else pd.StringDtype()
+EMPTY_TOKENS = ['', 'nan', 'NaN', 'None']
+
+# ชนิดคอลัมน์ใน column_types ของแต่ละรายงาน (คอลัมน์ที่ไม่ระบุถือเป็น text)
+CATEGORY = 'category'   # รหัส/ประเภทที่ซ้ำกันมาก เช่น pea_code_main, doc_type
+AMOUNT = 'amount'       # จำนวนเงิน: ตัด , แล้วเป็น float64 ค่าว่างเป็น 0.00
+TEXT = 'text'
+
+
+def clean_text(s):
+    # strip + ค่าว่างเป็น NA ในรอบเดียว (cast ครั้งเดียว ไม่ต้อง fillna/astype(str) หลายรอบ)
+    s = s.astype(TEXT_DTYPE).str.strip()
+    return s.mask(s.isin(EMPTY_TOKENS))
+
+
+def clean_amount(s):
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype('float64').fillna(0.00)
+    return pd.to_numeric(s.astype(TEXT_DTYPE).str.replace(',', ''), errors='coerce').astype('float64').fillna(0.00)
+
+
+def _is_text(s):
+    return pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)
+
+
+def apply_schema(df, column_types, skip=()):
+    """แปลงทุกคอลัมน์ตาม column_types ในรอบเดียว (แก้ df ในที่ คืน df)
+
+    คอลัมน์ datetime / ตัวเลขที่ไม่ใช่ AMOUNT คงชนิดเดิม, คอลัมน์ใน skip ไม่แตะ
+    """
+    for col in df.columns:
+        if col in skip:
+            continue
+        kind = column_types.get(col, TEXT)
+        s = df[col]
+        if kind == AMOUNT:
+            df[col] = clean_amount(s)
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        elif _is_text(s) or s.isna().all():
+            s = clean_text(s)
+            df[col] = s.astype('category') if kind == CATEGORY else s
+    return df
+
+
+def concat_frames(frames):
+    # รวมหลายไฟล์โดยคง category (pd.concat ปกติจะกลายเป็น object ถ้า categories ต่างกัน)
+    frames = [f for f in frames if f is not None]
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].columns:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            # categories จาก cache (Arrow) กับที่เพิ่ง clean อาจมี dtype ต่างกัน จึงรวมเป็น object ก่อน
+            categories = pd.Index(pd.unique(pd.concat([f[col].cat.categories.to_series().astype(object) for f in frames])), dtype=object)
+            frames = [f.assign(**{col: f[col].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def frame_bytes(df):
+    if df is None:
+        return 0
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_note(before, after):
+    # ข้อความสรุปหน่วยความจำก่อน/หลัง clean สำหรับบรรทัดสถานะของแต่ละไฟล์
+    change = f" ({after / before - 1:+.0%})" if before else ""
+    return f"หน่วยความจำ {before / 1024**2:,.1f} → {after / 1024**2:,.1f} MB{change}"
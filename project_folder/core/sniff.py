@@ -0,0 +1,92 @@
+import csv
+import threading
+from collections import Counter, namedtuple
+
+from core.source import open_binary
+
+# ผลการตรวจรูปแบบไฟล์: kind = xls | xlsx | utf16_tsv | html | csv
+FileFormat = namedtuple('FileFormat', ['kind', 'encoding', 'sep'])
+
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_MAGIC = b'PK\x03\x04'
+UTF8_BOM = b'\xef\xbb\xbf'
+UTF16_BOMS = (b'\xff\xfe', b'\xfe\xff')
+HTML_MARKERS = ('<html', '<table', '<?xml', '<!doctype', '<workbook', '<meta', '<head', '<body')
+
+SNIFF_BYTES = 8192
+
+# นับว่าไฟล์แต่ละไฟล์ถูกส่งไปอ่านด้วยวิธีไหน (สะสมตลอดอายุ process)
+format_counter = Counter()
+_counter_lock = threading.Lock()
+
+
+def _utf16_without_bom(head):
+    # UTF-16 ไม่มี BOM: ข้อความ ASCII/ไทยจะมี byte 0x00 หรือ 0x0E สลับทุกตัว
+    sample = head[:512]
+    if len(sample) < 4:
+        return None
+    for half, encoding in ((sample[1::2], 'utf-16-le'), (sample[0::2], 'utf-16-be')):
+        if sum(1 for b in half if b in (0x00, 0x0E)) > len(half) * 0.3:
+            return encoding
+    return None
+
+
+def _detect_text_encoding(head):
+    data = head[len(UTF8_BOM):] if head.startswith(UTF8_BOM) else head
+    try:
+        data.decode('utf-8')
+        return 'utf-8-sig'
+    except UnicodeDecodeError as e:
+        # byte ท้ายอาจถูกตัดกลางตัวอักษร multibyte ตอนอ่านแค่ช่วงต้นไฟล์
+        if e.start >= len(data) - 3:
+            return 'utf-8-sig'
+    try:
+        data.decode('tis-620')
+        return 'tis-620'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _detect_sep(text):
+    lines = [ln for ln in text.splitlines()[:50] if ln.strip()]
+    if not lines:
+        return ','
+    try:
+        return csv.Sniffer().sniff("\n".join(lines), delimiters=',\t;|').delimiter
+    except csv.Error:
+        counts = {d: sum(ln.count(d) for ln in lines) for d in ',\t;|'}
+        return max(counts, key=counts.get)
+
+
+def sniff_bytes(head):
+    """จำแนกรูปแบบไฟล์จาก magic bytes และข้อความช่วงต้นไฟล์ (ไม่ต้อง parse ทั้งไฟล์)"""
+    if head.startswith(OLE2_MAGIC):
+        return FileFormat('xls', None, None)
+    if head.startswith(ZIP_MAGIC):
+        return FileFormat('xlsx', None, None)
+    if head[:2] in UTF16_BOMS:
+        return FileFormat('utf16_tsv', 'utf-16', '\t')
+    utf16_encoding = _utf16_without_bom(head)
+    if utf16_encoding:
+        return FileFormat('utf16_tsv', utf16_encoding, '\t')
+
+    encoding = _detect_text_encoding(head)
+    text = head.decode(encoding, errors='ignore')
+    probe = text.lstrip().lower()[:2048]
+    if probe.startswith('<') or any(m in probe for m in HTML_MARKERS):
+        # lxml ไม่รู้จักชื่อ utf-8-sig
+        return FileFormat('html', 'utf-8' if encoding == 'utf-8-sig' else encoding, None)
+    return FileFormat('csv', encoding, _detect_sep(text))
+
+
+def sniff_file(source):
+    # source: path หรือ MemoryFile (อ่านแค่ช่วงต้นไฟล์)
+    with open_binary(source) as f:
+        return sniff_bytes(f.read(SNIFF_BYTES))
+
+
+def record_format(kind):
+    # เรียกใน process หลักเท่านั้น (worker ของ process pool นับแยกกันไม่ได้)
+    if kind:
+        with _counter_lock:
+            format_counter[kind] += 1
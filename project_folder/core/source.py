@@ -0,0 +1,65 @@
+import io
+import os
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+# ไฟล์ที่อัปโหลดซึ่งอยู่ในหน่วยความจำ: name ใช้แสดงผล/ตั้งชื่อไฟล์ Archive, data เป็น bytes
+# (BytesIO ที่ห่อ bytes ไม่ copy ข้อมูล อ่านซ้ำกี่รอบก็ใช้หน่วยความจำก้อนเดิม)
+MemoryFile = namedtuple('MemoryFile', ['name', 'data'])
+
+# ไฟล์ใหญ่กว่านี้เขียนลงดิสก์ครั้งเดียว (spill) แล้วอ่านจากไฟล์แบบ memory map แทนการส่ง bytes ข้าม process
+SPILL_BYTES = int(os.environ.get("DEPT_SPILL_MB", "256")) * 1024 * 1024
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), "dept_spill")
+
+
+def user_dir(name):
+    """โฟลเดอร์เก็บไฟล์ของแอปเฉพาะผู้ใช้ (ไม่ใช่ temp ที่ทุกคนเขียนได้) สำหรับไฟล์ที่อ่านกลับด้วย pickle
+
+    Windows: %LOCALAPPDATA%\\dept\\<name>, อื่น ๆ: ~/.cache/dept/<name> (DEPT_DATA_DIR เปลี่ยนที่ตั้งได้)
+    """
+    base = os.environ.get("DEPT_DATA_DIR") or os.path.join(
+        os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"), "dept")
+    return os.path.join(base, name)
+
+
+def make_private_dir(path):
+    # สร้างโฟลเดอร์สิทธิ์เจ้าของเท่านั้น คืน False ถ้าเป็นของผู้ใช้อื่น (ไม่อ่าน pickle ที่คนอื่นวางไว้ได้)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return not hasattr(os, "getuid") or os.stat(path).st_uid == os.getuid()
+
+
+def source_name(source):
+    return source.name if isinstance(source, MemoryFile) else os.path.basename(source)
+
+
+def is_memory(source):
+    return isinstance(source, MemoryFile)
+
+
+def open_source(source):
+    # สิ่งที่ส่งให้ pandas ได้ทันที: path ของไฟล์ หรือ BytesIO ใหม่ (ตำแหน่งอ่านเริ่มที่ 0 ทุกครั้ง)
+    return io.BytesIO(source.data) if isinstance(source, MemoryFile) else source
+
+
+@contextmanager
+def open_binary(source):
+    with (io.BytesIO(source.data) if isinstance(source, MemoryFile) else open(source, 'rb')) as f:
+        yield f
+
+
+def text_read_kwargs(source):
+    # ไฟล์บนดิสก์ให้ C engine อ่านผ่าน memory map (ไม่ copy ไฟล์เข้า buffer ของ Python ก่อน)
+    return {} if isinstance(source, MemoryFile) else {"memory_map": True}
+
+
+def upload_source(name, buffer, spill_dir=DEFAULT_SPILL_DIR, spill_bytes=SPILL_BYTES):
+    """คืน source สำหรับ process_file จากไฟล์ที่อัปโหลด: MemoryFile หรือ path ของ spill file ถ้าใหญ่เกิน spill_bytes"""
+    if spill_bytes and len(buffer) > spill_bytes:
+        os.makedirs(spill_dir, exist_ok=True)
+        # โฟลเดอร์ชั่วคราวต่อไฟล์ ชื่อไฟล์จึงเป็นชื่อเดิม (ข้อความ/ชื่อใน Archive ไม่เปลี่ยน)
+        path = os.path.join(tempfile.mkdtemp(prefix="upload_", dir=spill_dir), name)
+        with open(path, "wb") as f:
+            f.write(buffer)
+        return path
+    return MemoryFile(name, bytes(buffer) if not isinstance(buffer, bytes) else buffer)
@@ -0,0 +1,144 @@
+import os
+from functools import partial
+
+import pandas as pd
+from sqlalchemy import text
+
+from core.migrations import TableSpec, has_table, migrate_table
+from core.upload import APPEND, DELTA
+from core.zcanr030 import group_column, refresh_procedures, summary_amounts, summary_keys
+
+# ยอดรวมของ dept_master ต่อ (กฟฟ., บิลเดือน, ประเภทธุรกิจ) สำหรับ Dashboard
+# คำนวณตอน clean (zcanr030.summarize) แล้ว upsert เฉพาะกลุ่ม/งวดที่อัปโหลด แทนการให้ Procedure สรุปใหม่ทั้งตาราง
+SUMMARY_TABLE = os.environ.get("DEPT_SUMMARY_TABLE", "dept_master_summary")
+SUMMARY_COLUMNS = summary_keys + ['row_count'] + summary_amounts
+
+# Procedure แบบจำกัดขอบเขต (สร้างใน MySQL): sp_refresh_dashboard_master_scoped(p_group VARCHAR, p_from DATE, p_to DATE)
+# p_from/p_to เป็น NULL = ทุกงวดของกลุ่ม ถ้ายังไม่มีใน Database จะรัน refresh_procedures แบบเต็มตารางแทน
+SCOPED_PROCEDURE = os.environ.get("DEPT_SCOPED_REFRESH", "sp_refresh_dashboard_master_scoped")
+
+SUMMARY_SPEC = TableSpec(
+    columns={
+        'pea_code_main': "VARCHAR(16) NOT NULL", 'bill_month': "DATE NOT NULL", 'bus_type': "VARCHAR(64) NOT NULL DEFAULT ''",
+        'row_count': "INT NOT NULL", 'outstanding_amount': "DECIMAL(18,2) NOT NULL", 'tax_amount': "DECIMAL(18,2) NOT NULL",
+        'updated_at': "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+    },
+    # เงื่อนไขเขตเดียวกับ dept_master (zcanr030.group_predicate)
+    generated=group_column,
+    indexes={'ix_group_month': ['pea_group', 'bill_month']},
+    primary_key=summary_keys,
+)
+
+
+def periods(summary):
+    # ช่วงบิลเดือนที่ upload นี้แตะ (min, max) เป็น 'YYYY-MM-DD'
+    if summary is None or summary.empty:
+        return None, None
+    months = pd.to_datetime(summary['bill_month'])
+    return f"{months.min():%Y-%m-%d}", f"{months.max():%Y-%m-%d}"
+
+
+def _fill_keys(df):
+    # key ใน MySQL เป็น NOT NULL: ประเภทธุรกิจว่างเก็บเป็น '' (เหมือน COALESCE ตอนสรุปจากตาราง)
+    for col in ('pea_code_main', 'bus_type'):
+        df[col] = df[col].astype(object).where(df[col].notna(), '').astype(str)
+    return df
+
+
+def _rows(summary):
+    rows = _fill_keys(summary[SUMMARY_COLUMNS].copy())
+    rows['bill_month'] = pd.to_datetime(rows['bill_month']).dt.strftime('%Y-%m-%d')
+    rows['row_count'] = rows['row_count'].astype('int64')
+    return [{k: (v.item() if hasattr(v, 'item') else v) for k, v in r.items()} for r in rows.to_dict('records')]
+
+
+def _insert_sql(additive):
+    cols = ", ".join(SUMMARY_COLUMNS)
+    values = ", ".join(f":{c}" for c in SUMMARY_COLUMNS)
+    # Append บวกเพิ่มจากยอดเดิม, Overwrite/Swap ยอดใหม่แทนที่ยอดเดิม
+    update = ", ".join(f"{c} = {c} + VALUES({c})" if additive else f"{c} = VALUES({c})"
+                       for c in ['row_count'] + summary_amounts)
+    return f"INSERT INTO {SUMMARY_TABLE} ({cols}) VALUES ({values}) ON DUPLICATE KEY UPDATE {update}"
+
+
+def _scope(where, month_from=None, month_to=None):
+    # เงื่อนไขของ summary table: กลุ่มเดียวกับ replace_where (+ ช่วงบิลเดือนถ้าระบุ)
+    clauses = [f"({where})"] if where else []
+    if month_from:
+        clauses.append("bill_month BETWEEN :month_from AND :month_to")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+
+def _aggregate(conn, table_name, scope="", params=None):
+    # สรุปยอดจากตารางหลักเข้า SUMMARY_TABLE (ขอบเขตตาม scope) คืนจำนวนแถว summary
+    result = conn.execute(text(
+        f"INSERT INTO {SUMMARY_TABLE} ({', '.join(SUMMARY_COLUMNS)}) "
+        "SELECT pea_code_main, bill_month, COALESCE(bus_type, ''), COUNT(*), "
+        "COALESCE(SUM(outstanding_amount), 0), COALESCE(SUM(tax_amount), 0) "
+        f"FROM {table_name}{scope or ' WHERE 1=1'} AND bill_month IS NOT NULL "
+        "GROUP BY pea_code_main, bill_month, COALESCE(bus_type, '')"), params or {})
+    return result.rowcount
+
+
+def upsert_summary(conn, summary, mode, table_name, where=None, params=None, delete_vanished=False):
+    """อัปเดต SUMMARY_TABLE เฉพาะขอบเขตที่ upload นี้แตะ คืน (จำนวนแถว summary, month_from, month_to)
+
+    Overwrite/Swap: ลบ summary ของกลุ่ม แล้วใส่ยอดที่คำนวณตอน clean (งวดที่หายไปก็ถูกแทนที่ด้วย)
+    Append: บวกยอดเพิ่มต่อ key, Delta: สรุปใหม่จาก table_name เฉพาะกลุ่ม/งวดที่แตะ (ไม่รู้ยอดของแถวที่ถูกแทนที่)
+    month_from/month_to เป็น None เมื่อทุกงวดของกลุ่มอาจเปลี่ยน
+    """
+    if not has_table(conn, SUMMARY_TABLE):
+        # ครั้งแรกหลังอัปเกรด: สร้างแล้วสรุปจากข้อมูลทั้งตาราง (รวมชุดที่เพิ่งนำเข้าแล้ว) ไม่ต้อง upsert ซ้ำ
+        migrate_table(conn, SUMMARY_TABLE, SUMMARY_SPEC)
+        return _aggregate(conn, table_name), None, None
+    migrate_table(conn, SUMMARY_TABLE, SUMMARY_SPEC)
+    rows = _rows(summary) if summary is not None else []
+    if mode == APPEND:
+        if rows:
+            conn.execute(text(_insert_sql(additive=True)), rows)
+        return len(rows), *periods(summary)
+    if mode == DELTA:
+        # business_key มี bill_month: แถวที่เปลี่ยนอยู่ในงวดของไฟล์ ยกเว้นลบ key ที่หายไปซึ่งอาจเป็นงวดใดก็ได้
+        month_from, month_to = (None, None) if delete_vanished else periods(summary)
+        scope = _scope(where, month_from, month_to)
+        scope_params = {**(params or {}), "month_from": month_from, "month_to": month_to}
+        conn.execute(text(f"DELETE FROM {SUMMARY_TABLE}{scope}"), scope_params)
+        return _aggregate(conn, table_name, scope, scope_params), month_from, month_to
+    conn.execute(text(f"DELETE FROM {SUMMARY_TABLE}{_scope(where)}"), params or {})
+    if rows:
+        conn.execute(text(_insert_sql(additive=False)), rows)
+    return len(rows), None, None
+
+
+def has_procedure(conn, name):
+    return bool(conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.ROUTINES "
+        "WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_TYPE = 'PROCEDURE' AND ROUTINE_NAME = :name"),
+        {"name": name}).scalar())
+
+
+def refresh_dashboard(conn, group, month_from=None, month_to=None):
+    """refresh Dashboard เฉพาะกลุ่ม/งวดถ้ามี SCOPED_PROCEDURE (งวดเป็น NULL = ทุกงวดของกลุ่ม) ไม่มีก็รันทั้งตาราง"""
+    if group and has_procedure(conn, SCOPED_PROCEDURE):
+        conn.execute(text(f"CALL {SCOPED_PROCEDURE}(:grp, :month_from, :month_to)"),
+                     {"grp": group, "month_from": month_from, "month_to": month_to})
+        months = f"บิลเดือน {month_from} ถึง {month_to}" if month_from else "ทุกงวด"
+        return f"{SCOPED_PROCEDURE} กลุ่ม {group} {months}"
+    for sql in refresh_procedures:
+        conn.execute(text(sql))
+    return "sp_refresh_dashboard_master (ทั้งตาราง)"
+
+
+def _dashboard(summary, group, mode, table_name, where, params, delete_vanished, full_refresh, conn):
+    written, month_from, month_to = upsert_summary(conn, summary, mode, table_name, where, params, delete_vanished)
+    # where=None = แทนที่ทั้งตาราง (TRUNCATE เช่นอัพโหลดเฉพาะ E) ทุกกลุ่มเปลี่ยน ต้อง refresh ทั้งตาราง
+    done = refresh_dashboard(conn, None if full_refresh or not where else group, month_from, month_to)
+    return f"summary {written:,} แถว ({SUMMARY_TABLE}) | {done}"
+
+
+def dashboard_step(summary, group, mode, table_name, where=None, params=None, delete_vanished=False, full_refresh=False):
+    """ขั้นตอนหลังนำเข้าสำหรับ run_upload(procedures=[...]): อัปเดต summary แล้ว refresh เฉพาะส่วนที่เปลี่ยน
+
+    คืน step(conn) แบบ partial (pickle ได้ เก็บลงแผนของงานที่ทำต่อได้ core/checkpoint.py)
+    """
+    return partial(_dashboard, summary, group, mode, table_name, where, params, delete_vanished, full_refresh)
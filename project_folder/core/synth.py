@@ -0,0 +1,246 @@
+import csv
+import html
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import openpyxl
+except ImportError:  # ไม่มี openpyxl สร้างไฟล์ xlsx ไม่ได้
+    openpyxl = None
+
+try:
+    import xlwt
+except ImportError:  # pandas ไม่เขียน .xls แบบ binary แล้ว ต้องมี xlwt ถึงจะสร้างรูปแบบนี้ได้
+    xlwt = None
+
+# ไฟล์จำลองรายงาน SAP สำหรับ bench.py: ค่าสุ่มแบบกำหนด seed ได้ หน้าตาเหมือนไฟล์ที่ export จริง
+# (preamble ด้านบน, หัวตารางภาษาไทย, หัวตารางซ้ำทุก header_every แถวแบบขึ้นหน้าใหม่)
+
+# ext: นามสกุลไฟล์ (SAP ตั้ง .xls ให้ไฟล์ที่จริงเป็นข้อความ), max_rows: จำนวนแถวสูงสุดของรูปแบบ
+Variant = namedtuple('Variant', ['ext', 'max_rows'])
+VARIANTS = {
+    'xlsx': Variant('.xlsx', 1048576),
+    'xls': Variant('.xls', 65536),
+    'utf16_tsv': Variant('.xls', None),
+    'html': Variant('.xls', None),
+    'csv_tis620': Variant('.csv', None),
+}
+HEADER_EVERY = 50000
+
+PEA_PREFIXES = ['D', 'E', 'F']
+FIRST_NAMES = ['สมชาย', 'สมหญิง', 'วิชัย', 'ประเสริฐ', 'มาลี', 'สุนีย์', 'บุญมี', 'อรุณ', 'กมล', 'ศรีสุดา']
+LAST_NAMES = ['ใจดี', 'แสงทอง', 'บุญมา', 'ศรีสุข', 'ทองคำ', 'มีสุข', 'พรหมมา', 'สายบัว']
+THAI_MONTHS = ['ม.ค.', 'ก.พ.', 'มี.ค.', 'เม.ย.', 'พ.ค.', 'มิ.ย.', 'ก.ค.', 'ส.ค.', 'ก.ย.', 'ต.ค.', 'พ.ย.', 'ธ.ค.']
+
+# (หัวตารางภาษาไทย, ชนิดค่า) ตามลำดับคอลัมน์ในไฟล์จริง ชนิดค่าดู _values
+REPORT_COLUMNS = {
+    'zcanr030': [
+        ('ประเภทธุรกิจ', ('choice', ['บ้านอยู่อาศัย', 'กิจการขนาดเล็ก', 'ราชการ'])), ('คลาสบัญชี', ('choice', ['01', '02', '03'])),
+        ('ชื่อ กฟฟ.(TRSG)', 'pea_name'), ('กฟฟ.(TRSG)', 'pea_code'), ('สาย', ('digits', 4)),
+        ('หมายเลขผู้ใช้ไฟฟ้า', 'ca'), ('ชื่อ-สกุล', 'name'), ('เลขที่เอกสาร CA', ('digits', 12)), ('สัญญา', ('digits', 10)),
+        ('คู่ค้าทางธุรกิจ', ('digits', 10)), ('บิลเดือน', 'month_slash'), ('เงินที่ค้างชำระ', 'amount'), ('ค่าภาษีฯ', 'amount'),
+        ('ประเภทการชำระเงิน', ('choice', ['เงินสด', 'หักบัญชี', 'ออนไลน์'])), ('บัญชีแยกประเภททั่วไป', ('choice', ['1102010101', '1102010102'])),
+        ('ประเภทอัตรา', ('choice', ['1.1.1', '1.1.2', '2.1.1'])), ('วันที่เอกสาร', 'date'), ('วันที่ครบกำหนด', 'date'),
+        ('ประเภทเอกสาร', ('choice', ['BL', 'IN', 'DN'])), ('รายการหลัก', ('choice', ['0100', '0200', '0300'])),
+        ('รายการย่อย', ('choice', ['0010', '0020'])), ('ล๊อคการติดตามหนี้', ('choice', ['', '', '', 'X'])),
+        ('เลขที่เอกสารผ่อนชำระ', ('sparse_digits', 12)), ('วันครบกำหนดแจ้งเตือน', 'date'),
+        ('ผลการวางหนังสือแจ้งเตือน', ('choice', ['', 'วางแล้ว', 'ไม่พบผู้ใช้ไฟ'])),
+    ],
+    'zcakr005': [
+        ('วันที่อนุมัติ', 'date'), ('ผลอนุมัติ', ('choice', ['อนุมัติ', 'ไม่อนุมัติ'])), ('รหัส กฟฟ.', 'pea_code'),
+        ('ชื่อ กฟฟ.', 'pea_name'), ('สายจดหน่วย', ('digits', 8)), ('หมายเลขผู้ใช้ไฟ', 'ca'), ('ชื่อผู้ใช้ไฟ', 'name'),
+        ('VIP', ('choice', ['', '', 'VIP'])), ('หมายเลขเอกสาร', ('digits', 12)), ('รายการ', ('choice', ['ค่าไฟฟ้า', 'ค่าธรรมเนียม'])),
+        ('บิลเดือน', 'month_thai'), ('จำนวนเงิน', 'amount'), ('วันที่ครบกำหนด', 'date'), ('DP', ('choice', ['01', '02'])),
+        ('รายละเอียด', ('choice', ['', 'ผ่อนชำระ', 'ขยายเวลา'])), ('วันที่เสนอ', 'date'), ('เอกสารเสนอ', ('digits', 10)),
+        ('ใบงาน', ('sparse_digits', 10)), ('พนักงาน', ('digits', 6)), ('หมายเหตุ', ('choice', ['', '', 'ติดต่อแล้ว'])),
+    ],
+    'zwmr019': [
+        ('รหัสการไฟฟ้า', 'pea_code'), ('ใบแจ้งดำเนินการ', ('digits', 12)), ('ผู้ปฏิบัติงาน', ('digits', 6)),
+        ('การดำเนินการ', ('choice', ['งดจ่ายไฟ', 'ต่อกลับ', 'ไม่พบผู้ใช้ไฟ'])), ('กิจกรรม PM', ('choice', ['ZD1', 'ZD2'])),
+        ('ประเภทกิจกรรม', ('choice', ['01', '02'])), ('Flag', ('choice', ['', 'X'])), ('เอกสารเสนองดจ่ายไฟ', ('digits', 12)),
+        ('วันที่แจ้งดำเนินการ', 'date'), ('วันที่กำหนดแล้วเสร็จ', 'date'), ('บัญชีแสดงสัญญา', 'ca'), ('ชื่อ-สกุล', 'name'),
+        ('เลขที่มิเตอร์ที่ดำเนินการ', ('digits', 9)), ('หน่วยอ่าน', ('digits', 5)), ('วันที่บันทึกจริง', 'date'),
+        ('วันที่ดำเนินการ', 'date'), ('เวลาที่ดำเนินการ', 'time'), ('ใบสั่งงาน', ('digits', 12)), ('ผู้บันทึกข้อมูล', ('digits', 6)),
+    ],
+}
+
+
+def columns_for(report, pm_activity=True):
+    # ZWMR019 แบบงดจ่ายไม่มีคอลัมน์กิจกรรม PM
+    cols = REPORT_COLUMNS[report]
+    if report == 'zwmr019' and not pm_activity:
+        cols = [c for c in cols if c[0] != 'กิจกรรม PM']
+    return cols
+
+
+def _digits(rng, n, width):
+    return pd.Series(rng.integers(0, 10 ** width, n)).astype(str).str.zfill(width)
+
+
+def _values(rng, kind, n, year, month):
+    """คืน array ของสตริง (หรือ float สำหรับ amount) ความยาว n ตามชนิดค่า"""
+    if isinstance(kind, tuple) and kind[0] == 'choice':
+        return np.array(kind[1], dtype=object)[rng.integers(0, len(kind[1]), n)]
+    if isinstance(kind, tuple) and kind[0] == 'digits':
+        return _digits(rng, n, kind[1]).to_numpy(dtype=object)
+    if isinstance(kind, tuple) and kind[0] == 'sparse_digits':
+        values = _digits(rng, n, kind[1]).to_numpy(dtype=object)
+        values[rng.random(n) < 0.8] = ''
+        return values
+    if kind == 'pea_code':
+        # รหัส กฟฟ. ประมาณ 300 รหัส กระจายทุกเขต D / E / F
+        codes = np.array([f"{p}{i:05d}" for p in PEA_PREFIXES for i in range(1, 101)], dtype=object)
+        return codes[rng.integers(0, len(codes), n)]
+    if kind == 'pea_name':
+        names = np.array([f"กฟฟ.สาขาที่ {i}" for i in range(1, 101)], dtype=object)
+        return names[rng.integers(0, len(names), n)]
+    if kind == 'ca':
+        # มีช่องว่างหน้า/หลังเหมือนไฟล์ SAP
+        return (' 020' + _digits(rng, n, 9) + ' ').to_numpy(dtype=object)
+    if kind == 'name':
+        first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)]
+        last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n)]
+        return first + ' ' + last
+    if kind == 'date':
+        days = pd.Series(rng.integers(1, 29, n)).astype(str).str.zfill(2)
+        return (days + f".{month:02d}.{year}").to_numpy(dtype=object)
+    if kind == 'month_slash':
+        return np.full(n, f"{month}/{year}", dtype=object)
+    if kind == 'month_thai':
+        return np.full(n, f"{THAI_MONTHS[month - 1]}-{(year + 543) % 100:02d}", dtype=object)
+    if kind == 'time':
+        seconds = rng.integers(8 * 3600, 17 * 3600, n)
+        return np.array([f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in seconds], dtype=object)
+    if kind == 'amount':
+        return np.round(rng.gamma(2.0, 800.0, n), 2)
+    raise ValueError(f"ไม่รู้จักชนิดค่า {kind}")
+
+
+def make_frame(report, rows, seed=0, year=2026, month=3, pm_activity=True):
+    """สร้างข้อมูลแถวของรายงาน (หัวตารางภาษาไทย) ค่า amount เป็น float, คอลัมน์อื่นเป็นสตริง"""
+    rng = np.random.default_rng(seed)
+    cols = columns_for(report, pm_activity)
+    return pd.DataFrame({header: _values(rng, kind, rows, year, month) for header, kind in cols})
+
+
+def preamble(report, year, month):
+    # แถว metadata ด้านบนของรายงาน SAP (ไม่ใช่หัวตาราง)
+    return [
+        [f"รายงาน {report.upper()}"],
+        [f"วันที่พิมพ์: 01.{month:02d}.{year}", "ผู้พิมพ์: SAPUSER"],
+        [f"งวด: {month:02d}/{year}"],
+        [],
+    ]
+
+
+def _text_amounts(df):
+    # ไฟล์ข้อความจาก SAP ใช้ตัวคั่นหลักพัน
+    out = df.copy()
+    for col in out.columns:
+        if out[col].dtype == 'float64':
+            out[col] = [f"{v:,.2f}" for v in out[col]]
+    return out
+
+
+def _pages(df, header_every):
+    # แบ่งเป็นหน้า ๆ ละ header_every แถว (หน้าถัดไปมีหัวตารางซ้ำ)
+    step = header_every or max(len(df), 1)
+    for start in range(0, max(len(df), 1), step):
+        yield start, df.iloc[start:start + step]
+
+
+def _write_text(df, path, report, year, month, encoding, sep, header_every):
+    body = _text_amounts(df)
+    header = list(df.columns)
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f, delimiter=sep, lineterminator='\r\n')
+        writer.writerows(preamble(report, year, month))
+        for _, page in _pages(body, header_every):
+            writer.writerow(header)
+            page.to_csv(f, sep=sep, header=False, index=False, lineterminator='\r\n')
+
+
+def _write_html(df, path, report, year, month, header_every):
+    # SAP "Spreadsheet (HTML)": ตารางเดียว หัวตารางอยู่ใน <td> ปนกับแถว metadata
+    body = _text_amounts(df)
+
+    def row(cells):
+        return "<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in cells) + "</tr>\n"
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<html><head><meta http-equiv="content-type" content="text/html; charset=utf-8"></head><body><table border="1">\n')
+        for cells in preamble(report, year, month):
+            f.write(row(cells or ['']))
+        for _, page in _pages(body, header_every):
+            f.write(row(body.columns))
+            f.writelines(row(cells) for cells in page.itertuples(index=False, name=None))
+        f.write("</table></body></html>\n")
+
+
+def _excel_rows(df, report, year, month, header_every):
+    yield from preamble(report, year, month)
+    for _, page in _pages(df, header_every):
+        yield list(df.columns)
+        yield from page.itertuples(index=False, name=None)
+
+
+def _write_xlsx(df, path, report, year, month, header_every):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    for cells in _excel_rows(df, report, year, month, header_every):
+        ws.append(list(cells))
+    wb.save(path)
+
+
+def _write_xls(df, path, report, year, month, header_every):
+    wb = xlwt.Workbook(encoding='utf-8')
+    ws = wb.add_sheet("Sheet1")
+    for r, cells in enumerate(_excel_rows(df, report, year, month, header_every)):
+        for c, value in enumerate(cells):
+            ws.write(r, c, value)
+    wb.save(path)
+
+
+def available_variants():
+    # รูปแบบที่สร้างได้ในเครื่องนี้ (ตาม library ที่ติดตั้ง)
+    return [v for v in VARIANTS if not (v == 'xlsx' and openpyxl is None) and not (v == 'xls' and xlwt is None)]
+
+
+def file_rows(rows, year, month, header_every, report):
+    # จำนวนแถวทั้งหมดในไฟล์ (preamble + หัวตารางทุกหน้า + ข้อมูล)
+    pages = -(-rows // header_every) if header_every else 1
+    return len(preamble(report, year, month)) + max(pages, 1) + rows
+
+
+def write_report(report, variant, rows, path, seed=0, year=2026, month=3, header_every=HEADER_EVERY, pm_activity=True):
+    """เขียนไฟล์จำลองรายงาน report ในรูปแบบ variant ลง path คืน path
+
+    ValueError ถ้ารูปแบบนั้นสร้างไม่ได้ในเครื่องนี้ หรือจำนวนแถวเกินขีดจำกัดของรูปแบบ (xls 65,536 / xlsx 1,048,576)
+    """
+    if variant not in available_variants():
+        raise ValueError(f"สร้างไฟล์รูปแบบ {variant} ไม่ได้ (ไม่มี library ที่ต้องใช้)")
+    limit = VARIANTS[variant].max_rows
+    if limit and file_rows(rows, year, month, header_every, report) > limit:
+        raise ValueError(f"{variant} รองรับสูงสุด {limit:,} แถวต่อชีต")
+    df = make_frame(report, rows, seed, year, month, pm_activity)
+    tmp_path = path + ".tmp"
+    if variant == 'utf16_tsv':
+        _write_text(df, tmp_path, report, year, month, 'utf-16', '\t', header_every)
+    elif variant == 'csv_tis620':
+        _write_text(df, tmp_path, report, year, month, 'tis-620', ',', header_every)
+    elif variant == 'html':
+        _write_html(df, tmp_path, report, year, month, header_every)
+    elif variant == 'xlsx':
+        _write_xlsx(df, tmp_path, report, year, month, header_every)
+    else:
+        _write_xls(df, tmp_path, report, year, month, header_every)
+    os.replace(tmp_path, path)
+    return path
+
+
+def synth_path(out_dir, report, variant, rows, seed=0):
+    os.makedirs(out_dir, exist_ok=True)
+    return os.path.join(out_dir, f"{report}_{variant}_{rows}_s{seed}{VARIANTS[variant].ext}")
@@ -0,0 +1,221 @@
+import os
+
+from sqlalchemy import text
+
+from core.archive import file_archiver
+from core.db import get_engine, pool_stats
+from core.delta import delta_load
+from core.checkpoint import DONE, FINISH, PREPARE, WRITE, LoadJournal, open_load, read_data, read_plan, release_load, start_load
+from core.loaders import delete_rows, prepare_staging, staging_table, swap_in, swap_load, table_exists, write_frame
+from core.metrics import StageLog
+from core.migrations import ensure_table
+
+# วิธีจัดการข้อมูลเดิม: ลบแล้วนำเข้า / staging + RENAME / ต่อท้าย / เขียนเฉพาะที่เปลี่ยน
+OVERWRITE, SWAP, APPEND, DELTA = 'overwrite', 'swap', 'append', 'delta'
+
+
+def db_url(user, password, host, name):
+    return f"mysql+pymysql://{user}:{password}@{host}/{name}"
+
+
+def run_procedures(conn, procedures):
+    # ขั้นตอนหลังนำเข้าใน transaction เดียว: SQL string หรือ callable(conn) ที่คืนข้อความสรุป (เช่น summary.dashboard_step)
+    notes = []
+    for step in procedures:
+        if callable(step):
+            note = step(conn)
+            if note:
+                notes.append(note)
+        else:
+            conn.execute(text(step))
+    return notes
+
+
+def run_upload(job, df, url, table_name, method, mode, report=None, to_db=None,
+               replace_where=None, replace_params=None, delete_batch=None,
+               business_key=None, amount_cols=(), delete_vanished=False,
+               procedures=(), verify=None, schema=None, cleanup_paths=(), persist_metrics=True,
+               resumable=False, resume=None):
+    """ขั้นตอนส่งข้อมูลเข้า MySQL ที่ทุกหน้าใช้ร่วมกัน (รันใน JobRunner หรือเรียกตรงจาก ingest.py)
+
+    job: core.jobs.Job สำหรับรายงานข้อความ/ความคืบหน้า และจุดยกเลิกระหว่างชุดข้อมูล
+    procedures: SQL หรือ callable(conn) ที่รันหลังนำเข้า (run_procedures)
+    verify: (sql, params) นับจำนวนแถวใน DB หลังนำเข้า, schema: core.migrations.TableSpec ของตารางปลายทาง
+    cleanup_paths: ไฟล์ที่ลบเมื่อสำเร็จ
+    resumable: เก็บข้อมูล + checkpoint ทุกชุด (core/checkpoint.py) ล้มเหลวแล้วทำต่อได้ด้วย resume_upload
+    resume: LoadJournal ของงานที่ทำต่อ (df เป็นข้อมูลหลัง to_db จาก spill แล้ว)
+    คืน dict ผลลัพธ์ (rows_written, total_rows, db_count, delta, load_id, pool, stages)
+    """
+    metrics = StageLog(report)
+    # engine/pool ใช้ร่วมกันทั้ง process ไม่ dispose หลังจบงาน
+    engine = get_engine(url, method)
+    result = {"rows_written": 0, "total_rows": 0, "db_count": None, "delta": None, "load_id": None}
+    load = resume
+    try:
+        df_db = df if resume is not None else to_db(df) if to_db is not None else df
+        total_rows = len(df_db)
+
+        # 🛠️ สร้าง/ปรับโครงสร้างตาราง (DATE, period, index) ก่อนใช้เงื่อนไขลบ/นับที่อิง index
+        if schema is not None:
+            job.set_stage(f"ตรวจโครงสร้างตาราง {table_name}")
+            with metrics.stage('migrate'):
+                for step in ensure_table(engine, table_name, schema):
+                    job.log('info', f"🛠️ {table_name}: {step}")
+
+        # 💾 เก็บข้อมูลหลัง to_db + แผนของงานไว้ในเครื่องก่อนแตะข้อมูลเดิม
+        if load is None and resumable:
+            job.set_stage("บันทึกข้อมูลสำหรับทำต่อ")
+            plan = dict(table_name=table_name, method=method, mode=mode, report=report,
+                        replace_where=replace_where, replace_params=replace_params, delete_batch=delete_batch,
+                        business_key=business_key, amount_cols=amount_cols, delete_vanished=delete_vanished,
+                        procedures=list(procedures), verify=verify, schema=schema, cleanup_paths=list(cleanup_paths))
+            with metrics.stage('spill', rows=total_rows):
+                load = start_load(engine, df_db, plan, report)
+            job.log('info', f"💾 งาน `{load.load_id}`: บันทึก checkpoint ทุกชุดข้อมูล (การเชื่อมต่อหลุดทำต่อได้จากชุดล่าสุด)")
+        elif load is not None:
+            job.log('info', f"↩️ ทำต่องาน `{load.load_id}` จากขั้น {load.stage} ({load.committed:,} / {total_rows:,} แถว commit แล้ว)")
+        result["load_id"] = load.load_id if load else None
+        stage = load.stage if load else PREPARE
+        start = load.committed if load and stage == WRITE else 0
+        checkpoint = load.checkpoint if load else None
+
+        # 🚩 จัดการข้อมูลเดิมตามโหมดที่เลือก (ทำต่อจากขั้น write ขึ้นไป = ลบ/เตรียม staging ไปแล้ว)
+        with metrics.stage('delete'):
+            if stage != PREPARE:
+                if mode in (OVERWRITE, SWAP):
+                    job.log('info', "⏭️ จัดการข้อมูลเดิมไปแล้วในรอบก่อน ข้ามขั้นตอนนี้")
+            elif mode == OVERWRITE:
+                job.set_stage("ล้างข้อมูลเดิม")
+                deleted = delete_rows(engine, table_name, replace_where, replace_params, batch_rows=delete_batch, progress=job.progress)
+                if deleted is None:
+                    job.log('success', f"✅ ล้างข้อมูลทั้งหมดในตาราง {table_name} เรียบร้อยแล้ว (TRUNCATE)")
+                else:
+                    job.log('success', f"✅ ลบข้อมูลเดิม {deleted:,} แถว" if deleted else "✅ ไม่พบข้อมูลเก่าที่ต้องลบ")
+            elif mode == SWAP:
+                job.log('info', "🔁 Atomic Swap: ข้อมูลเดิมจะถูกแทนที่หลังนำเข้า staging ครบ (ไม่ลบก่อนนำเข้า)")
+            elif mode == APPEND:
+                job.log('info', "⏭️ โหมด Append: ข้ามขั้นตอนการลบข้อมูลเก่า")
+
+        # ⏳ นำเข้าข้อมูลใหม่
+        job.set_stage(f"นำเข้าข้อมูลใหม่ {total_rows:,} แถว")
+        with metrics.stage('db_write', rows=total_rows - start):
+            if stage in (FINISH, DONE):
+                rows_written = total_rows
+                job.log('info', f"⏭️ นำเข้าครบ {total_rows:,} แถวแล้วในรอบก่อน")
+            elif mode == DELTA:
+                # Delta เทียบ hash กับข้อมูลใน DB ทุกครั้ง: ทำซ้ำทั้งขั้นตอนก็ได้ผลเดิม (แถวที่เขียนไปแล้วนับเป็นไม่เปลี่ยน)
+                delta = delta_load(df_db, table_name, engine, method, business_key, amount_cols, replace_where, replace_params,
+                                   delete_vanished=delete_vanished, progress=job.progress, on_stage=job.set_stage)
+                job.log('info', f"🧮 Delta: ใหม่ {delta['new_keys']:,} key | เปลี่ยน {delta['changed_keys']:,} key | "
+                                f"หายไป {delta['vanished_keys']:,} key{' (ลบแล้ว)' if delete_vanished else ''} | "
+                                f"ไม่เปลี่ยน {delta['unchanged']:,} แถว | ลบแถวเดิม {delta['deleted']:,} แถว")
+                result["delta"] = delta
+                rows_written, total_rows = delta['inserted'], delta['planned']
+            elif mode == SWAP and load is None:
+                rows_written = swap_load(df_db, table_name, engine, method, replace_where, replace_params,
+                                         progress=job.progress, on_stage=job.set_stage)
+                job.log('success', f"✅ สลับตาราง {table_name} เรียบร้อยแล้ว")
+            elif mode == SWAP:
+                # staging ค้างไว้เมื่อล้มเหลว ทำต่อเขียนเพิ่มเข้า staging เดิม
+                staging = staging_table(table_name)
+                if stage == WRITE and not table_exists(engine, staging):
+                    if start >= total_rows:
+                        # สลับ/แทนที่สำเร็จแล้ว (staging ถูกทิ้ง) แต่ยังไม่ได้บันทึกขั้น finish
+                        staging = None
+                    else:
+                        job.log('warning', f"⚠️ ไม่พบ {staging} เดิม เริ่มนำเข้าใหม่ทั้งหมด")
+                        stage, start = PREPARE, 0
+                if stage == PREPARE:
+                    prepare_staging(engine, table_name, on_stage=job.set_stage)
+                    with engine.begin() as conn:
+                        load.checkpoint(conn, 0)
+                    load.set_stage(WRITE)
+                if staging is not None:
+                    job.set_stage(f"นำเข้าข้อมูลใหม่เข้า {staging}")
+                    write_frame(df_db, staging, engine, method, progress=job.progress, start=start, checkpoint=checkpoint)
+                    swap_in(engine, table_name, replace_where, replace_params, on_stage=job.set_stage)
+                rows_written = total_rows
+                job.log('success', f"✅ สลับตาราง {table_name} เรียบร้อยแล้ว")
+            else:
+                if load is not None and stage == PREPARE:
+                    load.set_stage(WRITE)
+                if start:
+                    job.log('info', f"↩️ เริ่มนำเข้าที่แถว {start + 1:,} (ชุดก่อนหน้า commit แล้ว)")
+                rows_written = start + write_frame(df_db, table_name, engine, method, progress=job.progress,
+                                                   start=start, checkpoint=checkpoint)
+            if load is not None and load.stage != DONE:
+                load.set_stage(FINISH)
+        del df_db
+        result.update(rows_written=rows_written, total_rows=total_rows)
+
+        # ตรวจจำนวนแถวที่ MySQL รับจริงเทียบกับข้อมูลที่เตรียมไว้
+        if rows_written != total_rows:
+            job.log('warning', f"⚠️ จำนวนแถวที่นำเข้า ({rows_written:,}) ไม่ตรงกับข้อมูลที่เตรียมไว้ ({total_rows:,} แถว) กรุณาตรวจสอบ SHOW WARNINGS ใน MySQL")
+        else:
+            job.log('success', f"✅ ตรวจสอบจำนวนแถวตรงกัน: {rows_written:,} แถว ({method.split(' ')[0]})")
+
+        if procedures and stage != DONE:
+            job.set_stage("ประมวลผล Stored Procedures")
+            with metrics.stage('procedures'), engine.begin() as conn:
+                notes = run_procedures(conn, procedures)
+                if load is not None:
+                    # บันทึกขั้น done ใน transaction เดียวกัน: ทำต่อจะไม่บวกยอด summary ซ้ำ
+                    load.set_stage(DONE, conn)
+            for note in notes:
+                job.log('info', f"🧾 {note}")
+            job.log('success', "✅ ดำเนินการอัปเดต Procedures เสร็จเรียบร้อย")
+        elif load is not None and stage != DONE:
+            load.set_stage(DONE)
+
+        if verify is not None:
+            sql, params = verify
+            with engine.connect() as conn:
+                result["db_count"] = conn.execute(text(sql), params or {}).scalar()
+
+        # ลบไฟล์ต้นฉบับใน Archive หลังอัปโหลดสำเร็จ (รอไฟล์ที่ยังเขียนเบื้องหลังไม่เสร็จก่อน)
+        if cleanup_paths:
+            file_archiver.wait(timeout=300)
+        removed = 0
+        for path in cleanup_paths:
+            try:
+                if os.path.isfile(path):
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                job.log('warning', f"⚠️ ไม่สามารถลบไฟล์ {os.path.basename(path)}: {e}")
+        if removed:
+            job.log('info', f"🧹 ลบไฟล์ต้นฉบับใน Archive {removed} ไฟล์")
+        job.stage = "เสร็จสิ้น"
+        if load is not None:
+            release_load(load, finished=True)
+        return result
+    except Exception as e:
+        if load is not None:
+            load.fail(e)
+            release_load(load, finished=False)
+            job.log('warning', f"💾 งาน `{load.load_id}` ค้างอยู่ ทำต่อได้จากส่วนงานค้าง (เริ่มจากชุดล่าสุดที่ commit แล้ว)")
+        raise
+    finally:
+        result["pool"] = pool_stats(url)
+        result["stages"] = metrics.records
+        if persist_metrics:
+            try:
+                metrics.write_jsonl()
+            except OSError:
+                pass
+
+
+def resume_upload(job, load_id, url, report=None, persist_metrics=True):
+    """ทำงานที่ค้างต่อจาก checkpoint ล่าสุด ด้วยข้อมูลและแผนที่ run_upload(resumable=True) เก็บไว้ (ไม่อ่าน/clean ไฟล์ใหม่)
+
+    report ใช้จัดกลุ่มงานใน JobRunner เท่านั้น (รายงานจริงอยู่ในแผน)
+    """
+    job.set_stage("อ่านข้อมูลของงานที่ค้าง")
+    try:
+        plan = read_plan(load_id)["plan"]
+        load = open_load(get_engine(url, plan["method"]), load_id)
+        df = read_data(load_id)
+    except Exception:
+        release_load(LoadJournal(load_id, None), finished=False)
+        raise
+    return run_upload(job, df, url, resume=load, persist_metrics=persist_metrics, **plan)
@@ -0,0 +1,151 @@
+from core.columns import Column, ReportLayout, apply_layout, missing_note, register_layout, resolve_columns, target_columns
+from core.dates import parse_dates, format_dates, in_month
+from core.header import HeaderSpec
+from core.metrics import StageLog, timed
+from core.pipeline import FileResult
+from core.pushdown import filtered_note, filtered_rows, month_filter
+from core.readers import ReadContract, bad_lines, bad_lines_note, read_report
+from core.schema import CATEGORY, AMOUNT, apply_schema, clean_text, frame_bytes, memory_note
+from core.sniff import sniff_file
+from core.source import source_name
+
+# รูปแบบรายงาน: จับคู่หัวตารางแบบ "มีคำนี้อยู่" ตามลำดับ (กติกาที่มาก่อนชนะ)
+# A header row should have at least 2 keywords to avoid metadata rows
+header_keywords = ['วันที่อนุมัติ', 'หมายเลขผู้', 'CA', 'Contract Account', 'รหัส กฟฟ.', 'บิลเดือน', 'เอกสารเสนอ']
+LAYOUT = register_layout(ReportLayout(
+    name='ZCAKR005',
+    header=HeaderSpec(header_keywords, 2),
+    columns=[
+        Column('approve_date', contains=['วันที่อนุมัติ']),
+        Column('approve_status', contains=['ผลอนุ']),
+        Column('pea_code', contains=['รหัส กฟฟ']),
+        Column('pea_name', contains=['ชื่อ กฟฟ']),
+        Column('mru', contains=['สายจดหน่วย']),
+        Column('ca_no', contains=['หมายเลขผู้', 'CA']),
+        Column('customer_name', contains=['ชื่อผู้ใช้ไฟ']),
+        Column('vip_status', contains=['VIP']),
+        Column('doc_no', contains=['หมายเลขเอกสาร', 'เลขที่เอกสาร']),
+        Column('item_type', contains=['รายการ']),
+        Column('bill_month', contains=['บิลเดือน', 'รอบบิล']),
+        Column('amount', contains=['จำนวนเงิน']),
+        Column('due_date', contains=['วันที่ครบกำหนด']),
+        Column('dp', contains=['DP']),
+        Column('details', contains=['รายละเอียด']),
+        Column('prop_date', contains=['วันที่เสนอ']),
+        Column('prop_doc', contains=['เอกสารเสนอ']),
+        Column('work_order', contains=['ใบงาน']),
+        Column('employee', contains=['พนักงาน']),
+        Column('remark', contains=['หมายเหตุ']),
+    ],
+    required=['ca_no', 'approve_date'],
+))
+HEADER_SPEC = LAYOUT.header
+
+ordered_cols = target_columns(LAYOUT)
+header_labels = ['หมายเลขผู้', 'ca_no', 'วันที่อนุมัติ', 'รหัส กฟฟ.', 'หมายเลขผู้ใช้ไฟ']
+
+# รูปแบบวันที่ที่ตารางใน MySQL เก็บอยู่ (ใน DataFrame เก็บเป็น datetime64)
+db_date_formats = {
+    'bill_month': '%Y-%m-%d',
+    'approve_date': '%Y-%m-%d',
+    'due_date': '%Y-%m-%d',
+    'prop_date': '%Y-%m-%d',
+}
+# period = วันที่ 1 ของเดือนที่อนุมัติ (MySQL คำนวณเอง) ใช้ลบ/นับรายเดือนผ่าน index (core/migrations.py)
+generated_columns = {'period': "DATE AS (DATE_SUB(approve_date, INTERVAL DAY(approve_date) - 1 DAY)) STORED"}
+table_indexes = {'ix_period': ['period']}
+# ชนิดคอลัมน์หลัง clean (คอลัมน์อื่นเป็น Arrow string)
+column_types = {
+    'approve_status': CATEGORY, 'pea_code': CATEGORY, 'pea_name': CATEGORY, 'mru': CATEGORY,
+    'vip_status': CATEGORY, 'item_type': CATEGORY, 'dp': CATEGORY, 'employee': CATEGORY,
+    'amount': AMOUNT,
+}
+# reader parse เฉพาะคอลัมน์ใน LAYOUT รหัสเป็นข้อความ amount เป็นตัวเลขตั้งแต่ตอนอ่าน
+read_contract = ReadContract(LAYOUT.name, tuple(c for c, kind in column_types.items() if kind == AMOUNT))
+
+
+def clean_zcakr005(df_temp, log=None, file=None):
+    # 1-3. Rename, ensure all expected columns exist, select in order (ผลจับคู่ cache ตามชุดหัวตาราง)
+    df_temp = apply_layout(df_temp, LAYOUT)
+
+    # 5. Filter out duplicate headers, garbage rows, and empty essentials (ก่อนแปลงชนิดคอลัมน์อื่น)
+    df_temp['ca_no'] = clean_text(df_temp['ca_no'])
+    df_temp = df_temp[~df_temp['ca_no'].isin(header_labels) & df_temp['ca_no'].str.contains(r'\d').fillna(False).astype(bool)]
+
+    # 4. Strip whitespace / ค่าว่างเป็น NA / category / amount ตาม column_types ในรอบเดียว
+    df_temp = apply_schema(df_temp, column_types, skip=('ca_no', *db_date_formats))
+
+    # วันที่ทุกคอลัมน์ (bill_month แบบ "ก.พ.-69" / วันที่ dd.mm.yyyy) แปลงแบบ vectorized เป็น datetime64
+    with timed(log, 'dates', file, rows=len(df_temp)):
+        for col in db_date_formats:
+            df_temp[col] = parse_dates(df_temp[col])
+
+    # Final Null Check for Required Columns
+    # (Removed strict bill_month filter as requested)
+    return df_temp.dropna(how='all')
+
+
+def to_db_frame(df):
+    # แปลงวันที่กลับเป็นรูปแบบเดิมก่อนเขียนลง MySQL / ดาวน์โหลด CSV
+    return format_dates(df, db_date_formats)
+
+
+def filter_period(df, year, month):
+    # เก็บเฉพาะแถวที่ approve_date อยู่ในเดือนที่เลือก
+    return df[in_month(df['approve_date'], year, month)].copy()
+
+
+def replace_predicate(year, month):
+    # แถวเดิมของเดือนที่ถูกแทนที่ (period = เดือนของ approve_date)
+    return "period = :period", {"period": f"{year}-{month:02d}-01"}
+
+
+def process_file(source, period=None):
+    """อ่าน + clean ไฟล์ ZCAKR005 หนึ่งไฟล์ (ไม่เรียก streamlit เพื่อให้รันใน process pool ได้)
+
+    period: (ปี, เดือน) ของ approve_date ที่ต้องการ กรองตั้งแต่ตอนอ่าน (None = ทุกเดือน)
+    """
+    name = source_name(source)
+    kind = None
+    log = StageLog()
+    row_filter = month_filter(LAYOUT.name, 'approve_date', *period) if period else None
+    try:
+        # ตรวจรูปแบบจาก magic bytes ครั้งเดียว แล้วส่งให้ reader ที่ถูกต้องเพียงตัวเดียว
+        with log.stage('read', name) as stage:
+            fmt = sniff_file(source)
+            kind = fmt.kind
+            df_temp, layout = read_report(source, fmt, HEADER_SPEC, row_filter=row_filter, contract=read_contract)
+            stage['rows'] = len(df_temp) if df_temp is not None else 0
+    except Exception as e:
+        return FileResult(name, None, [('error', f"❌ Error logic ZCAKR005: {name}: {e}")], kind, 'read_error', log.records)
+
+    if df_temp is None:
+        return FileResult(name, None, [
+            ('error', f"❌ ไม่สามารถระบุรูปแบบไฟล์ หรือไม่พบหัวตารางในไฟล์ {name}"),
+            ('info', "💡 ไฟล์นี้ควรมีคอลัมน์อย่างน้อย 2 อย่าง: " + ", ".join(header_keywords)),
+        ], kind, 'read_error', log.records)
+
+    # หัวตารางทั้งหมดในไฟล์ (df_temp มีเฉพาะคอลัมน์ที่อ่าน)
+    raw_columns = [str(c) for c in layout.columns]
+    resolution = resolve_columns(LAYOUT.name, tuple(df_temp.columns))
+    if resolution.missing_required:
+        return FileResult(name, None, [
+            ('error', f"❌ ไฟล์ {name} ไม่มีคอลัมน์ที่จำเป็น: {', '.join(resolution.missing_required)}"),
+            ('expander', ("ตรวจสอบหัวตารางที่พบ", raw_columns)),
+        ], kind, 'rejected', log.records)
+    len_pushed = filtered_rows(df_temp)
+    notes = [m for m in [missing_note(resolution), bad_lines_note(name, bad_lines(df_temp)), filtered_note(name, len_pushed, row_filter)] if m]
+
+    len_raw = len(df_temp) + len_pushed
+    bytes_raw = frame_bytes(df_temp)
+    with log.stage('clean', name, rows=len(df_temp)):
+        df_temp = clean_zcakr005(df_temp, log, name)
+
+    if not df_temp.empty:
+        return FileResult(name, df_temp, notes + [('write', f"📊 **{name}**: อ่านได้ {len_raw:,} แถว | Cleaned {len(df_temp):,} แถว | รูปแบบ: {kind} | {memory_note(bytes_raw, frame_bytes(df_temp))}")], kind, 'done', log.records)
+
+    messages = notes + [('warning', f"⚠️ ไฟล์ {name}: ไม่มีข้อมูลที่ถูกต้องหลังจากทำความสะอาด")]
+    if len_raw > 0:
+        messages.append(('info', "💡 อาจเป็นเพราะระบบหาหัวตารางไม่เจอ หรือข้อมูลในไฟล์ไม่ตรงกับรูปแบบที่กำหนด"))
+        messages.append(('expander', ("ตรวจสอบหัวตารางที่พบ", raw_columns)))
+    return FileResult(name, None, messages, kind, 'done', log.records)
@@ -0,0 +1,213 @@
+import pandas as pd
+
+from core.columns import Column, ReportLayout, apply_layout, missing_note, register_layout, resolve_columns, target_columns
+from core.dates import parse_dates, format_dates
+from core.delta import hash_columns
+from core.header import HeaderSpec
+from core.metrics import StageLog, timed
+from core.pipeline import FileResult
+from core.pushdown import filtered_note, filtered_rows, prefix_filter
+from core.readers import ReadContract, read_report, locate_text_header, iter_text_chunks, bad_lines, bad_lines_note
+from core.schema import CATEGORY, AMOUNT, apply_schema, clean_text, concat_frames, frame_bytes, memory_note
+from core.sniff import sniff_file
+from core.source import source_name
+
+# รูปแบบรายงาน: ชื่อหัวตารางภาษาไทย -> ชื่อคอลัมน์ภาษาอังกฤษ (จับคู่แบบตรงทั้งคำ)
+HEADER_KEYWORD = 'หมายเลขผู้ใช้ไฟฟ้า'
+LAYOUT = register_layout(ReportLayout(
+    name='ZCANR030',
+    header=HeaderSpec([HEADER_KEYWORD], 1),
+    columns=[
+        Column('bus_type', ['ประเภทธุรกิจ']), Column('acc_class', ['คลาสบัญชี']),
+        Column('pea_name_trsg', ['ชื่อ กฟฟ.(TRSG)']), Column('pea_code_main', ['กฟฟ.(TRSG)']),
+        Column('line_code', ['สาย']), Column('ca_no', ['หมายเลขผู้ใช้ไฟฟ้า']),
+        Column('customer_name', ['ชื่อ-สกุล']), Column('ca_doc_no', ['เลขที่เอกสาร CA']),
+        Column('contract_no', ['สัญญา']), Column('bp_no', ['คู่ค้าทางธุรกิจ']),
+        Column('bill_month', ['บิลเดือน']), Column('outstanding_amount', ['เงินที่ค้างชำระ']),
+        Column('tax_amount', ['ค่าภาษีฯ']), Column('payment_type', ['ประเภทการชำระเงิน']),
+        Column('gl_account', ['บัญชีแยกประเภททั่วไป']), Column('rate_type', ['ประเภทอัตรา']),
+        Column('doc_date', ['วันที่เอกสาร']), Column('due_date', ['วันที่ครบกำหนด']),
+        Column('doc_type', ['ประเภทเอกสาร']), Column('main_item', ['รายการหลัก']),
+        Column('sub_item', ['รายการย่อย']), Column('dunning_lock', ['ล๊อคการติดตามหนี้', 'ล็อคการติดตามหนี้']),
+        Column('installment_doc_no', ['เลขที่เอกสารผ่อนชำระ']), Column('notice_due_date', ['วันครบกำหนดแจ้งเตือน']),
+        Column('notice_result', ['ผลการวางหนังสือแจ้งเตือน']),
+    ],
+    required=['ca_no', 'pea_code_main', 'bill_month'],
+))
+ordered_cols = target_columns(LAYOUT)
+HEADER_SPEC = LAYOUT.header
+# ไฟล์ xlsx/xls เดิมใช้ header=17 ตายตัว ใช้เป็นค่าสำรองเมื่อหาหัวตารางไม่เจอ
+FALLBACK_HEADER_ROW = 17
+header_labels = ['หมายเลขผู้ใช้ไฟฟ้า', 'ca_no', 'เลขที่เอกสาร CA', 'สัญญา']
+# รูปแบบวันที่ที่ตารางใน MySQL เก็บอยู่ (ใน DataFrame เก็บเป็น datetime64)
+db_date_formats = {'bill_month': '%Y-%m-%d'}
+# Procedure ที่ต้องรันหลังนำเข้า (หน้าเว็บและ ingest.py)
+refresh_procedures = ["CALL sp_refresh_dashboard_master();"]
+# ชนิดคอลัมน์หลัง clean (คอลัมน์อื่นเป็น Arrow string)
+column_types = {
+    'bus_type': CATEGORY, 'acc_class': CATEGORY, 'pea_name_trsg': CATEGORY, 'pea_code_main': CATEGORY,
+    'line_code': CATEGORY, 'payment_type': CATEGORY, 'gl_account': CATEGORY, 'rate_type': CATEGORY,
+    'doc_type': CATEGORY, 'main_item': CATEGORY, 'sub_item': CATEGORY, 'dunning_lock': CATEGORY,
+    'notice_result': CATEGORY, 'outstanding_amount': AMOUNT, 'tax_amount': AMOUNT,
+}
+amount_cols = [c for c, kind in column_types.items() if kind == AMOUNT]
+# reader parse เฉพาะคอลัมน์ใน LAYOUT รหัสเป็นข้อความ จำนวนเงินเป็นตัวเลขตั้งแต่ตอนอ่าน
+read_contract = ReadContract(LAYOUT.name, tuple(amount_cols))
+# คอลัมน์ที่ระบุแถวหนึ่งแถว ใช้เทียบข้อมูลเดิมในโหมด Delta (core/delta.py) และตัดแถวซ้ำข้ามไฟล์ (core/dedup.py)
+business_key = ['ca_doc_no', 'contract_no', 'bill_month', 'main_item', 'sub_item']
+# ยอดรวมต่อ กฟฟ./บิลเดือน/ประเภทธุรกิจ ที่สรุประหว่าง clean สำหรับ summary table ของ Dashboard (core/summary.py)
+summary_keys = ['pea_code_main', 'bill_month', 'bus_type']
+summary_amounts = ['outstanding_amount', 'tax_amount']
+# คอลัมน์ที่ MySQL คำนวณเอง + index ของเงื่อนไขลบ/นับต่อเขต (core/migrations.py)
+# group_column ใช้ร่วมกับ summary table (core/summary.py) ที่มี pea_code_main เหมือนกัน
+# key_hash / row_hash: hash ต่อแถวของโหมด Delta เก็บไว้ในตารางหลักเท่านั้น (คอลัมน์ตามลำดับที่ to_db_frame เขียน)
+group_column = {'pea_group': "CHAR(1) AS (LEFT(pea_code_main, 1)) STORED"}
+generated_columns = {**group_column, **hash_columns(ordered_cols, business_key, amount_cols)}
+table_indexes = {'ix_group_month': ['pea_group', 'bill_month'], 'ix_group_key': ['pea_group', 'key_hash']}
+
+
+def clean_zcanr030(df, selected_group, log=None, file=None):
+    """Step 1-6 + ตัวเลข/bill_month ของ ZCANR030 ใช้ได้ทั้งแบบทั้งไฟล์และทีละ chunk
+
+    คืนค่า (df_clean, len_group) โดย len_group คือจำนวนแถวหลังกรองเขต
+    """
+    # 1-3. Rename, select and order columns (จับคู่หัวตารางครั้งเดียวต่อรูปแบบไฟล์) คอลัมน์ที่ไม่มีจะได้ NaN
+    df = apply_layout(df, LAYOUT)
+
+    # 5. Filter group ก่อน เพื่อไม่ต้อง clean แถวที่จะถูกทิ้ง
+    pea_code = clean_text(df['pea_code_main'])
+    mask_group = pea_code.str.startswith(selected_group).fillna(False).astype(bool)
+    df = df[mask_group].copy()
+    len_group = len(df)
+    if df.empty:
+        return df, len_group
+    df['pea_code_main'] = pea_code[mask_group].astype('category')
+
+    # 6. Filter out headers, empty rows and invalid bill_month ก่อนแปลงชนิดคอลัมน์ที่เหลือ
+    df['ca_no'] = clean_text(df['ca_no'])
+    # Manage bill_month (M/YYYY -> วันที่ 1 ของเดือน) แปลงทั้งคอลัมน์ครั้งเดียว
+    with timed(log, 'dates', file, rows=len(df)):
+        df['bill_month'] = parse_dates(df['bill_month'])
+    mask = ~df['ca_no'].isin(header_labels) & df['ca_no'].str.contains(r'\d').fillna(False).astype(bool)
+    mask &= df['bill_month'].notna()
+    df = df[mask]
+
+    # 4. Clean text / category / amount ตาม column_types ในรอบเดียว (เฉพาะแถวที่เหลือ)
+    df = apply_schema(df, column_types, skip=('pea_code_main', 'ca_no', 'bill_month'))
+    df['pea_code_main'] = df['pea_code_main'].cat.remove_unused_categories()
+    return df, len_group
+
+
+def summarize(df):
+    # ยอดรวมต่อ summary_keys ของ chunk ที่ clean แล้ว (รวมหลาย chunk/ไฟล์ด้วย combine_summaries)
+    grouped = df.groupby(summary_keys, observed=True, dropna=False, sort=False)
+    out = grouped[summary_amounts].sum()
+    out.insert(0, 'row_count', grouped.size())
+    return out.reset_index()
+
+
+def combine_summaries(summaries):
+    parts = [s for s in summaries if s is not None and not s.empty]
+    if len(parts) <= 1:
+        return parts[0] if parts else None
+    df = pd.concat(parts, ignore_index=True)
+    return df.groupby(summary_keys, observed=True, dropna=False, sort=False)[['row_count'] + summary_amounts].sum().reset_index()
+
+
+def to_db_frame(df):
+    # แปลงวันที่กลับเป็นรูปแบบเดิมก่อนเขียนลง MySQL / ดาวน์โหลด CSV
+    return format_dates(df, db_date_formats)
+
+
+def replace_predicate(selected_group, whole_table=False):
+    # เงื่อนไขแถวเดิมที่ถูกแทนที่ในโหมด Overwrite (None = ทั้งตาราง เหมือน TRUNCATE)
+    if whole_table:
+        return None, {}
+    return group_predicate(selected_group)
+
+
+def group_predicate(selected_group):
+    # แถวของเขตผ่าน index ix_group_month (pea_group = อักษรแรกของ pea_code_main)
+    # ขอบเขตของโหมด Delta ด้วย (เขต E อย่างเดียวก็ไม่เทียบ/ลบแถวของเขตอื่น)
+    return "pea_group = :grp", {"grp": selected_group}
+
+
+def process_file(source, selected_group, streaming=False, chunk_rows=200000):
+    """อ่าน + clean ไฟล์ ZCANR030 หนึ่งไฟล์ (ไม่เรียก streamlit เพื่อให้รันใน process pool ได้)"""
+    name = source_name(source)
+    log = StageLog()
+    fmt = sniff_file(source)
+    # กรองเขตตั้งแต่ตอนอ่าน แถวของเขตอื่นไม่ต้อง strip / clean / copy
+    row_filter = prefix_filter(LAYOUT.name, 'pea_code_main', selected_group)
+    try:
+        # Streaming เฉพาะไฟล์ข้อความ (UTF-16 TSV / CSV), ไฟล์อื่นอ่านทั้งไฟล์
+        with log.stage('read', name):
+            layout = None
+            if streaming and fmt.kind in ('utf16_tsv', 'csv'):
+                layout = locate_text_header(source, fmt, HEADER_SPEC, fallback_row=FALLBACK_HEADER_ROW)
+            if layout is not None:
+                chunks = iter_text_chunks(source, fmt, layout, chunksize=int(chunk_rows), row_filter=row_filter, contract=read_contract)
+                columns = layout.columns
+            else:
+                df, _ = read_report(source, fmt, HEADER_SPEC, fallback_row=FALLBACK_HEADER_ROW, row_filter=row_filter, contract=read_contract)
+                if df is None:
+                    return FileResult(name, None, [('error', f"❌ ไม่พบหัวตารางในไฟล์ {name} ({fmt.kind})")], fmt.kind, 'read_error', log.records)
+                columns = df.columns
+                chunks = [df]
+                del df
+    except Exception as e:
+        return FileResult(name, None, [('error', f"❌ ไม่สามารถอ่านไฟล์ {name} ({fmt.kind}): {e}")], fmt.kind, 'read_error', log.records)
+
+    # ตรวจหัวตารางก่อน clean: ขาดคอลัมน์หลักถือว่าไม่ใช่ไฟล์ ZCANR030, ขาดคอลัมน์อื่นแจ้งเตือน
+    resolution = resolve_columns(LAYOUT.name, tuple(columns))
+    if resolution.missing_required:
+        return FileResult(name, None, [('error', f"❌ ไฟล์ {name} ไม่มีคอลัมน์ที่จำเป็น: {', '.join(resolution.missing_required)}")], fmt.kind, 'rejected', log.records)
+
+    len_raw = 0
+    len_group = 0
+    bytes_raw = 0
+    skipped_lines = 0
+    len_pushed = 0
+    cleaned_parts = []
+    summaries = []
+    messages = [m for m in [missing_note(resolution)] if m]
+    # 1-6. Clean, filter group, numbers และ bill_month ทีละ chunk
+    try:
+        chunks = iter(chunks)
+        while True:
+            # แบบ streaming เวลาอ่านเกิดตอนดึง chunk ถัดไป จึงจับเวลาแยกจาก clean
+            with log.stage('read', name) as stage:
+                chunk = next(chunks, None)
+                stage['rows'] = len(chunk) if chunk is not None else 0
+            if chunk is None:
+                break
+            len_pushed += filtered_rows(chunk)
+            len_raw += len(chunk) + filtered_rows(chunk)
+            bytes_raw += frame_bytes(chunk)
+            skipped_lines += bad_lines(chunk)
+            with log.stage('clean', name, rows=len(chunk)):
+                part, n_group = clean_zcanr030(chunk, selected_group, log, name)
+            len_group += n_group
+            if not part.empty:
+                cleaned_parts.append(part)
+                summaries.append(summarize(part))
+            del chunk, part
+    except Exception as e:
+        messages.append(('error', f"❌ อ่านไฟล์ {name} ไม่สำเร็จระหว่างประมวลผล (แถวที่ {len_raw:,}): {e}"))
+        cleaned_parts, summaries = [], []
+    del chunks
+    messages += [m for m in [bad_lines_note(name, skipped_lines), filtered_note(name, len_pushed, row_filter)] if m]
+    has_error = any(level == 'error' for level, _ in messages)
+
+    df_temp = None
+    if cleaned_parts:
+        df_temp = concat_frames(cleaned_parts)
+        del cleaned_parts
+        total_out = df_temp['outstanding_amount'].sum()
+        messages.append(('write', f"📊 **{name}**: อ่านได้ {len_raw:,} แถว | กลุ่ม {selected_group} {len_group:,} แถว | Cleaned {len(df_temp):,} แถว | ยอดรวม: {total_out:,.2f} | รูปแบบ: {fmt.kind} | {memory_note(bytes_raw, frame_bytes(df_temp))}"))
+    elif not has_error:
+        if len_group > 0:
+            messages.append(('warning', f"⚠️ ไฟล์ {name}: ไม่มีข้อมูลที่ถูกต้องหลังจากทำความสะอาด"))
+        else:
+            messages.append(('warning', f"⚠️ ไฟล์ {name}: ไม่มีข้อมูลกลุ่ม '{selected_group}' หรือแถวว่าง (อ่านได้ {len_raw:,} แถว)"))
+    return FileResult(name, df_temp, messages, fmt.kind, 'done', log.records, combine_summaries(summaries))
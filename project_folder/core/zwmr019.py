@@ -0,0 +1,163 @@
+from core.columns import Column, ReportLayout, apply_layout, missing_note, register_layout, resolve_columns, target_columns
+from core.dates import parse_dates, format_dates, in_month
+from core.header import HeaderSpec
+from core.metrics import StageLog, timed
+from core.pipeline import FileResult
+from core.pushdown import filtered_note, filtered_rows, month_filter
+from core.readers import ReadContract, bad_lines, bad_lines_note, read_report
+from core.schema import CATEGORY, apply_schema, clean_text, frame_bytes, memory_note
+from core.sniff import sniff_file
+from core.source import source_name
+
+# รูปแบบรายงาน: ชื่อหัวตารางภาษาไทย -> ชื่อคอลัมน์ภาษาอังกฤษ (จับคู่แบบตรงทั้งคำ)
+# Any keyword marks the header row
+header_keywords = ['บัญชีแสดงสัญญา', 'เลขที่สัญญา', 'CA', 'Contract Account', 'BA', 'รหัสการไฟฟ้า', 'PEA', 'ใบแจ้งดำเนินการ', 'Notice']
+LAYOUT = register_layout(ReportLayout(
+    name='ZWMR019',
+    header=HeaderSpec(header_keywords, 1),
+    columns=[
+        Column('pea_code_main', ['รหัสการไฟฟ้า']),
+        Column('notice_doc_no', ['ใบแจ้งดำเนินการ']),
+        Column('worker_id', ['ผู้ปฏิบัติงาน']),
+        Column('action_name', ['การดำเนินการ']),
+        Column('pm_activity', ['กิจกรรม PM']),
+        Column('activity_type', ['ประเภทกิจกรรม']),
+        Column('flag', ['Flag']),
+        Column('disconnect_doc_no', ['เอกสารเสนองดจ่ายไฟ']),
+        Column('notice_date', ['วันที่แจ้งดำเนินการ']),
+        Column('due_date', ['วันที่กำหนดแล้วเสร็จ']),
+        Column('ca_no', ['บัญชีแสดงสัญญา']),
+        Column('customer_name', ['ชื่อ-สกุล']),
+        Column('meter_no', ['เลขที่มิเตอร์ที่ดำเนินการ']),
+        Column('read_unit', ['หน่วยอ่าน']),
+        Column('actual_record_date', ['วันที่บันทึกจริง']),
+        Column('action_date', ['วันที่ดำเนินการ']),
+        Column('action_time', ['เวลาที่ดำเนินการ']),
+        Column('work_order_no', ['ใบสั่งงาน']),
+        Column('recorder_id', ['ผู้บันทึกข้อมูล']),
+    ],
+    required=['ca_no', 'action_date'],
+))
+HEADER_SPEC = LAYOUT.header
+
+ordered_cols = target_columns(LAYOUT) + ['activity_type_upload']
+header_labels = ['บัญชีแสดงสัญญา', 'ca_no', 'BA']
+date_cols = ['notice_date', 'due_date', 'actual_record_date', 'action_date', 'doc_date', 'notice_due_date']
+# ชนิดคอลัมน์หลัง clean (คอลัมน์อื่นเป็น Arrow string)
+column_types = {
+    'pea_code_main': CATEGORY, 'worker_id': CATEGORY, 'action_name': CATEGORY, 'pm_activity': CATEGORY,
+    'activity_type': CATEGORY, 'flag': CATEGORY, 'recorder_id': CATEGORY, 'activity_type_upload': CATEGORY,
+}
+# ใน DataFrame เก็บเป็น datetime64 (ใช้กรองเดือนได้ทันที) แปลงเป็น YYYY-MM-DD ตอนเขียนลง MySQL
+db_date_formats = {col: '%Y-%m-%d' for col in date_cols}
+# reader parse เฉพาะคอลัมน์ใน LAYOUT (ทุกคอลัมน์เป็นข้อความ ไม่มีจำนวนเงิน)
+read_contract = ReadContract(LAYOUT.name)
+# period = วันที่ 1 ของเดือน action_date (MySQL คำนวณเอง) + index ตามประเภทงานและเดือน (core/migrations.py)
+generated_columns = {'period': "DATE AS (DATE_SUB(action_date, INTERVAL DAY(action_date) - 1 DAY)) STORED"}
+table_indexes = {'ix_activity_period': ['activity_type_upload', 'period']}
+# key ของหนึ่งรายการดำเนินการ ใช้ตัดแถวที่ซ้ำข้ามไฟล์ (export ช่วงวันที่ทับกัน) ก่อนนำเข้า
+business_key = ['notice_doc_no', 'ca_no', 'action_date', 'action_time', 'activity_type_upload']
+
+
+def has_pm_activity(columns):
+    # "ต่อกลับ" files must have 'กิจกรรม PM' (pm_activity)
+    original_cols = [str(c).strip().replace('\xa0', ' ').lower() for c in columns]
+    return any('กิจกรรม' in col and 'pm' in col for col in original_cols) or ('pm_activity' in original_cols)
+
+
+def clean_zwmr019(df_temp, activity_type, log=None, file=None):
+    # 1-2. Rename and ensure all expected columns exist (ผลจับคู่ cache ตามชุดหัวตาราง)
+    df_temp = apply_layout(df_temp, LAYOUT, extra_cols=['activity_type_upload'])
+
+    # 3. Add activity_type_upload column
+    df_temp['activity_type_upload'] = activity_type
+
+    # 4. Strip whitespace / ค่าว่างเป็น NA / category ตาม column_types ในรอบเดียว
+    df_temp = apply_schema(df_temp, column_types, skip=date_cols)
+
+    # 5. Filter out duplicate headers and purely empty rows
+    if 'ca_no' in df_temp.columns:
+        # Filter out rows that look like headers
+        df_temp = df_temp[~df_temp['ca_no'].astype(str).isin(header_labels)]
+        # Ensure ca_no contains at least one digit (filters out random text/empty)
+        df_temp = df_temp[df_temp['ca_no'].astype(str).str.contains(r'\d', na=False)]
+        for col in df_temp.select_dtypes(include=['category']).columns:
+            df_temp[col] = df_temp[col].cat.remove_unused_categories()
+
+    # Drop rows where all columns are NaN
+    df_temp = df_temp.dropna(how='all')
+
+    if not df_temp.empty:
+        # Handle Date columns (แปลงครั้งเดียว คงเป็น datetime64 ให้หน้าเว็บกรองเดือนต่อได้โดยไม่ต้อง parse ซ้ำ)
+        with timed(log, 'dates', file, rows=len(df_temp)):
+            for col in date_cols:
+                if col in df_temp.columns:
+                    df_temp[col] = parse_dates(df_temp[col]).dt.normalize()
+
+        if 'action_time' in df_temp.columns:
+            df_temp['action_time'] = clean_text(df_temp['action_time'])
+    return df_temp
+
+
+def to_db_frame(df):
+    # แปลงวันที่กลับเป็นรูปแบบเดิมก่อนเขียนลง MySQL / ดาวน์โหลด CSV
+    return format_dates(df, db_date_formats)
+
+
+def filter_period(df, year, month):
+    # เก็บเฉพาะแถวที่ action_date อยู่ในเดือนที่เลือก
+    return df[in_month(df['action_date'], year, month)].copy()
+
+
+def replace_predicate(activity_type, year, month):
+    # แถวเดิมประเภทเดียวกันของเดือนที่ถูกแทนที่ (index ix_activity_period)
+    return "activity_type_upload = :act_type AND period = :period", {"act_type": activity_type, "period": f"{year}-{month:02d}-01"}
+
+
+def process_file(source, activity_type, period=None):
+    """อ่าน + clean ไฟล์ ZWMR019 หนึ่งไฟล์ (ไม่เรียก streamlit เพื่อให้รันใน process pool ได้)
+
+    period: (ปี, เดือน) ของ action_date ที่ต้องการ กรองตั้งแต่ตอนอ่าน (None = ทุกเดือน)
+    """
+    name = source_name(source)
+    kind = None
+    log = StageLog()
+    row_filter = month_filter(LAYOUT.name, 'action_date', *period) if period else None
+    try:
+        # ตรวจรูปแบบจาก magic bytes ครั้งเดียว แล้วส่งให้ reader ที่ถูกต้องเพียงตัวเดียว
+        with log.stage('read', name) as stage:
+            fmt = sniff_file(source)
+            kind = fmt.kind
+            df_temp, layout = read_report(source, fmt, HEADER_SPEC, row_filter=row_filter, contract=read_contract)
+            stage['rows'] = len(df_temp) if df_temp is not None else 0
+    except Exception as e:
+        return FileResult(name, None, [('error', f"❌ Error logic ZWMR019: {name}: {e}")], kind, 'read_error', log.records)
+
+    if df_temp is None:
+        return FileResult(name, None, [
+            ('error', f"❌ ไม่สามารถระบุรูปแบบไฟล์ หรือไม่พบหัวตารางในไฟล์ {name}"),
+            ('info', "💡 ไฟล์นี้ควรมีคอลัมน์ใดคอลัมน์หนึ่ง: " + ", ".join(header_keywords)),
+        ], kind, 'read_error', log.records)
+
+    resolution = resolve_columns(LAYOUT.name, tuple(df_temp.columns))
+    if resolution.missing_required:
+        return FileResult(name, None, [('error', f"❌ ไฟล์ {name} ไม่มีคอลัมน์ที่จำเป็น: {', '.join(resolution.missing_required)}")], kind, 'rejected', log.records)
+    # ไฟล์งดจ่ายไม่มีกิจกรรม PM อยู่แล้ว ไม่ต้องเตือน
+    len_pushed = filtered_rows(df_temp)
+    notes = [m for m in [missing_note(resolution, ignore=['pm_activity']), bad_lines_note(name, bad_lines(df_temp)),
+                         filtered_note(name, len_pushed, row_filter)] if m]
+
+    # Check if it's a "ต่อกลับ" file when user selected "ต่อกลับ" mode
+    pm = has_pm_activity(layout.columns)
+    if activity_type == "ต่อกลับ" and not pm:
+        return FileResult(name, None, [('error', f"❌ ไฟล์ {name} ไม่ใช่ไฟล์ประเภท 'ต่อกลับ' (ไม่พบคอลัมน์ 'กิจกรรม PM') กรุณาตรวจสอบและเลือกประเภทข้อมูลให้ถูกต้อง")], kind, 'rejected', log.records)
+    if activity_type == "งดจ่าย" and pm:
+        return FileResult(name, None, [('error', f"❌ ไฟล์ {name} ไม่ใช่ไฟล์ประเภท 'งดจ่าย' (พบคอลัมน์ 'กิจกรรม PM' ซึ่งเป็นส่วนหนึ่งของไฟล์ต่อกลับ) กรุณาตรวจสอบและเลือกประเภทข้อมูลให้ถูกต้อง")], kind, 'rejected', log.records)
+
+    len_raw = len(df_temp) + len_pushed
+    bytes_raw = frame_bytes(df_temp)
+    with log.stage('clean', name, rows=len(df_temp)):
+        df_temp = clean_zwmr019(df_temp, activity_type, log, name)
+    if not df_temp.empty:
+        return FileResult(name, df_temp, notes + [('write', f"📊 **{name}**: อ่านได้ {len_raw:,} แถว | Cleaned {len(df_temp):,} แถว | รูปแบบ: {kind} | {memory_note(bytes_raw, frame_bytes(df_temp))}")], kind, 'done', log.records)
+    return FileResult(name, None, notes + [('warning', f"⚠️ ไฟล์ {name}: ไม่มีข้อมูลหลังจากทำความสะอาด")], kind, 'done', log.records)
@@ -0,0 +1,342 @@
+"""นำเข้าไฟล์ ZCANR030 / ZCAKR005 / ZWMR019 แบบไม่ต้องเปิดหน้าเว็บ (ใช้ pipeline เดียวกับ Streamlit)
+
+ตัวอย่าง:
+    python ingest.py run zcanr030 D:\\exports\\ZBLR030_*.xls --scope e-only --method bulk
+    python ingest.py run zcakr005 file1.xlsx file2.xls --year 2026 --month 3 --replace swap
+    python ingest.py run zwmr019 *.xlsx --activity-type งดจ่าย --year 2026 --month 3 --dry-run
+    python ingest.py resume zcanr030-20260318-101500-1a2b3c
+    python ingest.py watch zcanr030 --dir D:\\work\\บน\\dept\\project_folder\\convert --interval 60
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+
+from core import zcakr005, zcanr030, zwmr019
+from core.checkpoint import abandon_load, pending_loads
+from core.db import dispose_engines, get_engine
+from core.dedup import KeyIndex, duplicate_note
+from core.export import format_for_path, write_export
+from core.loaders import LOAD_METHODS
+from core.metrics import StageLog
+from core.migrations import table_spec
+from core.pipeline import default_workers, run_files
+from core.schema import concat_frames
+from core.summary import dashboard_step
+from core.upload import APPEND, DELTA, OVERWRITE, SWAP, db_url, resume_upload, run_upload
+
+BASE_DIR = r"D:\work\บน\dept\project_folder\convert"
+ARCHIVE_NAME = "Completed_Archive"
+FAILED_NAME = "Failed"
+WATCH_EXTENSIONS = ('.xls', '.xlsx', '.csv', '.txt', '.tsv')
+
+DEFAULT_TABLES = {
+    'zcanr030': "dept_master",
+    'zcakr005': "dept_zcakr005_master",
+    'zwmr019': "dept_activity_master",
+}
+METHOD_CHOICES = {'insert': LOAD_METHODS[0], 'bulk': LOAD_METHODS[1]}
+
+
+def log_line(msg):
+    print(f"[{datetime.now():%H:%M:%S}] {msg}", flush=True)
+
+
+def print_messages(messages):
+    # ข้อความจาก process_file เขียนไว้สำหรับ st.* (markdown) จึงตัด ** ออกก่อนพิมพ์
+    for level, payload in messages:
+        if level == 'expander':
+            title, content = payload
+            log_line(f"  {title}: {content}")
+        else:
+            log_line(f"  [{level}] {str(payload).replace('**', '')}")
+
+
+class ConsoleJob:
+    """แทน core.jobs.Job ตอนเรียก run_upload จาก command line: ข้อความและความคืบหน้าพิมพ์ลง console"""
+
+    stage = ""
+
+    def log(self, level, msg):
+        print_messages([(level, msg)])
+
+    def set_stage(self, msg):
+        self.stage = msg
+        log_line(f"  {msg}")
+
+    def progress(self, done, total):
+        log_line(f"  {self.stage}: {done:,} / {total:,} แถว ({min(done / max(total, 1), 1.0) * 100:.1f}%)")
+
+
+def build_plan(report, args):
+    """คืน (process_file, params, filter_fn, replace_where, replace_params, procedures) ของรายงาน"""
+    if report == 'zcanr030':
+        group = 'E' if args.scope == 'e-only' else args.group
+        where, params = zcanr030.replace_predicate(group, whole_table=(args.scope == 'e-only'))
+        if args.mode == 'delta':
+            # Delta เทียบ/ลบเฉพาะแถวของกลุ่มเสมอ (ไม่ใช่ทั้งตารางแบบ TRUNCATE)
+            where, params = zcanr030.group_predicate(group)
+        file_params = {"selected_group": group, "streaming": args.streaming, "chunk_rows": args.chunk_rows}
+        procedures = [] if args.no_procedures else zcanr030.refresh_procedures
+        return zcanr030.process_file, file_params, None, where, params, procedures
+    if report == 'zcakr005':
+        where, params = zcakr005.replace_predicate(args.year, args.month)
+        return zcakr005.process_file, {"period": [args.year, args.month]}, lambda df: zcakr005.filter_period(df, args.year, args.month), where, params, []
+    where, params = zwmr019.replace_predicate(args.activity_type, args.year, args.month)
+    return (zwmr019.process_file, {"activity_type": args.activity_type, "period": [args.year, args.month]},
+            lambda df: zwmr019.filter_period(df, args.year, args.month), where, params, [])
+
+
+def ingest(report, files, args):
+    """อ่าน → clean → กรอง → นำเข้า เหมือนหน้าเว็บ คืน (จำนวนแถวที่นำเข้า, {ไฟล์: status})"""
+    metrics = StageLog(report.upper())
+    process_file, file_params, filter_fn, where, where_params, procedures = build_plan(report, args)
+    module = {'zcanr030': zcanr030, 'zcakr005': zcakr005, 'zwmr019': zwmr019}[report]
+
+    frames = []
+    summaries = []
+    statuses = {}
+    # ตัดแถวซ้ำข้ามไฟล์ตาม business key ระหว่างรวมทีละไฟล์ (ZCAKR005 ไม่มี key จึงไม่ตัด)
+    key_cols = getattr(module, 'business_key', None)
+    dedup = KeyIndex(key_cols) if key_cols and not args.keep_duplicates else None
+    with metrics.stage('process_files') as stage:
+        for res, path in zip(run_files(process_file, files, file_params, parallel=args.workers > 1, max_workers=args.workers), files):
+            log_line(f"{res.name} ({res.kind}) -> {res.status}")
+            print_messages(res.messages)
+            metrics.extend(res.stages)
+            statuses[path] = res.status
+            if res.df is not None:
+                df_file, n_dup = dedup.take(res.df, res.name) if dedup is not None else (res.df, 0)
+                if n_dup:
+                    print_messages([duplicate_note(res.name, n_dup)])
+                frames.append(df_file)
+                summaries.append(zcanr030.summarize(df_file) if n_dup and report == 'zcanr030' else res.summary)
+        stage['rows'] = sum(len(df) for df in frames)
+    if dedup is not None and dedup.dropped:
+        log_line(f"แถวซ้ำข้ามไฟล์ {dedup.dropped:,} แถว (key: {', '.join(dedup.key_cols)}): "
+                 + " | ".join(f"{name} รับ {kept:,} ซ้ำ {dropped:,}" for name, kept, dropped in dedup.counts))
+
+    if not frames:
+        log_line("ไม่มีข้อมูลที่นำเข้าได้")
+        metrics.write_jsonl()
+        return 0, statuses
+
+    with metrics.stage('concat', rows=sum(len(df) for df in frames)):
+        df_final = concat_frames(frames)
+    del frames
+    if filter_fn is not None:
+        with metrics.stage('filter_period', rows=len(df_final)):
+            df_final = filter_fn(df_final)
+        log_line(f"เหลือ {len(df_final):,} แถวในเดือน {args.month:02d}/{args.year}")
+    if df_final.empty:
+        metrics.write_jsonl()
+        return 0, statuses
+
+    if args.export:
+        # รูปแบบตามนามสกุล: .csv / .csv.gz / .csv.zst / .parquet
+        with metrics.stage('export', rows=len(df_final)):
+            write_export(df_final, args.export, format_for_path(args.export), module.to_db_frame)
+        log_line(f"บันทึกไฟล์: {args.export}")
+    df_db = module.to_db_frame(df_final)
+    del df_final
+    if args.dry_run:
+        log_line(f"--dry-run: ไม่เขียนฐานข้อมูล ({len(df_db):,} แถว)")
+        metrics.write_jsonl()
+        return 0, statuses
+
+    method = METHOD_CHOICES[args.method]
+    conn_str = db_url(args.db_user, args.db_pass, args.db_host, args.db_name)  # โหมด watch ใช้ pool เดิมทุกรอบ
+    table_name = args.table or DEFAULT_TABLES[report]
+    mode = {'append': APPEND, 'delta': DELTA}.get(args.mode, SWAP if args.replace == 'swap' else OVERWRITE)
+
+    if report == 'zcanr030' and procedures:
+        # summary table + refresh เฉพาะกลุ่ม/บิลเดือนที่นำเข้า แทน sp_refresh_dashboard_master ทั้งตาราง
+        procedures = [dashboard_step(zcanr030.combine_summaries(summaries), file_params["selected_group"], mode, table_name,
+                                     where, where_params, delete_vanished=args.delete_vanished, full_refresh=args.full_refresh)]
+
+    # ขั้นตอนเดียวกับหน้าเว็บ (migrate / ลบ / นำเข้า / procedures) พร้อม checkpoint ทุกชุดข้อมูล
+    # ล้มเหลวกลางทางทำต่อได้ด้วย: python ingest.py resume <load_id>
+    try:
+        result = run_upload(ConsoleJob(), df_db, conn_str, table_name, method, mode, report=report.upper(),
+                            replace_where=where, replace_params=where_params,
+                            delete_batch=args.delete_batch if report == 'zcanr030' else None,
+                            business_key=getattr(module, 'business_key', None), amount_cols=getattr(module, 'amount_cols', ()),
+                            delete_vanished=args.delete_vanished, procedures=procedures, schema=table_spec(module),
+                            persist_metrics=False, resumable=not args.no_checkpoint)
+        metrics.extend(result["stages"])
+    finally:
+        metrics.write_jsonl()
+    return result["rows_written"], statuses
+
+
+def move_processed(statuses, base_dir):
+    # ไฟล์ที่อ่านได้ย้ายไป Completed_Archive, ไฟล์ที่อ่านไม่ได้/ผิดประเภทย้ายไป Failed (ไม่ถูกอ่านซ้ำในรอบถัดไป)
+    for path, status in statuses.items():
+        target_dir = os.path.join(base_dir, ARCHIVE_NAME if status == 'done' else FAILED_NAME)
+        os.makedirs(target_dir, exist_ok=True)
+        try:
+            shutil.move(path, os.path.join(target_dir, os.path.basename(path)))
+        except OSError as e:
+            log_line(f"ย้ายไฟล์ {path} ไม่สำเร็จ: {e}")
+
+
+def expand_files(patterns):
+    # รองรับ wildcard บน Windows (cmd ไม่ขยาย * ให้)
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        files.extend(m for m in matches if not os.path.basename(m).startswith("~$"))
+    return files
+
+
+def cmd_run(args):
+    files = expand_files(args.files)
+    missing = [f for f in files if not os.path.isfile(f)]
+    if missing:
+        log_line("ไม่พบไฟล์: " + ", ".join(missing))
+        return 2
+    rows, statuses = ingest(args.report, files, args)
+    if args.archive:
+        move_processed(statuses, args.archive)
+    failed = [p for p, s in statuses.items() if s != 'done']
+    return 2 if failed else (0 if rows or args.dry_run else 1)
+
+
+def cmd_resume(args):
+    """ทำงานนำเข้าที่ค้างต่อจาก checkpoint ล่าสุด (ไม่ระบุ load_id = แสดงรายการงานค้าง)"""
+    if not args.load_id:
+        loads = pending_loads()
+        if not loads:
+            log_line("ไม่มีงานนำเข้าที่ค้าง")
+        for meta in loads:
+            log_line(f"{meta['load_id']}  {meta['report']}  {meta['table_name']}  {meta['mode']}  "
+                     f"{meta['total_rows']:,} แถว  {datetime.fromtimestamp(meta['created']):%Y-%m-%d %H:%M}  ({meta['db']})")
+        return 0
+    url = db_url(args.db_user, args.db_pass, args.db_host, args.db_name)
+    if args.abandon:
+        abandon_load(args.load_id, get_engine(url))
+        log_line(f"ทิ้งงาน {args.load_id} แล้ว")
+        return 0
+    try:
+        result = resume_upload(ConsoleJob(), args.load_id, url)
+    except Exception as e:
+        log_line(f"ทำต่อไม่สำเร็จ: {e}")
+        return 1
+    log_line(f"งาน {args.load_id} เสร็จ: {result['rows_written']:,} / {result['total_rows']:,} แถว")
+    return 0
+
+
+def cmd_watch(args):
+    """เฝ้าโฟลเดอร์: ไฟล์ใหม่ที่ขนาด/เวลาแก้ไขไม่เปลี่ยนครบ --settle วินาทีจะถูกนำเข้าเป็นชุดเดียว"""
+    log_line(f"เฝ้าโฟลเดอร์ {args.dir} ทุก {args.interval} วินาที ({args.report.upper()})")
+    seen = {}
+    while True:
+        now = time.time()
+        ready = []
+        for name in sorted(os.listdir(args.dir)):
+            path = os.path.join(args.dir, name)
+            if name.startswith("~$") or not name.lower().endswith(WATCH_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            sig = (stat.st_size, stat.st_mtime)
+            # ต้องเห็นขนาดเดิมอย่างน้อยสองรอบ และไม่ถูกแก้ไขภายใน settle วินาที (กำลัง copy / หน้าเว็บกำลังใช้)
+            if seen.get(path) == sig and now - stat.st_mtime >= args.settle:
+                ready.append(path)
+            seen[path] = sig
+
+        if ready:
+            log_line(f"พบไฟล์ใหม่ {len(ready)} ไฟล์")
+            if args.report in ('zcakr005', 'zwmr019') and not args.fixed_period:
+                # ไม่ได้กำหนดเดือนตายตัว ใช้เดือนปัจจุบันเหมือนค่าเริ่มต้นของหน้าเว็บ
+                args.year, args.month = datetime.now().year, datetime.now().month
+            try:
+                _, statuses = ingest(args.report, ready, args)
+            except Exception as e:
+                log_line(f"นำเข้าไม่สำเร็จ: {e}")
+                statuses = {p: 'read_error' for p in ready}
+            move_processed(statuses, args.dir)
+            for path in ready:
+                seen.pop(path, None)
+
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="นำเข้าไฟล์ SAP เข้า MySQL โดยไม่ผ่านหน้าเว็บ")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    database = argparse.ArgumentParser(add_help=False)
+    database.add_argument("--db-name", default="debt")
+    database.add_argument("--db-user", default=os.environ.get("DEPT_DB_USER", "root"))
+    database.add_argument("--db-pass", default=os.environ.get("DEPT_DB_PASS", ""))
+    database.add_argument("--db-host", default=os.environ.get("DEPT_DB_HOST", "localhost"))
+
+    common = argparse.ArgumentParser(add_help=False, parents=[database])
+    common.add_argument("report", choices=sorted(DEFAULT_TABLES))
+    common.add_argument("--table", help="ค่าเริ่มต้นตามหน้าเว็บของแต่ละรายงาน")
+    common.add_argument("--method", choices=sorted(METHOD_CHOICES), default="insert")
+    common.add_argument("--mode", choices=["overwrite", "append", "delta"], default="overwrite",
+                        help="delta: เขียนเฉพาะแถวใหม่/ที่เปลี่ยนตาม business key (เฉพาะ zcanr030)")
+    common.add_argument("--delete-vanished", action="store_true", help="โหมด delta: ลบ key ที่ไม่มีในไฟล์ใหม่")
+    common.add_argument("--replace", choices=["delete", "swap"], default="delete",
+                        help="delete: ลบแถวเดิมแล้วนำเข้า | swap: นำเข้า staging แล้วแทนที่ขอบเขตใน transaction เดียว (ทั้งตาราง: RENAME TABLE)")
+    common.add_argument("--workers", type=int, default=default_workers(), help="จำนวน process (1 = ทีละไฟล์)")
+    common.add_argument("--export", help="บันทึกข้อมูลหลัง clean ด้วย (.csv / .csv.gz / .csv.zst / .parquet)")
+    common.add_argument("--keep-duplicates", action="store_true", help="ไม่ตัดแถวที่ business key ซ้ำข้ามไฟล์")
+    common.add_argument("--no-checkpoint", action="store_true", help="ไม่เก็บข้อมูล/checkpoint สำหรับทำต่อเมื่อการเชื่อมต่อหลุด")
+    common.add_argument("--dry-run", action="store_true", help="อ่านและ clean อย่างเดียว ไม่เขียนฐานข้อมูล")
+    # ZCANR030
+    common.add_argument("--scope", choices=["e-only", "group"], default="e-only",
+                        help="e-only: เขต E แทนที่ทั้งตาราง | group: แทนที่เฉพาะเขต --group")
+    common.add_argument("--group", choices=["D", "E", "F"], default="E")
+    common.add_argument("--streaming", action="store_true", help="อ่านไฟล์ข้อความทีละชุด")
+    common.add_argument("--chunk-rows", type=int, default=200000)
+    common.add_argument("--delete-batch", type=int, default=50000)
+    common.add_argument("--no-procedures", action="store_true", help="ไม่อัปเดต summary table และไม่รัน sp_refresh_dashboard_master")
+    common.add_argument("--full-refresh", action="store_true", help="refresh Dashboard ทั้งตาราง แทนเฉพาะกลุ่ม/บิลเดือนที่นำเข้า")
+    # ZCAKR005 / ZWMR019
+    common.add_argument("--year", type=int, default=datetime.now().year)
+    common.add_argument("--month", type=int, choices=range(1, 13), default=datetime.now().month)
+    common.add_argument("--activity-type", choices=["ต่อกลับ", "งดจ่าย"], default="ต่อกลับ")
+
+    run = sub.add_parser("run", parents=[common], help="นำเข้าไฟล์ที่ระบุครั้งเดียว")
+    run.add_argument("files", nargs="+")
+    run.add_argument("--archive", help="ย้ายไฟล์ที่นำเข้าแล้วไปโฟลเดอร์นี้ (Completed_Archive / Failed)")
+    run.set_defaults(func=cmd_run)
+
+    watch = sub.add_parser("watch", parents=[common], help="เฝ้าโฟลเดอร์แล้วนำเข้าไฟล์ใหม่อัตโนมัติ")
+    watch.add_argument("--dir", default=BASE_DIR)
+    watch.add_argument("--interval", type=int, default=60, help="วินาทีระหว่างการตรวจโฟลเดอร์")
+    watch.add_argument("--settle", type=int, default=120, help="ไฟล์ต้องไม่ถูกแก้ไขกี่วินาทีก่อนนำเข้า")
+    watch.add_argument("--fixed-period", action="store_true", help="ใช้ --year/--month ตลอด แทนเดือนปัจจุบัน")
+    watch.add_argument("--once", action="store_true", help="ตรวจรอบเดียวแล้วจบ (ใช้กับ Task Scheduler)")
+    watch.set_defaults(func=cmd_watch)
+
+    resume = sub.add_parser("resume", parents=[database], help="ทำงานนำเข้าที่ค้างต่อจาก checkpoint ล่าสุด")
+    resume.add_argument("load_id", nargs="?", help="ไม่ระบุ = แสดงรายการงานค้าง")
+    resume.add_argument("--abandon", action="store_true", help="ทิ้งงานนี้ (ลบข้อมูลที่เก็บไว้)")
+    resume.set_defaults(func=cmd_resume)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'mode', None) == 'delta' and args.report != 'zcanr030':
+        parser.error("--mode delta ใช้ได้เฉพาะ zcanr030 (รายงานอื่นยังไม่รองรับ)")
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
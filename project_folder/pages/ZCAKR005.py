@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
-import gc
 import os
-import shutil
 from datetime import datetime
+from core.sniff import format_counter
+from core.loaders import LOAD_METHODS, REPLACE_MODES
+from core.pipeline import EXEC_MODES, default_workers, process_uploads
+from core.cache import upload_cache
+from core.archive import discard, file_archiver
+from core import zcakr005
+from core.zcakr005 import process_file as process_zcakr005, to_db_frame, filter_period, replace_predicate
+from core.schema import concat_frames, frame_bytes
+from core.metrics import StageLog
+from core.export import export_version
+from core.jobs import upload_jobs
+from core.upload import OVERWRITE, SWAP, db_url, run_upload
+from core.migrations import table_spec
+from ui import show_messages, preview_frame, show_metrics, download_panel, job_panel, pool_panel, resume_panel
 
 # --- 1. ตั้งค่าหน้าเว็บ & Path ---
 st.set_page_config(page_title="ZCAKR005 Upload", layout="wide")
@@ -15,93 +25,7 @@ BASE_DIR = r"D:\work\บน\dept\project_folder\convert"
 ARCHIVE_DIR = os.path.join(BASE_DIR, "Completed_Archive")
 os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
-# --- 2. Mapping & Logic ---
-mapping_dict_zcakr005 = {
-    'วันที่อนุมัติ': 'approve_date',
-    'ผลอนุมัติ': 'approve_status',
-    'รหัส กฟฟ.': 'pea_code',
-    'ชื่อ กฟฟ.': 'pea_name',
-    'สายจดหน่วย': 'mru',
-    'หมายเลขผู้': 'ca_no',
-    'ชื่อผู้ใช้ไฟ': 'customer_name',
-    'VIP': 'vip_status',
-    'หมายเลขเอกสาร': 'doc_no',
-    'รายการ': 'item_type',
-    'บิลเดือน': 'bill_month',
-    'จำนวนเงิน': 'amount',
-    'วันที่ครบกำหนด': 'due_date',
-    'DP': 'dp',
-    'รายละเอียด': 'details',
-    'วันที่เสนอ': 'prop_date',
-    'เอกสารเสนอ': 'prop_doc',
-    'เลขที่ใบงาน': 'work_order',
-    'พนักงานคุม': 'employee',
-    'หมายเหตุ': 'remark'
-}
-
-def smart_read_zcakr005(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    header_keywords = ['วันที่อนุมัติ', 'หมายเลขผู้', 'CA', 'Contract Account', 'รหัส กฟฟ.', 'บิลเดือน', 'เอกสารเสนอ']
-    
-    def find_h_idx(df):
-        if df is None or df.empty: return -1
-        # Scan first 60 rows
-        for i, row in df.head(60).iterrows():
-            row_text = " ".join([str(x).replace('\xa0', ' ').strip().lower() for x in row.values])
-            # A header row should have at least 2 keywords to avoid metadata rows
-            matches = [kw.lower() in row_text for kw in header_keywords]
-            if sum(matches) >= 2:
-                return i
-        return -1
-
-    try:
-        # Priority 1: Real Excel (XLSX or XLS)
-        if ext == '.xlsx':
-            df_peak = pd.read_excel(file_path, engine='openpyxl', header=None, nrows=100)
-            h = find_h_idx(df_peak)
-            if h != -1: return pd.read_excel(file_path, engine='openpyxl', header=h)
-        else: # .xls variant
-            try:
-                # Try as binary XLS (97-2003)
-                df_peak = pd.read_excel(file_path, engine='xlrd', header=None, nrows=100)
-                h = find_h_idx(df_peak)
-                if h != -1: return pd.read_excel(file_path, engine='xlrd', header=h)
-            except: pass
-            
-            # Priority 2: UTF-16 TSV (Very common for SAP exports named .xls)
-            try:
-                df_peak = pd.read_csv(file_path, sep='\t', encoding='utf-16', header=None, names=range(200), on_bad_lines='skip', nrows=100)
-                h = find_h_idx(df_peak)
-                if h != -1: 
-                    return pd.read_csv(file_path, sep='\t', encoding='utf-16', header=h, on_bad_lines='skip', low_memory=False)
-            except: pass
-            
-            # Priority 3: HTML Fallback
-            try:
-                html_dfs = pd.read_html(file_path)
-                for table in html_dfs:
-                    h = find_h_idx(table.head(100))
-                    if h != -1:
-                        table.columns = [str(c).strip() for c in table.iloc[h]]
-                        return table.iloc[h+1:].reset_index(drop=True)
-            except: pass
-
-        # Absolute Fallback: Flexible CSV
-        for enc in ['utf-8-sig', 'tis-620', 'cp1252']:
-            try:
-                df_peak = pd.read_csv(file_path, header=None, nrows=100, on_bad_lines='skip', encoding=enc, sep=None, engine='python')
-                h = find_h_idx(df_peak)
-                if h != -1:
-                     return pd.read_csv(file_path, header=h, on_bad_lines='skip', encoding=enc, sep=None, engine='python')
-            except: continue
-
-        st.error(f"❌ ไม่สามารถระบุรูปแบบไฟล์ หรือไม่พบหัวตารางในไฟล์ {os.path.basename(file_path)}")
-        st.info("💡 ไฟล์นี้ควรมีคอลัมน์อย่างน้อย 2 อย่าง: " + ", ".join(header_keywords))
-        return None
-
-    except Exception as e:
-        st.error(f"❌ Error logic ZCAKR005: {os.path.basename(file_path)}: {e}")
-        return None
+# --- 2. Mapping & Logic อยู่ใน core/zcakr005.py (ใช้ร่วมกับ Process Pool ได้) ---
 
 # --- 3. Sidebar ---
 st.sidebar.header("🔌 Database Connection")
@@ -113,6 +37,32 @@ table_name = st.sidebar.text_input("Table Name", value="dept_zcakr005_master")
 
 st.sidebar.divider()
 st.sidebar.header("⚙️ ตั้งค่าการอัปโหลด")
+load_method = st.sidebar.radio(
+    "วิธีนำเข้าข้อมูล MySQL",
+    LOAD_METHODS,
+    index=0,
+    help="INSERT: to_sql แบบเดิม | LOAD DATA: ส่งไฟล์ TSV ชั่วคราวให้ MySQL นำเข้าเอง เร็วกว่ามากสำหรับข้อมูลจำนวนมาก (Server ต้องเปิด local_infile)"
+)
+replace_mode = st.sidebar.radio(
+    "วิธีแทนที่ข้อมูลเดิมของเดือน",
+    REPLACE_MODES,
+    index=0,
+    help="Atomic Swap: นำเข้าลงตาราง staging ก่อน แล้วแทนที่แถวเดิมของขอบเขตนี้ใน transaction เดียว (ทั้งตาราง: RENAME TABLE) Dashboard จะไม่เห็นข้อมูลเดือนนี้หายหรือครึ่งๆ กลางๆ เวลาขึ้นกับขนาดข้อมูลที่แทนที่ ไม่ใช่ทั้งตาราง (ต้องมีสิทธิ์ CREATE / DROP / ALTER)"
+)
+exec_mode = st.sidebar.radio(
+    "การประมวลผลไฟล์",
+    EXEC_MODES,
+    index=0,
+    help="ขนาน: อ่านและทำความสะอาดหลายไฟล์พร้อมกันด้วย Process Pool (เหมาะกับการอัปโหลด 10-20 ไฟล์)"
+)
+exec_workers = default_workers()
+if exec_mode == EXEC_MODES[1]:
+    exec_workers = st.sidebar.number_input("จำนวน Worker", min_value=1, max_value=32, value=default_workers(), step=1)
+
+resumable = st.sidebar.checkbox("บันทึก checkpoint ระหว่างนำเข้า", value=True,
+                                help="เก็บข้อมูลที่ clean แล้วไว้ในเครื่องและบันทึกจุดที่ commit ทุกชุด การเชื่อมต่อหลุดแล้วทำต่อได้โดยไม่ลบ/อ่านไฟล์ใหม่")
+keep_archive = st.sidebar.checkbox("เก็บไฟล์ต้นฉบับใน Completed_Archive", value=True,
+                                   help="เขียนไฟล์ด้วย thread เบื้องหลังหลังอ่านเสร็จ ไม่ทำให้การประมวลผลช้าลง")
 
 # --- Month Selection for Filtering ---
 st.sidebar.subheader("📅 เลือกเดือนที่อัปโหลด (Approve Date)")
@@ -125,8 +75,6 @@ months_th = [
 sel_year = st.sidebar.selectbox("ปี (YYYY)", years, index=years.index(current_year))
 sel_month_name = st.sidebar.selectbox("เดือน", months_th, index=datetime.now().month - 1)
 sel_month_idx = months_th.index(sel_month_name) + 1
-target_period_sql = f"%.{sel_month_idx:02d}.{sel_year}"  # For SQL LIKE: %.03.2026
-target_period_df = f"{sel_month_idx:02d}.{sel_year}"   # For DF filter: 03.2026
 
 st.sidebar.info(f"💡 ระบบจะทำการ **ลบข้อมูลเดิม** ของเดือน **{sel_month_name} {sel_year}** ออกก่อน แล้วจึงนำเข้าข้อมูลใหม่จากไฟล์ที่ท่านอัปโหลด")
 
@@ -134,144 +82,58 @@ st.sidebar.info(f"💡 ระบบจะทำการ **ลบข้อมู
 uploaded_files = st.file_uploader("เลือกไฟล์ Excel (xls/xlsx) : ZCAKR005", type=["xlsx", "xls"], accept_multiple_files=True)
 
 df_final = pd.DataFrame()
+metrics = StageLog("ZCAKR005")  # เวลา/หน่วยความจำของรอบนี้ (แสดงท้ายหน้า)
+fresh_files = 0
+dataset_keys = []  # cache key ของไฟล์ที่รวมใน df_final (ใช้เป็น version ของไฟล์ดาวน์โหลด)
 
 if uploaded_files:
     all_dataframes = []
-    
-    with st.spinner('⏳ กำลังประมวลผลไฟล์...'):
-        for uploaded_file in uploaded_files:
-            if uploaded_file.name.startswith("~$"): continue
-            
-            temp_path = os.path.join(BASE_DIR, uploaded_file.name)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            df_temp = smart_read_zcakr005(temp_path)
-            
-            if df_temp is not None:
-                len_raw = len(df_temp)
-                
-                # 1. Clean columns and rename
-                # Build mapping dictionary
-                new_cols_map = {}
-                for col in df_temp.columns:
-                    c_clean = str(col).strip()
-                    if 'วันที่อนุมัติ' in c_clean: new_cols_map[col] = 'approve_date'
-                    elif 'ผลอนุ' in c_clean: new_cols_map[col] = 'approve_status'
-                    elif 'รหัส กฟฟ' in c_clean: new_cols_map[col] = 'pea_code'
-                    elif 'ชื่อ กฟฟ' in c_clean: new_cols_map[col] = 'pea_name'
-                    elif 'สายจดหน่วย' in c_clean: new_cols_map[col] = 'mru'
-                    elif 'หมายเลขผู้' in c_clean or 'CA' in c_clean: new_cols_map[col] = 'ca_no'
-                    elif 'ชื่อผู้ใช้ไฟ' in c_clean: new_cols_map[col] = 'customer_name'
-                    elif 'VIP' in c_clean: new_cols_map[col] = 'vip_status'
-                    elif 'หมายเลขเอกสาร' in c_clean or 'เลขที่เอกสาร' in c_clean: new_cols_map[col] = 'doc_no'
-                    elif 'รายการ' in c_clean: new_cols_map[col] = 'item_type'
-                    elif 'บิลเดือน' in c_clean or 'รอบบิล' in c_clean: new_cols_map[col] = 'bill_month'
-                    elif 'จำนวนเงิน' in c_clean: new_cols_map[col] = 'amount'
-                    elif 'วันที่ครบกำหนด' in c_clean: new_cols_map[col] = 'due_date'
-                    elif 'DP' in c_clean: new_cols_map[col] = 'dp'
-                    elif 'รายละเอียด' in c_clean: new_cols_map[col] = 'details'
-                    elif 'วันที่เสนอ' in c_clean: new_cols_map[col] = 'prop_date'
-                    elif 'เอกสารเสนอ' in c_clean: new_cols_map[col] = 'prop_doc'
-                    elif 'ใบงาน' in c_clean: new_cols_map[col] = 'work_order'
-                    elif 'พนักงาน' in c_clean: new_cols_map[col] = 'employee'
-                    elif 'หมายเหตุ' in c_clean: new_cols_map[col] = 'remark'
-                
-                df_temp = df_temp.rename(columns=new_cols_map)
-                
-                # 2. Ensure all expected columns exist
-                for eng_col in mapping_dict_zcakr005.values():
-                    if eng_col not in df_temp.columns:
-                        df_temp[eng_col] = np.nan
-                
-                # 3. Select only mapped columns in order
-                ordered_cols = list(dict.fromkeys(mapping_dict_zcakr005.values()))
-                df_temp = df_temp[ordered_cols].copy()
-
-                # 4. Strip whitespace and convert empty to NaN
-                for col in df_temp.select_dtypes(include=['object']).columns:
-                    df_temp[col] = df_temp[col].fillna("").astype(str).str.strip().replace(['', 'nan', 'NaN', 'None'], np.nan)
-
-                # 5. Filter out duplicate headers, garbage rows, and empty essentials
-                if 'ca_no' in df_temp.columns:
-                    header_labels = ['หมายเลขผู้', 'ca_no', 'วันที่อนุมัติ', 'รหัส กฟฟ.', 'หมายเลขผู้ใช้ไฟ']
-                    df_temp = df_temp[~df_temp['ca_no'].astype(str).isin(header_labels)]
-                    df_temp = df_temp[df_temp['ca_no'].astype(str).str.contains(r'\d', na=False)]
-
-                    # Handle Date columns
-                    def parse_thai_month(s):
-                        if pd.isna(s): return s
-                        s = str(s).strip()
-                        month_map = {
-                            'ม.ค.': '01', 'ก.พ.': '02', 'มี.ค.': '03', 'เม.ย.': '04',
-                            'พ.ค.': '05', 'มิ.ย.': '06', 'ก.ค.': '07', 'ส.ค.': '08',
-                            'ก.ย.': '09', 'ต.ค.': '10', 'พ.ย.': '11', 'ธ.ค.': '12'
-                        }
-                        try:
-                            # Try standard datetime first
-                            dt = pd.to_datetime(s, dayfirst=True, errors='coerce')
-                            if not pd.isna(dt): return dt.date()
-                            
-                            # Try Thai format like "ก.พ.-69"
-                            if '-' in s:
-                                parts = s.split('-')
-                                m_part = parts[0].strip()
-                                y_part = parts[1].strip()
-                                if m_part in month_map:
-                                    m = month_map[m_part]
-                                    if len(y_part) == 2:
-                                        y_val = int(y_part)
-                                        # If year is small (e.g. 26), it's likely AD (2026)
-                                        # If year is large (e.g. 69), it's likely BE (2569)
-                                        if y_val < 60:
-                                            y = 2000 + y_val
-                                        else:
-                                            y = (2500 + y_val) - 543
-                                    else:
-                                        y = int(y_part)
-                                        if y > 2500: y -= 543
-                                    return datetime(y, int(m), 1).date()
-                        except: pass
-                        return s
-
-                    # Special Handle for bill_month (yyyy-mm-dd)
-                    if 'bill_month' in df_temp.columns:
-                        df_temp['bill_month'] = df_temp['bill_month'].apply(parse_thai_month)
-                        df_temp['bill_month'] = pd.to_datetime(df_temp['bill_month'], errors='coerce').dt.strftime('%Y-%m-%d')
-                    
-                    # Handle other dates (dd.mm.yyyy)
-                    dot_date_cols = ['approve_date', 'due_date', 'prop_date']
-                    for col in dot_date_cols:
-                        if col in df_temp.columns:
-                            df_temp[col] = pd.to_datetime(df_temp[col], dayfirst=True, errors='coerce').dt.strftime('%d.%m.%Y')
-                    
-                    if 'amount' in df_temp.columns:
-                        df_temp['amount'] = df_temp['amount'].astype(str).str.replace(',', '').pipe(pd.to_numeric, errors='coerce').fillna(0.00)
-
-                # Final Null Check for Required Columns
-                # (Removed strict bill_month filter as requested)
-                
-                df_temp = df_temp.dropna(how='all')
-
-                if not df_temp.empty:
-                    all_dataframes.append(df_temp)
-                    st.write(f"📊 **{uploaded_file.name}**: อ่านได้ {len_raw:,} แถว | Cleaned {len(df_temp):,} แถว")
-                else:
-                    st.warning(f"⚠️ ไฟล์ {uploaded_file.name}: ไม่มีข้อมูลที่ถูกต้องหลังจากทำความสะอาด")
-                    if len_raw > 0:
-                        st.info("💡 อาจเป็นเพราะระบบหาหัวตารางไม่เจอ หรือข้อมูลในไฟล์ไม่ตรงกับรูปแบบที่กำหนด")
-                        with st.expander("ตรวจสอบหัวตารางที่พบ"):
-                            st.write(df_temp.columns.tolist())
-                
-                shutil.move(temp_path, os.path.join(ARCHIVE_DIR, uploaded_file.name))
+    archived_paths = []
+
+    with st.spinner('⏳ กำลังประมวลผลไฟล์...'), metrics.stage('process_files') as stage_files:
+        # อ่านจากหน่วยความจำโดยตรง ไฟล์ที่เคยประมวลผลแล้ว (เนื้อหาและตัวเลือกเดิม) ใช้ผลจาก cache
+        uploads = [(f.name, f.getvalue()) for f in uploaded_files if not f.name.startswith("~$")]
+        # กรองเดือนที่เลือกตั้งแต่ตอนอ่าน (แถวเดือนอื่นไม่ถูก clean)
+        results = process_uploads(process_zcakr005, uploads, {"period": [sel_year, sel_month_idx]}, report="ZCAKR005", cache=upload_cache,
+                                  parallel=(exec_mode == EXEC_MODES[1]), max_workers=int(exec_workers))
+        for res, source, from_cache, key in results:
+            show_messages(res.messages)
+            if res.df is not None:
+                all_dataframes.append(res.df)
+                dataset_keys.append(key)
+            if from_cache:
+                st.caption(f"⚡ {res.name}: ใช้ผลจาก cache (ไฟล์ไม่เปลี่ยนแปลง)")
+                metrics.add('cache_hit', 0.0, len(res.df) if res.df is not None else 0, res.name)
+                continue
+            fresh_files += 1
+            metrics.extend(res.stages)
+            if res.status == 'done' and keep_archive:
+                # เก็บไฟล์ต้นฉบับใน Archive ด้วย thread เบื้องหลัง (ไม่รอเขียนไฟล์)
+                archived_paths.append(file_archiver.submit(source, ARCHIVE_DIR))
+            elif res.status == 'read_error':
+                # ไฟล์ที่อ่านไม่ได้คงไว้ในโฟลเดอร์ convert ให้ตรวจสอบเหมือนเดิม
+                file_archiver.submit(source, BASE_DIR)
+            else:
+                discard(source)
+        stage_files['rows'] = sum(len(df) for df in all_dataframes)
+
+    if format_counter:
+        st.caption("🔎 เส้นทางการอ่านไฟล์ (สะสม): " + " | ".join(f"{k} {v:,} ไฟล์" for k, v in format_counter.most_common()))
+    cache_stats = upload_cache.stats()
+    st.caption(f"🗃️ Cache: hit {cache_stats['hits']:,} (disk {cache_stats['disk_hits']:,}) | miss {cache_stats['misses']:,} | "
+               f"evict {cache_stats['evictions']:,} | ในหน่วยความจำ {cache_stats['entries']:,} ไฟล์ ({cache_stats['mem_bytes'] / 1024**2:,.1f} MB)")
+    for path, err in file_archiver.take_errors():
+        st.warning(f"⚠️ เก็บไฟล์ {os.path.basename(path)} ไม่สำเร็จ: {err}")
 
     if all_dataframes:
-        df_final = pd.concat(all_dataframes, ignore_index=True)
+        with metrics.stage('concat', rows=sum(len(df) for df in all_dataframes)):
+            df_final = concat_frames(all_dataframes)
+        st.caption(f"🧮 หน่วยความจำข้อมูลรวม: {frame_bytes(df_final) / 1024**2:,.1f} MB")
         
         # --- Filter by Selected Month/Year (approve_date) ---
         if 'approve_date' in df_final.columns:
-            # approve_date format is dd.mm.yyyy
-            df_final = df_final[df_final['approve_date'].astype(str).str.endswith(target_period_df, na=False)].copy()
+            # approve_date เป็น datetime64 อยู่แล้ว (แปลงตอน clean) กรองเดือนได้ทันที
+            df_final = filter_period(df_final, sel_year, sel_month_idx)
         
         if df_final.empty:
             st.error(f"❌ ไม่พบข้อมูลที่มีวันที่อนุมัติ (Approve Date) ตรงกับเดือน {sel_month_name} {sel_year}")
@@ -279,14 +141,13 @@ if uploaded_files:
         else:
             st.divider()
             st.subheader(f"📊 ตัวอย่างข้อมูลรวมเฉพาะเดือน {sel_month_name} {sel_year} ({len(df_final):,} แถว)")
-            st.dataframe(df_final.head(10).fillna("Null"))
+            st.dataframe(preview_frame(df_final))
 
 # --- 5. Export ---
 if not df_final.empty:
     col1, col2 = st.columns(2)
     with col1:
-        csv = df_final.to_csv(index=False).encode('utf-8-sig')
-        st.download_button(label="📥 ดาวน์โหลด CSV", data=csv, file_name="ZCAKR005_cleaned.csv", mime="text/csv", use_container_width=True)
+        download_panel(df_final, export_version("ZCAKR005", dataset_keys, sel_year, sel_month_idx), "ZCAKR005_cleaned", to_db_frame, metrics, label="📥 ดาวน์โหลด")
 
     with col2:
         if not df_final.empty:
@@ -294,8 +155,9 @@ if not df_final.empty:
             first_row_date = "Unknown"
             is_match = True
             if 'approve_date' in df_final.columns and len(df_final) > 0:
-                first_row_date = df_final.iloc[0]['approve_date']
-                if not str(first_row_date).endswith(target_period_df):
+                first_row_dt = df_final['approve_date'].iloc[0]
+                first_row_date = first_row_dt.strftime('%d.%m.%Y') if pd.notna(first_row_dt) else "NaT"
+                if pd.isna(first_row_dt) or (first_row_dt.year, first_row_dt.month) != (sel_year, sel_month_idx):
                     is_match = False
             
             if not is_match:
@@ -303,47 +165,27 @@ if not df_final.empty:
                 st.info("กรุณาตรวจสอบให้แน่ใจว่าเลือกเดือนถูกต้องก่อนกดอัปโหลด")
 
             if st.button("📤 ส่งข้อมูลเข้า MySQL", type="primary", use_container_width=True):
-                try:
-                    conn_str = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
-                    engine = create_engine(conn_str, pool_pre_ping=True)
-                    with engine.connect() as conn:
-                        st.warning(f"🗑️ กำลังล้างข้อมูลเดิมเฉพาะเดือน {sel_month_name} {sel_year} (approve_date LIKE '{target_period_sql}')...")
-                        delete_query = text(f"DELETE FROM {table_name} WHERE approve_date LIKE :period")
-                        conn.execute(delete_query, {"period": target_period_sql})
-                        conn.commit()
-                        st.success(f"✅ ล้างข้อมูลเดิมเรียบร้อยแล้ว")
-
-                    st.info(f"⏳ กำลังนำเข้าข้อมูลใหม่ {len(df_final):,} แถว...")
-                    total_rows = len(df_final)
-                    ui_batch_size = 20000
-                    progress_up = st.progress(0)
-                    status_up = st.empty()
-                    for start_idx in range(0, total_rows, ui_batch_size):
-                        end_idx = min(start_idx + ui_batch_size, total_rows)
-                        chunk = df_final.iloc[start_idx:end_idx]
-                        chunk.to_sql(table_name, con=engine, if_exists='append', index=False, chunksize=1000, method='multi')
-                        
-                        percent = min(end_idx / total_rows, 1.0)
-                        progress_up.progress(percent)
-                        status_up.write(f"🚀 อัปโหลดแล้ว: {end_idx:,} / {total_rows:,} แถว ({percent*100:.1f}%)")
-                
-                    st.balloons()
-                    st.success(f"🚀 อัปโหลดสำเร็จ! ({len(df_final):,} แถว)")
-                    
-                    # ล้างไฟล์ใน Completed_Archive
-                    if os.path.exists(ARCHIVE_DIR):
-                        for f in os.listdir(ARCHIVE_DIR):
-                            f_path = os.path.join(ARCHIVE_DIR, f)
-                            try:
-                                if os.path.isfile(f_path): os.unlink(f_path)
-                                elif os.path.isdir(f_path): shutil.rmtree(f_path)
-                            except Exception as e:
-                                st.warning(f"⚠️ ไม่สามารถลบไฟล์ {f}: {e}")
-                        st.info(f"🧹 ทำความสะอาดโฟลเดอร์ {os.path.basename(ARCHIVE_DIR)} เรียบร้อยแล้ว")
-                    
-                    del df_final
-                    gc.collect()
-
-                except Exception as e:
-                    st.error(f"❌ Database Error: {e}")
-                    if 'engine' in locals(): engine.dispose()
+                # ส่งเป็นงานเบื้องหลัง ทำต่อแม้ rerun / ปิดแท็บ (ดูสถานะที่ส่วนงานอัปโหลดด้านล่าง)
+                replace_where, replace_params = replace_predicate(sel_year, sel_month_idx)
+                # ล้างไฟล์ใน Completed_Archive ที่มีอยู่ตอนกดอัปโหลด หลังจากอัปโหลดสำเร็จ
+                archived = [os.path.join(ARCHIVE_DIR, f) for f in os.listdir(ARCHIVE_DIR)] if os.path.exists(ARCHIVE_DIR) else []
+                archived = list(dict.fromkeys(archived + file_archiver.pending(ARCHIVE_DIR)))
+                job = upload_jobs.submit(
+                    f"เดือน {sel_month_name} {sel_year} → {table_name} ({len(df_final):,} แถว)",
+                    run_upload, df_final, db_url(db_user, db_pass, db_host, db_name), table_name, load_method,
+                    SWAP if replace_mode == REPLACE_MODES[1] else OVERWRITE,
+                    report="ZCAKR005", to_db=to_db_frame, replace_where=replace_where, replace_params=replace_params,
+                    # ตารางปลายทางเป็น DATE + period + index (สร้าง/ปรับโครงสร้างครั้งแรกที่อัปโหลด)
+                    schema=table_spec(zcakr005), cleanup_paths=archived,
+                    # เก็บข้อมูล + checkpoint ทุกชุด ล้มเหลวแล้วทำต่อได้จากส่วนงานค้าง
+                    resumable=resumable,
+                )
+                st.success(f"📨 ส่งงาน `{job.id}` เข้าคิวแล้ว ปิดแท็บหรือทำงานอื่นต่อได้ งานยังทำต่อเบื้องหลัง")
+
+# --- 6. งานอัปโหลดเบื้องหลัง (สถานะ / ยกเลิก / ประวัติ) ---
+job_panel(upload_jobs, "ZCAKR005")
+resume_panel(upload_jobs, "ZCAKR005", db_url(db_user, db_pass, db_host, db_name))
+
+# --- 7. Metrics (เวลา / หน่วยความจำ / connection pool) ---
+show_metrics(metrics, persist=fresh_files > 0)
+pool_panel()
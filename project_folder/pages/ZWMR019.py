@@ -1,11 +1,22 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
-import gc
 import os
-import shutil
 from datetime import datetime
+from core.sniff import format_counter
+from core.loaders import LOAD_METHODS, REPLACE_MODES
+from core.pipeline import EXEC_MODES, default_workers, process_uploads
+from core.cache import upload_cache
+from core.archive import discard, file_archiver
+from core import zwmr019
+from core.zwmr019 import process_file as process_zwmr019, to_db_frame, filter_period, replace_predicate, business_key
+from core.dedup import KeyIndex, duplicate_note
+from core.schema import concat_frames, frame_bytes
+from core.metrics import StageLog
+from core.export import export_version
+from core.jobs import upload_jobs
+from core.upload import OVERWRITE, SWAP, db_url, run_upload
+from core.migrations import table_spec
+from ui import show_messages, preview_frame, show_metrics, download_panel, job_panel, pool_panel, dedup_panel, resume_panel
 
 # --- 1. ตั้งค่าหน้าเว็บ & Path ---
 st.set_page_config(page_title="ZWMR019 Upload", layout="wide")
@@ -15,92 +26,7 @@ BASE_DIR = r"D:\work\บน\dept\project_folder\convert"
 ARCHIVE_DIR = os.path.join(BASE_DIR, "Completed_Archive")
 os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
-# --- 2. Mapping & Logic ---
-mapping_dict_activity = {
-    'รหัสการไฟฟ้า': 'pea_code_main',
-    'ใบแจ้งดำเนินการ': 'notice_doc_no',
-    'ผู้ปฏิบัติงาน': 'worker_id',
-    'การดำเนินการ': 'action_name',
-    'กิจกรรม PM': 'pm_activity',
-    'ประเภทกิจกรรม': 'activity_type',
-    'Flag': 'flag',
-    'เอกสารเสนองดจ่ายไฟ': 'disconnect_doc_no',
-    'วันที่แจ้งดำเนินการ': 'notice_date',
-    'วันที่กำหนดแล้วเสร็จ': 'due_date',
-    'บัญชีแสดงสัญญา': 'ca_no',
-    'ชื่อ-สกุล': 'customer_name',
-    'เลขที่มิเตอร์ที่ดำเนินการ': 'meter_no',
-    'หน่วยอ่าน': 'read_unit',
-    'วันที่บันทึกจริง': 'actual_record_date',
-    'วันที่ดำเนินการ': 'action_date',
-    'เวลาที่ดำเนินการ': 'action_time',
-    'ใบสั่งงาน': 'work_order_no',
-    'ผู้บันทึกข้อมูล': 'recorder_id'
-}
-
-def smart_read_activity(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    header_keywords = ['บัญชีแสดงสัญญา', 'เลขที่สัญญา', 'CA', 'Contract Account', 'BA', 'รหัสการไฟฟ้า', 'PEA', 'ใบแจ้งดำเนินการ', 'Notice']
-    
-    def find_h_idx(df):
-        if df is None or df.empty: return -1
-        # Scan first 60 rows for any keyword
-        for i, row in df.head(60).iterrows():
-            row_text = " ".join([str(x).replace('\xa0', ' ').strip().lower() for x in row.values])
-            if any(kw.lower() in row_text for kw in header_keywords):
-                return i
-        return -1
-
-    try:
-        # Priority 1: Real Excel (XLSX or XLS)
-        if ext == '.xlsx':
-            df_peak = pd.read_excel(file_path, engine='openpyxl', header=None, nrows=100)
-            h = find_h_idx(df_peak)
-            if h != -1: return pd.read_excel(file_path, engine='openpyxl', header=h)
-        else: # .xls variant
-            try:
-                # Try as binary XLS (97-2003)
-                df_peak = pd.read_excel(file_path, engine='xlrd', header=None, nrows=100)
-                h = find_h_idx(df_peak)
-                if h != -1: return pd.read_excel(file_path, engine='xlrd', header=h)
-            except: pass
-            
-            # Priority 2: UTF-16 TSV (Very common for large SAP exports named .xls)
-            try:
-                # Use names=range(200) to safely read rows with potentially many columns
-                df_peak = pd.read_csv(file_path, sep='\t', encoding='utf-16', header=None, names=range(200), on_bad_lines='skip', nrows=100)
-                h = find_h_idx(df_peak)
-                if h != -1: 
-                    return pd.read_csv(file_path, sep='\t', encoding='utf-16', header=h, on_bad_lines='skip', low_memory=False)
-            except: pass
-            
-            # Priority 3: HTML Fallback (XML reports named .xls)
-            try:
-                html_dfs = pd.read_html(file_path)
-                for table in html_dfs:
-                    h = find_h_idx(table.head(100))
-                    if h != -1:
-                        table.columns = [str(c).strip() for c in table.iloc[h]]
-                        return table.iloc[h+1:].reset_index(drop=True)
-            except: pass
-
-        # Absolute Fallback: Flexible CSV with multiple encodings
-        for enc in ['utf-8-sig', 'tis-620', 'cp1252']:
-            try:
-                df_peak = pd.read_csv(file_path, header=None, nrows=100, on_bad_lines='skip', encoding=enc, sep=None, engine='python')
-                h = find_h_idx(df_peak)
-                if h != -1:
-                     return pd.read_csv(file_path, header=h, on_bad_lines='skip', encoding=enc, sep=None, engine='python')
-            except: continue
-
-        # Final Failure
-        st.error(f"❌ ไม่สามารถระบุรูปแบบไฟล์ หรือไม่พบหัวตารางในไฟล์ {os.path.basename(file_path)}")
-        st.info("💡 ไฟล์นี้ควรมีคอลัมน์ใดคอลัมน์หนึ่ง: " + ", ".join(header_keywords))
-        return None
-
-    except Exception as e:
-        st.error(f"❌ Error logic ZWMR019: {os.path.basename(file_path)}: {e}")
-        return None
+# --- 2. Mapping & Logic อยู่ใน core/zwmr019.py (ใช้ร่วมกับ Process Pool ได้) ---
 
 # --- 3. Sidebar ---
 st.sidebar.header("🔌 Database Connection")
@@ -112,6 +38,37 @@ table_name = st.sidebar.text_input("Table Name", value="dept_activity_master")
 
 st.sidebar.divider()
 st.sidebar.header("⚙️ ตั้งค่าการอัปโหลด")
+load_method = st.sidebar.radio(
+    "วิธีนำเข้าข้อมูล MySQL",
+    LOAD_METHODS,
+    index=0,
+    help="INSERT: to_sql แบบเดิม | LOAD DATA: ส่งไฟล์ TSV ชั่วคราวให้ MySQL นำเข้าเอง เร็วกว่ามากสำหรับข้อมูลจำนวนมาก (Server ต้องเปิด local_infile)"
+)
+replace_mode = st.sidebar.radio(
+    "วิธีแทนที่ข้อมูลเดิมของเดือน",
+    REPLACE_MODES,
+    index=0,
+    help="Atomic Swap: นำเข้าลงตาราง staging ก่อน แล้วแทนที่แถวเดิมของขอบเขตนี้ใน transaction เดียว (ทั้งตาราง: RENAME TABLE) Dashboard จะไม่เห็นข้อมูลเดือนนี้หายหรือครึ่งๆ กลางๆ เวลาขึ้นกับขนาดข้อมูลที่แทนที่ ไม่ใช่ทั้งตาราง (ต้องมีสิทธิ์ CREATE / DROP / ALTER)"
+)
+exec_mode = st.sidebar.radio(
+    "การประมวลผลไฟล์",
+    EXEC_MODES,
+    index=0,
+    help="ขนาน: อ่านและทำความสะอาดหลายไฟล์พร้อมกันด้วย Process Pool (เหมาะกับการอัปโหลด 10-20 ไฟล์)"
+)
+exec_workers = default_workers()
+if exec_mode == EXEC_MODES[1]:
+    exec_workers = st.sidebar.number_input("จำนวน Worker", min_value=1, max_value=32, value=default_workers(), step=1)
+
+drop_duplicates = st.sidebar.checkbox(
+    "ตัดแถวซ้ำข้ามไฟล์",
+    value=True,
+    help="ไฟล์ export ที่ช่วงวันที่ทับกัน: แถวที่ key (" + ", ".join(business_key) + ") เคยมาจากไฟล์ก่อนหน้าจะไม่ถูกนำเข้าซ้ำ"
+)
+resumable = st.sidebar.checkbox("บันทึก checkpoint ระหว่างนำเข้า", value=True,
+                                help="เก็บข้อมูลที่ clean แล้วไว้ในเครื่องและบันทึกจุดที่ commit ทุกชุด การเชื่อมต่อหลุดแล้วทำต่อได้โดยไม่ลบ/อ่านไฟล์ใหม่")
+keep_archive = st.sidebar.checkbox("เก็บไฟล์ต้นฉบับใน Completed_Archive", value=True,
+                                   help="เขียนไฟล์ด้วย thread เบื้องหลังหลังอ่านเสร็จ ไม่ทำให้การประมวลผลช้าลง")
 
 # --- เพิ่มส่วนเลือกประเภทกิจกรรม ---
 activity_type = st.sidebar.radio(
@@ -131,9 +88,6 @@ months_th = [
 sel_year = st.sidebar.selectbox("ปี (YYYY)", years, index=years.index(current_year))
 sel_month_name = st.sidebar.selectbox("เดือน", months_th, index=datetime.now().month - 1)
 sel_month_idx = months_th.index(sel_month_name) + 1
-target_period_sql1 = f"{sel_year}-{sel_month_idx:02d}-%"  # For SQL LIKE e.g. 2026-03-%
-target_period_sql2 = f"%.{sel_month_idx:02d}.{sel_year}"  # For SQL LIKE e.g. %.03.2026
-target_period_df = f"{sel_month_idx:02d}.{sel_year}"
 
 st.sidebar.info(f"💡 ระบบจะทำการ **ลบข้อมูลเดิม** ของเดือน **{sel_month_name} {sel_year}** ประเภท **{activity_type}** ออกก่อน แล้วจึงนำเข้าข้อมูลใหม่จากไฟล์ที่ท่านอัปโหลด")
 
@@ -141,103 +95,63 @@ st.sidebar.info(f"💡 ระบบจะทำการ **ลบข้อมู
 uploaded_files = st.file_uploader("เลือกไฟล์ Excel (xls/xlsx) : ZWMR019", type=["xlsx", "xls"], accept_multiple_files=True)
 
 df_final = pd.DataFrame()
+metrics = StageLog("ZWMR019")  # เวลา/หน่วยความจำของรอบนี้ (แสดงท้ายหน้า)
+fresh_files = 0
+dataset_keys = []  # cache key ของไฟล์ที่รวมใน df_final (ใช้เป็น version ของไฟล์ดาวน์โหลด)
 
 if uploaded_files:
     all_dataframes = []
-    session_filenames = []
-
-    with st.spinner('⏳ กำลังประมวลผลไฟล์...'):
-        for uploaded_file in uploaded_files:
-            if uploaded_file.name.startswith("~$"): continue
-            
-            temp_path = os.path.join(BASE_DIR, uploaded_file.name)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            df_temp = smart_read_activity(temp_path)
-            
-            if df_temp is not None:
-                # Check if it's a "ต่อกลับ" file when user selected "ต่อกลับ" mode
-                # "ต่อกลับ" files must have 'กิจกรรม PM' (pm_activity)
-                original_cols = [str(c).strip().replace('\xa0', ' ').lower() for c in df_temp.columns]
-                has_pm_activity = any('กิจกรรม' in col and 'pm' in col for col in original_cols) or ('pm_activity' in original_cols)
-                
-                if activity_type == "ต่อกลับ" and not has_pm_activity:
-                    st.error(f"❌ ไฟล์ {uploaded_file.name} ไม่ใช่ไฟล์ประเภท 'ต่อกลับ' (ไม่พบคอลัมน์ 'กิจกรรม PM') กรุณาตรวจสอบและเลือกประเภทข้อมูลให้ถูกต้อง")
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                    continue
-                
-                if activity_type == "งดจ่าย" and has_pm_activity:
-                    st.error(f"❌ ไฟล์ {uploaded_file.name} ไม่ใช่ไฟล์ประเภท 'งดจ่าย' (พบคอลัมน์ 'กิจกรรม PM' ซึ่งเป็นส่วนหนึ่งของไฟล์ต่อกลับ) กรุณาตรวจสอบและเลือกประเภทข้อมูลให้ถูกต้อง")
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                    continue
-
-                len_raw = len(df_temp)
-                
-                # 1. Clean columns and rename
-                df_temp.columns = [str(c).strip() for c in df_temp.columns]
-                df_temp = df_temp.rename(columns=mapping_dict_activity)
-                
-                # 2. Ensure all expected columns exist (even if empty) to fix "missing columns" issue
-                for eng_col in mapping_dict_activity.values():
-                    if eng_col not in df_temp.columns:
-                        df_temp[eng_col] = np.nan
-                
-                # 3. Add activity_type_upload column
-                df_temp['activity_type_upload'] = activity_type
-
-                # 4. Select only mapped columns in order
-                ordered_cols = list(dict.fromkeys(mapping_dict_activity.values()))
-                if 'activity_type_upload' not in ordered_cols:
-                    ordered_cols.append('activity_type_upload')
-                df_temp = df_temp[ordered_cols].copy()
-
-                # 4. Strip whitespace and convert empty strings to NaN
-                for col in df_temp.select_dtypes(include=['object']).columns:
-                    df_temp[col] = df_temp[col].fillna("").astype(str).str.strip().replace(['', 'nan', 'NaN', 'None'], np.nan)
-
-
-                # 5. Filter out duplicate headers and purely empty rows
-                if 'ca_no' in df_temp.columns:
-                    # Filter out rows that look like headers
-                    header_labels = ['บัญชีแสดงสัญญา', 'ca_no', 'BA']
-                    df_temp = df_temp[~df_temp['ca_no'].astype(str).isin(header_labels)]
-                    # Ensure ca_no contains at least one digit (filters out random text/empty)
-                    df_temp = df_temp[df_temp['ca_no'].astype(str).str.contains(r'\d', na=False)]
-
-                # Drop rows where all columns are NaN
-                df_temp = df_temp.dropna(how='all')
-
-                if not df_temp.empty:
-                    # Handle Date columns
-                    date_cols = ['notice_date', 'due_date', 'actual_record_date', 'action_date', 'doc_date', 'notice_due_date']
-                    for col in date_cols:
-                        if col in df_temp.columns:
-                            df_temp[col] = pd.to_datetime(df_temp[col], dayfirst=True, errors='coerce').dt.date
-                    
-                    if 'action_time' in df_temp.columns:
-                        df_temp['action_time'] = df_temp['action_time'].astype(str).str.strip()
-
-                    all_dataframes.append(df_temp)
-                    st.write(f"📊 **{uploaded_file.name}**: อ่านได้ {len_raw:,} แถว | Cleaned {len(df_temp):,} แถว")
-                else:
-                    st.warning(f"⚠️ ไฟล์ {uploaded_file.name}: ไม่มีข้อมูลหลังจากทำความสะอาด")
-                
-                shutil.move(temp_path, os.path.join(ARCHIVE_DIR, uploaded_file.name))
-                session_filenames.append(uploaded_file.name)
+    archived_paths = []
+    dedup = KeyIndex(business_key)  # hash ของ key จากไฟล์ที่รวมแล้ว (ทีละไฟล์ ไม่ต้องรวม DataFrame ก่อน)
+
+    with st.spinner('⏳ กำลังประมวลผลไฟล์...'), metrics.stage('process_files') as stage_files:
+        # อ่านจากหน่วยความจำโดยตรง ไฟล์ที่เคยประมวลผลแล้ว (เนื้อหาและตัวเลือกเดิม) ใช้ผลจาก cache
+        uploads = [(f.name, f.getvalue()) for f in uploaded_files if not f.name.startswith("~$")]
+        # กรองเดือนที่เลือกตั้งแต่ตอนอ่าน (แถวเดือนอื่นไม่ถูก clean)
+        results = process_uploads(process_zwmr019, uploads, {"activity_type": activity_type, "period": [sel_year, sel_month_idx]}, report="ZWMR019", cache=upload_cache,
+                                  parallel=(exec_mode == EXEC_MODES[1]), max_workers=int(exec_workers))
+        for res, source, from_cache, key in results:
+            show_messages(res.messages)
+            if res.df is not None:
+                df_file, n_dup = dedup.take(res.df, res.name) if drop_duplicates else (res.df, 0)
+                if n_dup:
+                    show_messages([duplicate_note(res.name, n_dup)])
+                all_dataframes.append(df_file)
+                dataset_keys.append(key)
+            if from_cache:
+                st.caption(f"⚡ {res.name}: ใช้ผลจาก cache (ไฟล์ไม่เปลี่ยนแปลง)")
+                metrics.add('cache_hit', 0.0, len(res.df) if res.df is not None else 0, res.name)
+                continue
+            fresh_files += 1
+            metrics.extend(res.stages)
+            if res.status == 'done' and keep_archive:
+                # เก็บไฟล์ต้นฉบับใน Archive ด้วย thread เบื้องหลัง (ไม่รอเขียนไฟล์)
+                archived_paths.append(file_archiver.submit(source, ARCHIVE_DIR))
+            elif res.status == 'read_error':
+                # ไฟล์ที่อ่านไม่ได้คงไว้ในโฟลเดอร์ convert ให้ตรวจสอบเหมือนเดิม
+                file_archiver.submit(source, BASE_DIR)
+            else:
+                discard(source)
+        stage_files['rows'] = sum(len(df) for df in all_dataframes)
+
+    dedup_panel(dedup)
+    if format_counter:
+        st.caption("🔎 เส้นทางการอ่านไฟล์ (สะสม): " + " | ".join(f"{k} {v:,} ไฟล์" for k, v in format_counter.most_common()))
+    cache_stats = upload_cache.stats()
+    st.caption(f"🗃️ Cache: hit {cache_stats['hits']:,} (disk {cache_stats['disk_hits']:,}) | miss {cache_stats['misses']:,} | "
+               f"evict {cache_stats['evictions']:,} | ในหน่วยความจำ {cache_stats['entries']:,} ไฟล์ ({cache_stats['mem_bytes'] / 1024**2:,.1f} MB)")
+    for path, err in file_archiver.take_errors():
+        st.warning(f"⚠️ เก็บไฟล์ {os.path.basename(path)} ไม่สำเร็จ: {err}")
 
     if all_dataframes:
-        df_final = pd.concat(all_dataframes, ignore_index=True)
+        with metrics.stage('concat', rows=sum(len(df) for df in all_dataframes)):
+            df_final = concat_frames(all_dataframes)
+        st.caption(f"🧮 หน่วยความจำข้อมูลรวม: {frame_bytes(df_final) / 1024**2:,.1f} MB")
         
         # --- Filter by Selected Month/Year (action_date) ---
         if 'action_date' in df_final.columns:
-            action_date_dt = pd.to_datetime(df_final['action_date'], errors='coerce')
-            df_final = df_final[
-                (action_date_dt.dt.year == sel_year) & 
-                (action_date_dt.dt.month == sel_month_idx)
-            ].copy()
+            # action_date เป็น datetime64 อยู่แล้ว (แปลงตอน clean) ไม่ต้อง parse ซ้ำ
+            df_final = filter_period(df_final, sel_year, sel_month_idx)
             
         if df_final.empty:
             st.error(f"❌ ไม่พบข้อมูลที่มีวันที่ดำเนินการ (Action Date) ตรงกับเดือน {sel_month_name} {sel_year}")
@@ -245,14 +159,13 @@ if uploaded_files:
         else:
             st.divider()
             st.subheader(f"📊 ตัวอย่างข้อมูลรวมเฉพาะเดือน {sel_month_name} {sel_year} ({len(df_final):,} แถว)")
-            st.dataframe(df_final.head(10).fillna("Null"))
+            st.dataframe(preview_frame(df_final))
 
 # --- 5. Export ---
 if not df_final.empty:
     col1, col2 = st.columns(2)
     with col1:
-        csv = df_final.to_csv(index=False).encode('utf-8-sig')
-        st.download_button(label="📥 ดาวน์โหลด CSV", data=csv, file_name=f"ZWMR019_cleaned.csv", mime="text/csv", use_container_width=True)
+        download_panel(df_final, export_version("ZWMR019", dataset_keys, sel_year, sel_month_idx, drop_duplicates, business_key), "ZWMR019_cleaned", to_db_frame, metrics, label="📥 ดาวน์โหลด")
 
     with col2:
         # --- First Row Validation ---
@@ -271,58 +184,27 @@ if not df_final.empty:
             st.info("กรุณาตรวจสอบให้แน่ใจว่าเลือกเดือนถูกต้องก่อนกดอัปโหลด")
 
         if st.button(f"📤 ส่งข้อมูลเข้า MySQL", type="primary", use_container_width=True):
-            try:
-                conn_str = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
-                engine = create_engine(conn_str, pool_pre_ping=True)
-                with engine.connect() as conn:
-                    st.warning(f"🗑️ กำลังล้างข้อมูลเฉพาะประเภท '{activity_type}' ประจำเดือน {sel_month_name} {sel_year}...")
-                    delete_query = text(
-                        f"DELETE FROM {table_name} "
-                        f"WHERE activity_type_upload = :act_type "
-                        f"AND (action_date LIKE :period1 OR action_date LIKE :period2)"
-                    )
-                    conn.execute(delete_query, {
-                        "act_type": activity_type,
-                        "period1": target_period_sql1,
-                        "period2": target_period_sql2
-                    })
-                    conn.commit()
-                    st.success(f"✅ ล้างข้อมูลเก่าประเภท '{activity_type}' ประจำเดือน {sel_month_name} {sel_year} เรียบร้อยแล้ว")
-
-                    # Upload
-                    st.info(f"⏳ กำลังนำเข้าข้อมูลใหม่ {len(df_final):,} แถว...")
-                    total_rows = len(df_final)
-                    ui_batch_size = 20000
-                    progress_up = st.progress(0)
-                    status_up = st.empty()
-                    for start_idx in range(0, total_rows, ui_batch_size):
-                        end_idx = min(start_idx + ui_batch_size, total_rows)
-                        chunk = df_final.iloc[start_idx:end_idx]
-                        chunk.to_sql(table_name, con=engine, if_exists='append', index=False, chunksize=1000, method='multi')
-                        
-                        percent = min(end_idx / total_rows, 1.0)
-                        progress_up.progress(percent)
-                        status_up.write(f"🚀 อัปโหลดแล้ว: {end_idx:,} / {total_rows:,} แถว ({percent*100:.1f}%)")
-                
-                st.balloons()
-                st.success(f"🚀 อัปโหลดสำเร็จ! ({len(df_final):,} แถว)")
-                
-                # ล้างไฟล์ใน Completed_Archive หลังจากอัปโหลดสำเร็จ
-                if os.path.exists(ARCHIVE_DIR):
-                    for f in os.listdir(ARCHIVE_DIR):
-                        f_path = os.path.join(ARCHIVE_DIR, f)
-                        try:
-                            if os.path.isfile(f_path) or os.path.islink(f_path):
-                                os.unlink(f_path)
-                            elif os.path.isdir(f_path):
-                                shutil.rmtree(f_path)
-                        except Exception as e:
-                            st.warning(f"⚠️ ไม่สามารถลบไฟล์ {f}: {e}")
-                    st.info(f"🧹 ทำความสะอาดโฟลเดอร์ {os.path.basename(ARCHIVE_DIR)} เรียบร้อยแล้ว")
-                
-                del df_final
-                gc.collect()
-
-            except Exception as e:
-                st.error(f"❌ Database Error: {e}")
-                if 'engine' in locals(): engine.dispose()
+            # ส่งเป็นงานเบื้องหลัง ทำต่อแม้ rerun / ปิดแท็บ (ดูสถานะที่ส่วนงานอัปโหลดด้านล่าง)
+            replace_where, replace_params = replace_predicate(activity_type, sel_year, sel_month_idx)
+            # ล้างไฟล์ใน Completed_Archive ที่มีอยู่ตอนกดอัปโหลด หลังจากอัปโหลดสำเร็จ
+            archived = [os.path.join(ARCHIVE_DIR, f) for f in os.listdir(ARCHIVE_DIR)] if os.path.exists(ARCHIVE_DIR) else []
+            archived = list(dict.fromkeys(archived + file_archiver.pending(ARCHIVE_DIR)))
+            job = upload_jobs.submit(
+                f"{activity_type} เดือน {sel_month_name} {sel_year} → {table_name} ({len(df_final):,} แถว)",
+                run_upload, df_final, db_url(db_user, db_pass, db_host, db_name), table_name, load_method,
+                SWAP if replace_mode == REPLACE_MODES[1] else OVERWRITE,
+                report="ZWMR019", to_db=to_db_frame, replace_where=replace_where, replace_params=replace_params,
+                # ตารางปลายทางเป็น DATE + period + index (สร้าง/ปรับโครงสร้างครั้งแรกที่อัปโหลด)
+                schema=table_spec(zwmr019), cleanup_paths=archived,
+                # เก็บข้อมูล + checkpoint ทุกชุด ล้มเหลวแล้วทำต่อได้จากส่วนงานค้าง
+                resumable=resumable,
+            )
+            st.success(f"📨 ส่งงาน `{job.id}` เข้าคิวแล้ว ปิดแท็บหรือทำงานอื่นต่อได้ งานยังทำต่อเบื้องหลัง")
+
+# --- 6. งานอัปโหลดเบื้องหลัง (สถานะ / ยกเลิก / ประวัติ) ---
+job_panel(upload_jobs, "ZWMR019")
+resume_panel(upload_jobs, "ZWMR019", db_url(db_user, db_pass, db_host, db_name))
+
+# --- 7. Metrics (เวลา / หน่วยความจำ / connection pool) ---
+show_metrics(metrics, persist=fresh_files > 0)
+pool_panel()
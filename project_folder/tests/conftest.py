@@ -0,0 +1,13 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# ให้ import core.* ได้เมื่อรัน pytest จากโฟลเดอร์ใดก็ได้
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# cache / งานค้าง (core.source.user_dir) ของการทดสอบไม่ปนกับของผู้ใช้ ต้องตั้งก่อน import core.*
+_data_dir = tempfile.mkdtemp(prefix="dept-tests-")
+os.environ["DEPT_DATA_DIR"] = _data_dir
+atexit.register(shutil.rmtree, _data_dir, ignore_errors=True)
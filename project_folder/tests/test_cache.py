@@ -0,0 +1,56 @@
+import pandas as pd
+
+from core.cache import ResultCache
+from core.pipeline import FileResult
+
+
+def _result(n=100, name='a.xlsx'):
+    df = pd.DataFrame({'grp': pd.Categorical(['E', 'F'] * (n // 2)), 'amount': range(n)})
+    return FileResult(name, df, [('write', name)], 'xlsx', 'done', [], None)
+
+
+def test_key_depends_on_content_report_and_params():
+    key = ResultCache.make_key(b'data', 'ZCANR030', {'selected_group': 'E'})
+    assert key == ResultCache.make_key(b'data', 'ZCANR030', {'selected_group': 'E'})
+    assert key != ResultCache.make_key(b'data2', 'ZCANR030', {'selected_group': 'E'})
+    assert key != ResultCache.make_key(b'data', 'ZCANR030', {'selected_group': 'F'})
+    assert key != ResultCache.make_key(b'data', 'ZWMR019', {'selected_group': 'E'})
+
+
+def test_memory_hit_and_miss(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    assert cache.get('k') is None
+    res = _result()
+    cache.put('k', res)
+    assert cache.get('k') is res
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_disk_survives_new_process_cache(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put('k', _result())
+    # เหมือน process ใหม่: ไม่มีในหน่วยความจำ อ่านจากดิสก์แล้ว dtype เดิม
+    cache = ResultCache(disk_dir=str(tmp_path))
+    res = cache.get('k')
+    assert cache.stats()['disk_hits'] == 1
+    pd.testing.assert_frame_equal(res.df, _result().df)
+    assert res.messages == [('write', 'a.xlsx')]
+
+
+def test_memory_eviction_keeps_disk_copy(tmp_path):
+    small = _result(1000)
+    cache = ResultCache(max_mem_bytes=int(small.df.memory_usage(deep=True).sum() * 1.5), disk_dir=str(tmp_path))
+    cache.put('a', small)
+    cache.put('b', _result(1000, 'b.xlsx'))
+    assert cache.stats()['entries'] == 1 and cache.stats()['evictions'] == 1
+    assert cache.get('a').name == 'a.xlsx'
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_disk_trim_and_clear(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_bytes=1)
+    cache.put('a', _result())
+    # เกินขนาดดิสก์ที่กำหนด ไล่ไฟล์ออก (ยังอยู่ในหน่วยความจำ)
+    assert not list(tmp_path.glob('*.pkl'))
+    assert cache.get('a') is not None
+    cache.clear()
+    assert cache.get('a') is None
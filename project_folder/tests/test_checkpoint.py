@@ -0,0 +1,101 @@
+from contextlib import nullcontext
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from core import checkpoint, loaders
+from core.db import get_engine
+from core.loaders import LOAD_METHODS
+from core.upload import APPEND, OVERWRITE, resume_upload, run_upload
+
+ROWS = 50000  # 3 ชุดของ insert_multi (ชุดละ 20,000 แถว)
+
+
+class Job:
+    stage = ""
+
+    def __init__(self):
+        self.logs = []
+
+    def log(self, level, msg):
+        self.logs.append((level, msg))
+
+    def set_stage(self, msg):
+        self.stage = msg
+
+    def progress(self, done, total):
+        pass
+
+
+@pytest.fixture
+def url(tmp_path, monkeypatch):
+    # sqlite แทน MySQL: ไม่มี SET SESSION และ information_schema จึงสร้าง journal เอง
+    monkeypatch.setattr(loaders, 'bulk_session', lambda conn, settings=None: nullcontext(conn))
+    monkeypatch.setattr(checkpoint, 'ensure_table', lambda engine, table_name, spec: [])
+    url = f"sqlite:///{tmp_path / 'db.sqlite'}"
+    with get_engine(url, LOAD_METHODS[0]).begin() as conn:
+        conn.execute(text(f"CREATE TABLE `{checkpoint.JOURNAL_TABLE}` (load_id TEXT PRIMARY KEY, report TEXT, "
+                          "table_name TEXT, mode TEXT, stage TEXT, total_rows INTEGER, committed_rows INTEGER DEFAULT 0, "
+                          "error TEXT)"))
+        conn.execute(text("CREATE TABLE target (id INTEGER, grp TEXT)"))
+        conn.execute(text("INSERT INTO target VALUES (-1, 'A'), (-2, 'B')"))
+    return url
+
+
+def _fail_on_checkpoint(monkeypatch, call):
+    # connection หลุดระหว่างชุดที่ call (ครั้งเดียว): ชุดนั้น rollback พร้อม checkpoint ของมัน
+    original = checkpoint.LoadJournal.checkpoint
+    calls = []
+
+    def flaky(self, conn, rows):
+        calls.append(rows)
+        if len(calls) == call:
+            raise ConnectionError("lost connection")
+        original(self, conn, rows)
+    monkeypatch.setattr(checkpoint.LoadJournal, 'checkpoint', flaky)
+
+
+def _rows(url, sql):
+    with get_engine(url, LOAD_METHODS[0]).connect() as conn:
+        return conn.execute(text(sql)).fetchone()
+
+
+def _journal(url):
+    return _rows(url, f"SELECT stage, committed_rows FROM `{checkpoint.JOURNAL_TABLE}`")
+
+
+@pytest.mark.parametrize("mode, where, kept", [(APPEND, None, 2), (OVERWRITE, "grp = 'A'", 1)])
+def test_resume_continues_from_last_committed_batch(url, monkeypatch, mode, where, kept):
+    df = pd.DataFrame({'id': range(ROWS), 'grp': 'A'})
+    _fail_on_checkpoint(monkeypatch, 3)
+    with pytest.raises(ConnectionError):
+        run_upload(Job(), df, url, 'target', LOAD_METHODS[0], mode, report='TEST',
+                   replace_where=where, persist_metrics=False, resumable=True)
+    assert _journal(url) == ('write', 40000)
+    assert _rows(url, "SELECT COUNT(*) FROM target WHERE id >= 0")[0] == 40000
+
+    [pending] = checkpoint.pending_loads('TEST')
+    result = resume_upload(Job(), pending['load_id'], url)
+
+    # ลบแถวเดิมครั้งเดียว (ไม่ลบชุดที่ commit แล้ว) และไม่มีแถวซ้ำ/หาย
+    assert result['rows_written'] == ROWS
+    assert _rows(url, "SELECT COUNT(*), COUNT(DISTINCT id) FROM target WHERE id >= 0") == (ROWS, ROWS)
+    assert _rows(url, "SELECT COUNT(*) FROM target WHERE id < 0")[0] == kept
+    assert _journal(url) == ('done', ROWS)
+    assert checkpoint.pending_loads('TEST') == []
+
+
+def test_new_load_abandons_pending_load_of_same_table(url, monkeypatch):
+    df = pd.DataFrame({'id': range(ROWS), 'grp': 'A'})
+    _fail_on_checkpoint(monkeypatch, 1)
+    with pytest.raises(ConnectionError):
+        run_upload(Job(), df, url, 'target', LOAD_METHODS[0], APPEND, report='TEST', persist_metrics=False, resumable=True)
+    [pending] = checkpoint.pending_loads('TEST')
+
+    engine = get_engine(url, LOAD_METHODS[0])
+    load = checkpoint.start_load(engine, df.head(10), {'table_name': 'target', 'mode': APPEND}, 'TEST')
+    checkpoint.release_load(load, finished=True)
+    assert checkpoint.pending_loads('TEST') == []
+    with pytest.raises(ValueError):
+        checkpoint.open_load(engine, pending['load_id'])
@@ -0,0 +1,35 @@
+from core.columns import Column, ReportLayout, register_layout, resolve_columns
+from core.header import HeaderSpec
+
+LAYOUT = register_layout(ReportLayout(
+    name='TEST_COLUMNS',
+    header=HeaderSpec(['เลขที่'], 1),
+    columns=[
+        Column('doc_no', ['เลขที่เอกสาร']),
+        # กติกาที่มาก่อนชนะ แม้คำของกติกาหลังจะเริ่มก่อนในหัวตาราง
+        Column('tax', contains=['ภาษี']),
+        Column('amount', contains=['ค่าภาษี', 'จำนวนเงิน']),
+    ],
+    required=['doc_no'],
+))
+
+
+def test_exact_and_contains():
+    res = resolve_columns(LAYOUT.name, ('เลขที่เอกสาร', 'จำนวนเงินรวม'))
+    assert res.rename == {'เลขที่เอกสาร': 'doc_no', 'จำนวนเงินรวม': 'amount'}
+    assert res.missing == ('tax',)
+    assert res.missing_required == ()
+
+
+def test_lookahead_prefers_earlier_rule():
+    # 'ค่าภาษี' เริ่มที่ตำแหน่ง 0 แต่ 'ภาษี' (กติกาก่อนหน้า) ที่ซ้อนอยู่ต้องชนะ
+    assert resolve_columns(LAYOUT.name, ('ยอดค่าภาษีรวม',)).rename == {'ยอดค่าภาษีรวม': 'tax'}
+
+
+def test_normalised_header_and_first_wins():
+    res = resolve_columns(LAYOUT.name, (' เลขที่เอกสาร\xa0', 'เลขที่เอกสาร'))
+    assert res.rename == {' เลขที่เอกสาร\xa0': 'doc_no'}
+
+
+def test_missing_required():
+    assert resolve_columns(LAYOUT.name, ('ภาษี',)).missing_required == ('doc_no',)
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from core import zcanr030
+from core.dates import format_dates, parse_dates
+
+
+def _one(value):
+    return parse_dates(pd.Series([value]))[0]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2026-03-15", "2026-03-15"),
+    ("2026-03-15 10:20:00", "2026-03-15"),
+    ("15.03.2026", "2026-03-15"),
+    ("15.03.2569", "2569-03-15"),  # รูปแบบตัวเลขเก็บปีตามที่เขียน
+    ("15/03/26", "2026-03-15"),    # ปี 2 หลักของรูปแบบตัวเลขเป็น 20xx
+    ("15/03/69", "2069-03-15"),
+    ("03/2026", "2026-03-01"),
+    ("มี.ค. 69", "2026-03-01"),    # เดือนไทย: ปี 2 หลัก >= 60 เป็น พ.ศ.
+    ("ก.พ.-26", "2026-02-01"),     # ปี 2 หลัก < 60 เป็น ค.ศ.
+    ("มีนาคม 2569", "2026-03-01"),
+    ("มีนาคม 2026", "2026-03-01"),
+])
+def test_formats_and_years(value, expected):
+    assert _one(value) == pd.Timestamp(expected)
+
+
+def test_zcanr030_bill_month_keeps_year():
+    # บิลเดือน M/YYYY ไม่แปลง พ.ศ. ค่าที่เขียนลง DB เหมือนก่อนใช้ parse_dates
+    s = parse_dates(pd.Series(["3/2569", "03/2026"]))
+    out = format_dates(pd.DataFrame({"bill_month": s}), zcanr030.db_date_formats)
+    assert list(out["bill_month"]) == ["2569-03-01", "2026-03-01"]
+
+
+@pytest.mark.parametrize("value", ["31.02.2026", "01.01.0000", "", None, "abc"])
+def test_invalid_is_nat(value):
+    assert pd.isna(_one(value))
+
+
+def test_result_dtype_and_index():
+    s = pd.Series(["15.03.2569", None], index=[10, 20])
+    out = parse_dates(s)
+    assert out.dtype == "datetime64[us]"
+    assert list(out.index) == [10, 20]
+
+
+def test_timezone_dropped():
+    s = pd.Series(pd.to_datetime(["2026-03-15 10:00"]).tz_localize("Asia/Bangkok"))
+    assert parse_dates(s)[0] == pd.Timestamp("2026-03-15 10:00")
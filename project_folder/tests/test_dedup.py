@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from core.dedup import KeyIndex, duplicate_note
+
+KEY = ['doc', 'item']
+
+
+def _frame(docs, items, dtype):
+    df = pd.DataFrame({'doc': docs, 'item': items, 'amount': range(len(docs))})
+    if dtype == 'category':
+        # category ของแต่ละไฟล์ต่างกัน (เช่นไฟล์จาก cache กับไฟล์ที่เพิ่ง clean)
+        return df.assign(doc=df['doc'].astype('category'), item=df['item'].astype('category'))
+    return df.astype({'doc': dtype, 'item': dtype})
+
+
+@pytest.mark.parametrize("first, second", [
+    ('category', 'category'), ('category', 'str'), ('str', 'category'), ('object', 'str'),
+])
+def test_drops_keys_seen_in_earlier_files(first, second):
+    index = KeyIndex(KEY)
+    df1, n1 = index.take(_frame(['A', 'B'], ['1', '1'], first), 'a.csv')
+    df2, n2 = index.take(_frame(['C', 'B', 'B'], ['1', '1', '2'], second), 'b.csv')
+    assert (len(df1), n1) == (2, 0)
+    assert n2 == 1
+    assert list(df2['doc'].astype(str)) == ['C', 'B']
+    assert index.dropped == 1
+    assert index.counts == [('a.csv', 2, 0), ('b.csv', 2, 1)]
+
+
+def test_keeps_duplicates_within_one_file():
+    index = KeyIndex(KEY)
+    df, n = index.take(_frame(['A', 'A'], ['1', '1'], 'str'), 'a.csv')
+    assert (len(df), n) == (2, 0)
+
+
+def test_empty_and_note():
+    index = KeyIndex(KEY)
+    assert index.take(_frame([], [], 'str'))[1] == 0
+    assert duplicate_note('a.csv', 0) is None
+    assert duplicate_note('a.csv', 3)[0] == 'warning'
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from core.delta import KEY_HASH, ROW_HASH, hash_columns, plan_delta, row_hashes
+
+KEY = ['doc', 'item']
+AMOUNTS = ['amount']
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=['doc', 'item', 'amount', 'note'])
+
+
+def _remote(df):
+    # ผลของ fetch_remote_hashes: รวม row hash ต่อ key เหมือน GROUP BY ฝั่ง MySQL
+    keys, rows = row_hashes(df, KEY, AMOUNTS)
+    remote = pd.Series(rows, index=pd.Index(keys, dtype=object, name='k')).groupby(level=0).agg(['size', 'sum'])
+    remote.columns = ['n', 'h']
+    return remote
+
+
+OLD = _frame([('D1', '1', 10.0, 'a'), ('D1', '1', 5.0, 'b'), ('D2', '1', 7.0, 'c'), ('D3', '1', 1.0, 'd')])
+
+
+def test_unchanged_file_writes_nothing():
+    # ลำดับแถวต่างกันไม่ถือว่าเปลี่ยน (รวม hash ต่อ key)
+    plan = plan_delta(OLD.iloc[::-1], _remote(OLD), KEY, AMOUNTS)
+    assert plan.insert.empty
+    assert plan.unchanged == len(OLD)
+    assert plan.new_keys == plan.replace_keys == plan.vanished_keys == []
+
+
+def test_new_changed_and_vanished_keys():
+    new = _frame([('D1', '1', 10.0, 'a'), ('D1', '1', 5.0, 'x'), ('D2', '1', 7.0, 'c'), ('D4', '1', 2.0, 'e')])
+    plan = plan_delta(new, _remote(OLD), KEY, AMOUNTS)
+    keys, _ = row_hashes(new, KEY, AMOUNTS)
+    old_keys, _ = row_hashes(OLD, KEY, AMOUNTS)
+    # key ที่เปลี่ยนเขียนใหม่ทุกแถวของ key นั้น
+    assert list(plan.insert['doc']) == ['D1', 'D1', 'D4']
+    assert plan.new_keys == [keys[3]]
+    assert plan.replace_keys == [keys[0]]
+    assert plan.vanished_keys == [old_keys[3]]
+    assert plan.unchanged == 1
+
+
+def test_amount_and_dtype_formatting_is_stable():
+    # จำนวนเงินปัดทศนิยม 2 ตำแหน่ง, -0.0 เท่ากับ 0.0, category ได้ hash เดียวกับข้อความ
+    a = _frame([('D1', '1', 0.004, 'a'), ('D2', '1', -0.0, None)])
+    b = a.assign(amount=[0.0, 0.0], doc=a['doc'].astype('category'), note=a['note'].astype('string'))
+    ka, ra = row_hashes(a, KEY, AMOUNTS)
+    kb, rb = row_hashes(b, KEY, AMOUNTS)
+    assert list(ka) == list(kb)
+    assert list(ra) == list(rb)
+
+
+def test_hash_columns_reference_only_given_columns():
+    cols = ['doc', 'item', 'amount', 'note']
+    defs = hash_columns(cols, KEY, AMOUNTS)
+    assert set(defs) == {KEY_HASH, ROW_HASH}
+    assert defs[KEY_HASH].startswith("CHAR(32) AS (MD5(") and "`note`" not in defs[KEY_HASH]
+    assert all(f"`{c}`" in defs[ROW_HASH] for c in cols)
+    assert "ROUND(`amount`, 2)" in defs[ROW_HASH]
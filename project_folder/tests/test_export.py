@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from core import export
+from core.export import EXPORT_FORMATS, cached_export, export_version, trim_exports, write_export
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"doc": ["A1", "ก2", "B3"], "amount": [1.5, 2.0, -3.25]})
+
+
+def test_version_depends_on_keys_and_filters():
+    v = export_version("ZCANR030", ["k1", "k2"], "E")
+    assert v == export_version("ZCANR030", ["k1", "k2"], "E")
+    assert v != export_version("ZCANR030", ["k1", "k2"], "F")
+    assert v != export_version("ZCANR030", ["k2", "k1"], "E")
+
+
+@pytest.mark.parametrize("label", ["CSV", "CSV (gzip)"] + (["Parquet"] if export.pq is not None else []))
+def test_write_export_roundtrip(tmp_path, df, label):
+    fmt = EXPORT_FORMATS[label]
+    path = str(tmp_path / f"out{fmt.ext}")
+    assert write_export(df, path, fmt, chunk_rows=2) == 3
+    back = pd.read_parquet(path) if fmt.kind == 'parquet' else pd.read_csv(path, encoding='utf-8-sig')
+    pd.testing.assert_frame_equal(back, df, check_dtype=False)
+    assert os.listdir(tmp_path) == [f"out{fmt.ext}"]
+
+
+def test_cached_export_builds_once(tmp_path, df, monkeypatch):
+    calls = []
+    real = export.write_export
+    monkeypatch.setattr(export, "write_export", lambda *a, **k: calls.append(1) or real(*a, **k))
+    fmt = EXPORT_FORMATS["CSV"]
+    first = cached_export(df, "v1", fmt, export_dir=str(tmp_path))
+    second = cached_export(df, "v1", fmt, export_dir=str(tmp_path))
+    assert first == second and len(calls) == 1
+    cached_export(df, "v2", fmt, export_dir=str(tmp_path))
+    assert len(calls) == 2
+
+
+def test_concurrent_exports_use_separate_tmp_files(tmp_path, df):
+    fmt = EXPORT_FORMATS["CSV"]
+    path = str(tmp_path / "same.csv")
+    big = pd.concat([df] * 20000, ignore_index=True)
+    errors = []
+
+    def run():
+        try:
+            write_export(big, path, fmt, chunk_rows=1000)
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert os.listdir(tmp_path) == ["same.csv"]
+    assert len(pd.read_csv(path, encoding='utf-8-sig')) == len(big)
+
+
+def test_failed_export_leaves_no_tmp(tmp_path, df):
+    def broken(chunk):
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        write_export(df, str(tmp_path / "x.csv"), EXPORT_FORMATS["CSV"], to_text=broken)
+    assert os.listdir(tmp_path) == []
+
+
+def test_trim_exports_drops_oldest_but_keeps_current(tmp_path):
+    for i, name in enumerate(["old.csv", "mid.csv", "new.csv"]):
+        p = tmp_path / name
+        p.write_bytes(b"x" * 100)
+        os.utime(p, (1000 + i, 1000 + i))
+    trim_exports(str(tmp_path), max_bytes=250, keep=str(tmp_path / "old.csv"))
+    assert sorted(os.listdir(tmp_path)) == ["new.csv", "old.csv"]
+
+
+def test_default_dir_is_per_user():
+    assert export.DEFAULT_EXPORT_DIR.startswith(os.environ["DEPT_DATA_DIR"])
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from core.fastcsv import iter_arrow, read_arrow
+from core.header import HeaderLayout
+from core.sniff import FileFormat
+from core.source import MemoryFile
+
+FMT = FileFormat('text', 'utf-8', '\t')
+LAYOUT = HeaderLayout(0, ['a', 'b', 'c'])
+TEXT = "a\tb\tc\n1\t2\t3\n4\t5\n6\t7\t8\t9\n10\t11\t12\nNULL\t13\n"
+
+
+def _source():
+    return MemoryFile('t.tsv', TEXT.encode('utf-8'))
+
+
+def test_long_rows_counted_short_rows_padded():
+    df = read_arrow(_source(), FMT, LAYOUT)
+    assert df.attrs['bad_lines'] == 1
+    # บรรทัดที่คอลัมน์ขาดต่อท้ายผลลัพธ์ ค่าที่ขาด/NULL เป็นค่าว่าง
+    rows = set(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    assert rows == {('1', '2', '3'), ('10', '11', '12'), ('4', '5', None), (None, '13', None)}
+
+
+def test_streaming_counts_match():
+    chunks = list(iter_arrow(_source(), FMT, LAYOUT, chunksize=1))
+    assert sum(c.attrs['bad_lines'] for c in chunks) == 1
+    assert sum(len(c) for c in chunks) == 4
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from core.header import HeaderSpec, dedupe_columns, locate_in_frame, locate_in_lines, read_head_lines
+from core.source import MemoryFile
+
+SPEC = HeaderSpec(['บัญชีแสดงสัญญา', 'บิลเดือน', 'เงินที่ค้างชำระ'], 2)
+
+LINES = [
+    "รายงานหนี้ค้างชำระ\n",
+    "วันที่พิมพ์\t15.03.2026\n",
+    "\n",
+    "บัญชีแสดงสัญญา\tบิลเดือน\xa0\t\tเงินที่ค้างชำระ\tบิลเดือน\n",
+    "001\t03/2026\t\t100.00\t03/2026\n",
+]
+
+
+def test_dedupe_columns_matches_pandas_naming():
+    assert dedupe_columns([' a\xa0', '', 'a', None, 'a']) == ['a', 'Unnamed: 1', 'a.1', 'Unnamed: 3', 'a.2']
+
+
+def test_locate_in_lines_skips_metadata_rows():
+    layout = locate_in_lines(LINES, SPEC, '\t')
+    assert layout.row == 3
+    assert layout.columns == ['บัญชีแสดงสัญญา', 'บิลเดือน', 'Unnamed: 2', 'เงินที่ค้างชำระ', 'บิลเดือน.1']
+
+
+def test_locate_needs_min_matches():
+    # แถว metadata ที่มีคำเดียวตรง (บิลเดือน) ไม่ถือเป็นหัวตาราง
+    assert locate_in_lines(["บิลเดือน: 03/2026\n", "001\t100\n"], SPEC, '\t') is None
+    assert locate_in_lines([], SPEC, '\t') is None
+
+
+def test_locate_in_frame_matches_locate_in_lines():
+    df = pd.DataFrame([line.rstrip('\n').split('\t') for line in LINES]).replace('', None)
+    layout = locate_in_frame(df, SPEC)
+    assert layout == locate_in_lines(LINES, SPEC, '\t')
+
+
+def test_read_head_lines_stops_at_n():
+    data = "".join(f"{i}\tx\r\n" for i in range(500)).encode('utf-16')
+    lines = read_head_lines(MemoryFile("a.xls", data), 'utf-16', n=10)
+    assert len(lines) == 10 and lines[9] == "9\tx\r\n"
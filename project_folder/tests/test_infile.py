@@ -0,0 +1,81 @@
+from contextlib import nullcontext
+
+import pandas as pd
+
+from core import loaders
+from core.loaders import bulk_load_infile, infile_frame
+
+_UNESCAPE = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r'}
+
+
+def _mysql_fields(line):
+    # อ่านแถวแบบ LOAD DATA (ESCAPED BY '\\', ไม่มี enclosure): \N เป็น NULL, \x ตาม _UNESCAPE
+    fields = []
+    for raw in line.split('\t'):
+        if raw == '\\N':
+            fields.append(None)
+            continue
+        out, i = [], 0
+        while i < len(raw):
+            if raw[i] == '\\':
+                out.append(_UNESCAPE.get(raw[i + 1], raw[i + 1]))
+                i += 2
+            else:
+                out.append(raw[i])
+                i += 1
+        fields.append(''.join(out))
+    return fields
+
+
+class _FakeConn:
+    def __init__(self, loaded):
+        self.loaded = loaded
+
+    def execute(self, stmt, params):
+        with open(params["path"], encoding='utf-8', newline='') as f:
+            lines = f.read().split('\n')[:-1]
+        self.loaded.append([_mysql_fields(line) for line in lines])
+        return type("Result", (), {"rowcount": len(lines)})()
+
+    def commit(self):
+        pass
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.batches = []
+
+    def connect(self):
+        return nullcontext(_FakeConn(self.batches))
+
+
+def test_infile_frame_escapes_only_text_with_specials():
+    df = pd.DataFrame({"a": ["x\ty", "plain"], "b": ["ok", "ok"], "n": [1, 2]})
+    out = infile_frame(df)
+    assert list(out["a"]) == ["x\\ty", "plain"]
+    assert list(out["b"]) == ["ok", "ok"] and out["n"].dtype == df["n"].dtype
+    clean = df[["b", "n"]]
+    assert infile_frame(clean) is clean  # ไม่มีอักขระพิเศษ ไม่คัดลอก
+
+
+def test_bulk_load_infile_round_trips_special_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(loaders, 'bulk_session', lambda conn, settings=None: nullcontext(conn))
+    values = ['tab\there', 'line\nbreak', 'cr\r', 'back\\slash', 'quote "x"', 'NULL', '\\N', 'ไทย', None]
+    df = pd.DataFrame({"text": values, "amount": [1.5] * len(values)})
+    engine = _FakeEngine()
+    marks = []
+    assert bulk_load_infile(df, "t", engine, batch_rows=4, tmp_dir=str(tmp_path),
+                            checkpoint=lambda conn, done: marks.append(done)) == len(values)
+    rows = [r for batch in engine.batches for r in batch]
+    assert [r[0] for r in rows] == values
+    assert [float(r[1]) for r in rows] == [1.5] * len(values)
+    assert marks == [4, 8, 9]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bulk_load_infile_resumes_from_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(loaders, 'bulk_session', lambda conn, settings=None: nullcontext(conn))
+    engine = _FakeEngine()
+    df = pd.DataFrame({"id": range(10)})
+    assert bulk_load_infile(df, "t", engine, batch_rows=4, tmp_dir=str(tmp_path), start=6) == 4
+    assert [int(r[0]) for batch in engine.batches for r in batch] == [6, 7, 8, 9]
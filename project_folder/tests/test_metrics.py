@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from core.metrics import StageLog, rss_mb
+
+pytestmark = pytest.mark.skipif(rss_mb() is None, reason="วัด RSS ไม่ได้บนเครื่องนี้")
+
+
+def test_peak_catches_transient_allocation():
+    log = StageLog()
+    with log.stage("clean", "a.txt"):
+        buf = b"x" * (200 * 1024**2)  # ~200 MB แล้วคืนก่อนจบขั้นตอน
+        time.sleep(0.2)
+        del buf
+    rec = log.records[0]
+    assert rec["peak_mb"] - rec["rss_mb"] > 100
+    assert rec["rss_delta_mb"] < 100
+
+
+def test_peak_is_max_across_chunks_and_workers():
+    log = StageLog()
+    log.add("clean", 1.0, 10, "a.txt", rss_mb=100, rss_delta_mb=5, peak_mb=300)
+    log.add("clean", 1.0, 10, "a.txt", rss_mb=120, rss_delta_mb=5, peak_mb=250)
+    log.extend([{"stage": "clean", "seconds": 1.0, "rows": 10, "file": "a.txt",
+                 "rss_mb": 90, "rss_delta_mb": 0, "pid": 1}])  # record เก่าที่ยังไม่มี peak_mb
+    rec = log.records[0]
+    assert (rec["peak_mb"], rec["rss_mb"], rec["rss_delta_mb"], rec["rows"]) == (300, 120, 10, 30)
+
+
+def test_stage_records_on_error():
+    log = StageLog()
+    with pytest.raises(ValueError):
+        with log.stage("read", "a.txt"):
+            raise ValueError("bad file")
+    assert log.records[0]["peak_mb"] is not None
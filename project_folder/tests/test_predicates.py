@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from core import zcakr005, zcanr030, zwmr019
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE t (pea_group TEXT, period TEXT, activity_type_upload TEXT)"))
+        conn.execute(text("INSERT INTO t VALUES (:g, :p, :a)"), [
+            {"g": "E", "p": "2026-03-01", "a": "ถอดมิเตอร์"},
+            {"g": "E", "p": "2026-04-01", "a": "งดจ่ายไฟ"},
+            {"g": "F", "p": "2026-03-01", "a": "งดจ่ายไฟ"},
+            {"g": None, "p": None, "a": None},
+        ])
+        yield conn
+
+
+def _count(conn, where, params):
+    return conn.execute(text("SELECT COUNT(*) FROM t" + (f" WHERE {where}" if where else "")), params).scalar()
+
+
+def test_zcanr030_group_scope(conn):
+    assert _count(conn, *zcanr030.replace_predicate('E')) == 2
+    assert _count(conn, *zcanr030.group_predicate('F')) == 1
+
+
+def test_zcanr030_e_only_replaces_whole_table_but_delta_stays_in_group(conn):
+    # Overwrite แบบเขต E อย่างเดียวแทนที่ทั้งตาราง (TRUNCATE) ส่วน Delta ใช้ group_predicate เสมอ
+    assert zcanr030.replace_predicate('E', whole_table=True) == (None, {})
+    assert _count(conn, *zcanr030.group_predicate('E')) == 2
+
+
+def test_zcakr005_month_scope(conn):
+    assert _count(conn, *zcakr005.replace_predicate(2026, 3)) == 2
+
+
+def test_zwmr019_activity_and_month_scope(conn):
+    assert _count(conn, *zwmr019.replace_predicate('งดจ่ายไฟ', 2026, 3)) == 1
+    assert _count(conn, *zwmr019.replace_predicate('งดจ่ายไฟ', 2026, 4)) == 1
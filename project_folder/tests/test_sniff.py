@@ -0,0 +1,34 @@
+import pytest
+
+from core.sniff import OLE2_MAGIC, ZIP_MAGIC, FileFormat, sniff_bytes, sniff_file
+from core.source import MemoryFile
+
+TSV = "เลขที่บัญชี\tจำนวนเงิน\n001\t1,000.00\n002\t20.50\n"
+
+
+@pytest.mark.parametrize("head, expected", [
+    (OLE2_MAGIC + b"\x00" * 100, FileFormat('xls', None, None)),
+    (ZIP_MAGIC + b"\x00" * 100, FileFormat('xlsx', None, None)),
+    (b"\xff\xfe" + TSV.encode('utf-16-le'), FileFormat('utf16_tsv', 'utf-16', '\t')),
+    (TSV.encode('utf-16-le'), FileFormat('utf16_tsv', 'utf-16-le', '\t')),  # ไม่มี BOM
+    (TSV.encode('utf-16-be'), FileFormat('utf16_tsv', 'utf-16-be', '\t')),
+    (b"\xef\xbb\xbf<html><table><tr><td>a</td></tr></table>", FileFormat('html', 'utf-8', None)),
+    (b"  <TABLE border=1>", FileFormat('html', 'utf-8', None)),
+    (b"a,b,c\n1,2,3\n4,5,6\n", FileFormat('csv', 'utf-8-sig', ',')),
+    ("ก;ข;ค\n1;2;3\n4;5;6\n".encode('tis-620'), FileFormat('csv', 'tis-620', ';')),
+])
+def test_sniff_bytes(head, expected):
+    assert sniff_bytes(head) == expected
+
+
+def test_utf8_cut_mid_character_is_still_utf8():
+    head = ("a,b\n" + "ก" * 10).encode('utf-8')[:-1]
+    assert sniff_bytes(head).encoding == 'utf-8-sig'
+
+
+def test_sniff_file_reads_path_and_memory(tmp_path):
+    data = TSV.encode('utf-16')
+    path = tmp_path / "export.xls"  # นามสกุลไม่ตรงเนื้อไฟล์ ตามที่ SAP ส่งออก
+    path.write_bytes(data)
+    assert sniff_file(str(path)).kind == 'utf16_tsv'
+    assert sniff_file(MemoryFile("export.xls", data)).kind == 'utf16_tsv'
@@ -0,0 +1,118 @@
+import re
+
+import pandas as pd
+import pytest
+
+from core import summary, zcanr030
+from core.migrations import create_sql
+from core.summary import SUMMARY_SPEC, SUMMARY_TABLE
+from core.upload import APPEND, DELTA, OVERWRITE
+
+
+def test_summary_ddl_uses_only_its_own_columns():
+    ddl = create_sql(SUMMARY_TABLE, SUMMARY_SPEC)
+    own = set(SUMMARY_SPEC.columns) | set(SUMMARY_SPEC.generated)
+    # คอลัมน์ของตารางหลักที่ summary ไม่มี ต้องไม่ถูกอ้างใน generated column / index
+    foreign = [c for c in zcanr030.ordered_cols if c not in own and re.search(rf"\b{c}\b", ddl)]
+    assert foreign == []
+    assert set(SUMMARY_SPEC.generated) == {'pea_group'}
+    assert {c for cols in SUMMARY_SPEC.indexes.values() for c in cols} <= own
+
+
+def test_detail_table_keeps_hash_columns():
+    assert {'pea_group', 'key_hash', 'row_hash'} <= set(zcanr030.generated_columns)
+
+
+class _Conn:
+    """บันทึก SQL ที่ส่งไป (summary ใช้ไวยากรณ์ MySQL ที่ sqlite ไม่มี)"""
+
+    def __init__(self, procedures=()):
+        self.procedures = set(procedures)
+        self.calls = []
+
+    def execute(self, stmt, params=None):
+        sql = " ".join(str(stmt).split())
+        self.calls.append((sql, params))
+        found = int("ROUTINES" in sql and params["name"] in self.procedures)
+        return type("Result", (), {"rowcount": 7, "scalar": lambda self: found})()
+
+    def sql(self, start):
+        return [(s, p) for s, p in self.calls if s.startswith(start)]
+
+
+@pytest.fixture
+def existing(monkeypatch):
+    monkeypatch.setattr(summary, 'has_table', lambda conn, t: True)
+    monkeypatch.setattr(summary, 'migrate_table', lambda conn, t, spec: [])
+
+
+def _summary():
+    return pd.DataFrame({
+        'pea_code_main': ['E01', 'E02'], 'bill_month': pd.to_datetime(['2026-02-01', '2026-03-01']),
+        'bus_type': ['A', None], 'row_count': [2, 1], 'outstanding_amount': [10.5, 3.0], 'tax_amount': [0.7, 0.2],
+    })
+
+
+def test_append_adds_to_existing_totals(existing):
+    conn = _Conn()
+    assert summary.upsert_summary(conn, _summary(), APPEND, "dept_master") == (2, '2026-02-01', '2026-03-01')
+    [(sql, rows)] = conn.calls
+    assert "row_count = row_count + VALUES(row_count)" in sql
+    assert rows[1] == {'pea_code_main': 'E02', 'bill_month': '2026-03-01', 'bus_type': '', 'row_count': 1,
+                       'outstanding_amount': 3.0, 'tax_amount': 0.2}
+
+
+def test_overwrite_replaces_the_group(existing):
+    conn = _Conn()
+    assert summary.upsert_summary(conn, _summary(), OVERWRITE, "dept_master", "pea_group = :grp", {"grp": "E"}) == (2, None, None)
+    (delete, params), (insert, rows) = conn.calls
+    assert delete == f"DELETE FROM {SUMMARY_TABLE} WHERE (pea_group = :grp)" and params == {"grp": "E"}
+    assert "row_count = VALUES(row_count)" in insert and len(rows) == 2
+
+
+def test_delta_reaggregates_only_the_touched_months(existing):
+    conn = _Conn()
+    assert summary.upsert_summary(conn, _summary(), DELTA, "dept_master", "pea_group = :grp", {"grp": "E"}) == (7, '2026-02-01', '2026-03-01')
+    [(delete, params)] = conn.sql("DELETE")
+    assert delete.endswith("WHERE (pea_group = :grp) AND bill_month BETWEEN :month_from AND :month_to")
+    assert params == {"grp": "E", "month_from": '2026-02-01', "month_to": '2026-03-01'}
+    [(insert, _)] = conn.sql("INSERT")
+    assert "FROM dept_master WHERE (pea_group = :grp) AND bill_month BETWEEN" in insert
+
+
+def test_delta_with_vanished_keys_covers_every_month(existing):
+    conn = _Conn()
+    assert summary.upsert_summary(conn, _summary(), DELTA, "dept_master", "pea_group = :grp", {"grp": "E"},
+                                  delete_vanished=True)[1:] == (None, None)
+    assert "BETWEEN" not in conn.sql("DELETE")[0][0]
+
+
+def test_first_run_aggregates_the_whole_table(monkeypatch):
+    monkeypatch.setattr(summary, 'has_table', lambda conn, t: False)
+    monkeypatch.setattr(summary, 'migrate_table', lambda conn, t, spec: [])
+    conn = _Conn()
+    assert summary.upsert_summary(conn, _summary(), APPEND, "dept_master", "pea_group = :grp", {"grp": "E"}) == (7, None, None)
+    [(insert, _)] = conn.calls
+    assert "FROM dept_master WHERE 1=1 AND bill_month IS NOT NULL" in insert
+
+
+def test_refresh_uses_scoped_procedure_when_present():
+    conn = _Conn(procedures=[summary.SCOPED_PROCEDURE])
+    summary.refresh_dashboard(conn, "E", '2026-02-01', '2026-03-01')
+    [(call, params)] = conn.sql("CALL")
+    assert call.startswith(f"CALL {summary.SCOPED_PROCEDURE}(")
+    assert params == {"grp": "E", "month_from": '2026-02-01', "month_to": '2026-03-01'}
+
+
+@pytest.mark.parametrize("procedures, group", [((), "E"), ([summary.SCOPED_PROCEDURE], None)])
+def test_refresh_falls_back_to_full_table(procedures, group):
+    conn = _Conn(procedures)
+    summary.refresh_dashboard(conn, group)
+    assert [s for s, _ in conn.sql("CALL")] == [" ".join(s.split()) for s in zcanr030.refresh_procedures]
+
+
+def test_dashboard_step_refreshes_everything_after_full_replace(existing):
+    conn = _Conn(procedures=[summary.SCOPED_PROCEDURE])
+    step = summary.dashboard_step(_summary(), "E", OVERWRITE, "dept_master", where=None)
+    assert "ทั้งตาราง" in step(conn)
+    assert conn.sql("DELETE")[0][0] == f"DELETE FROM {SUMMARY_TABLE}"
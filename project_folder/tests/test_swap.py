@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from core import loaders
+from core.loaders import staging_table, swap_in
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    # sqlite ไม่มี information_schema: ระบุคอลัมน์ที่เขียนได้เอง
+    monkeypatch.setattr(loaders, 'writable_columns', lambda conn, table_name: ['id', 'grp'])
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    with engine.begin() as conn:
+        for table in ('live', staging_table('live')):
+            conn.execute(text(f"CREATE TABLE `{table}` (id INTEGER, grp TEXT)"))
+        conn.execute(text("INSERT INTO live VALUES (1, 'E'), (2, 'E'), (3, 'F')"))
+        conn.execute(text(f"INSERT INTO `{staging_table('live')}` VALUES (10, 'E')"))
+    return engine
+
+
+def _rows(engine, table='live'):
+    with engine.connect() as conn:
+        return sorted(conn.execute(text(f"SELECT id, grp FROM `{table}`")).fetchall())
+
+
+def _has_staging(engine):
+    with engine.connect() as conn:
+        return bool(conn.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE name = :t"),
+                                 {"t": staging_table('live')}).scalar())
+
+
+def test_scoped_swap_replaces_only_the_scope(engine):
+    assert swap_in(engine, 'live', "grp = :grp", {"grp": "E"}) == 2
+    # แถวนอกขอบเขตไม่ถูกคัดลอก/แตะ
+    assert _rows(engine) == [(3, 'F'), (10, 'E')]
+    assert not _has_staging(engine)
+
+
+def test_scoped_swap_is_atomic(engine, monkeypatch):
+    monkeypatch.setattr(loaders, 'writable_columns', lambda conn, table_name: ['id', 'missing'])
+    with pytest.raises(OperationalError):
+        swap_in(engine, 'live', "grp = :grp", {"grp": "E"})
+    # INSERT ล้มเหลว: DELETE rollback ไปด้วย และ staging ยังอยู่ให้ทำต่อ
+    assert _rows(engine) == [(1, 'E'), (2, 'E'), (3, 'F')]
+    assert _has_staging(engine)
+
+
+def test_swap_repeats_safely(engine):
+    # commit แล้วแต่ยังไม่ได้ทิ้ง staging (เช่นทำต่อจาก checkpoint): ทำซ้ำได้ผลเดิม
+    swap_in(engine, 'live', "grp = :grp", {"grp": "E"})
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE `{staging_table('live')}` (id INTEGER, grp TEXT)"))
+        conn.execute(text(f"INSERT INTO `{staging_table('live')}` VALUES (10, 'E')"))
+    swap_in(engine, 'live', "grp = :grp", {"grp": "E"})
+    assert _rows(engine) == [(3, 'F'), (10, 'E')]
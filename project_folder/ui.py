@@ -0,0 +1,147 @@
+import os
+from datetime import datetime
+
+import streamlit as st
+import pandas as pd
+
+from core.checkpoint import abandon_load, claim_load, pending_loads
+from core.db import get_engine, pool_stats
+from core.export import EXPORT_FORMATS, available_formats, cached_export, export_path
+from core.jobs import FINISHED, RUNNING, STATUS_LABELS
+from core.metrics import timed
+from core.upload import resume_upload
+
+# Helper ฝั่งหน้าเว็บที่ใช้ร่วมกันทุกหน้า (core/ ห้าม import streamlit)
+
+
+def show_messages(messages):
+    # แสดงข้อความสถานะที่ worker ส่งกลับมา ตามลำดับเดิม
+    for level, payload in messages:
+        if level == 'expander':
+            title, content = payload
+            with st.expander(title):
+                st.write(content)
+        else:
+            getattr(st, level)(payload)
+
+
+def preview_frame(df, n=10):
+    # ตัวอย่างข้อมูลโดยแสดงค่าว่างเป็น "Null" (category / datetime fillna ด้วยข้อความตรง ๆ ไม่ได้)
+    head = df.head(n).astype(object)
+    return head.where(head.notna(), "Null")
+
+
+def show_metrics(log, title="⏱️ เวลาและหน่วยความจำแต่ละขั้นตอน", persist=True):
+    # แผงพับได้แสดง metrics ของรอบนี้ และต่อท้ายลงไฟล์ JSON lines (core/metrics.py METRICS_FILE)
+    if not log.records:
+        return
+    with st.expander(title):
+        st.dataframe(pd.DataFrame(log.records), use_container_width=True)
+    if persist:
+        try:
+            log.write_jsonl()
+        except OSError as e:
+            st.caption(f"⚠️ บันทึกไฟล์ metrics ไม่สำเร็จ: {e}")
+
+
+def dedup_panel(index, title="🔁 แถวซ้ำข้ามไฟล์ (ตัดก่อนนำเข้า)"):
+    # จำนวนแถวที่รับ/ตัดต่อไฟล์ตามลำดับที่รวม (core/dedup.KeyIndex.counts) แสดงเมื่อมีแถวซ้ำเท่านั้น
+    if not index.dropped:
+        return
+    st.warning(f"🔁 พบแถวซ้ำข้ามไฟล์ {index.dropped:,} แถว (key: {', '.join(index.key_cols)}) เก็บเฉพาะแถวจากไฟล์แรกที่พบ")
+    with st.expander(title):
+        st.dataframe(pd.DataFrame(index.counts, columns=["ไฟล์", "แถวที่รับ", "แถวที่ซ้ำ"]), use_container_width=True, hide_index=True)
+
+
+def pool_panel(title="🔌 Connection pool ของ Database"):
+    # pool ใช้ร่วมกันทั้ง process: connects น้อยกว่า checkouts มาก = ใช้ connection ซ้ำได้จริง
+    rows = pool_stats()
+    if not rows:
+        return
+    with st.expander(title):
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+
+def download_panel(df, version, file_stem, to_text=None, metrics=None, label="📥 ดาวน์โหลดข้อมูล Cleaned"):
+    # สร้างไฟล์เฉพาะเมื่อกดเตรียมไฟล์ และเก็บบนดิสก์ตาม version ของข้อมูล (rerun ไม่ต้องแปลงใหม่)
+    fmt_label = st.selectbox("รูปแบบไฟล์ดาวน์โหลด", available_formats(), key=f"export_format_{file_stem}")
+    fmt = EXPORT_FORMATS[fmt_label]
+    path = export_path(version, fmt)
+    if not os.path.exists(path):
+        if not st.button(f"🛠️ เตรียมไฟล์ {fmt_label} ({len(df):,} แถว)", key=f"export_build_{file_stem}", use_container_width=True):
+            return
+        bar = st.progress(0, text="กำลังเขียนไฟล์...")
+        with timed(metrics, 'export', rows=len(df)):
+            cached_export(df, version, fmt, to_text, progress=lambda done, total: bar.progress(min(done / max(total, 1), 1.0), text=f"เขียนแล้ว {done:,} / {total:,} แถว"))
+        bar.empty()
+    st.caption(f"📦 ขนาดไฟล์ {os.path.getsize(path) / 1024**2:,.1f} MB")
+    with open(path, "rb") as f:
+        st.download_button(label=f"{label} ({fmt_label})", data=f, file_name=f"{file_stem}{fmt.ext}", mime=fmt.mime, use_container_width=True)
+
+
+def _render_jobs(runner, report, limit):
+    jobs = runner.jobs(report)[:limit]
+    if not jobs:
+        st.caption("ยังไม่มีงานอัปโหลดในรอบการทำงานนี้")
+        return
+    for job in jobs:
+        with st.container(border=True):
+            head, action = st.columns([5, 1])
+            head.markdown(f"**{STATUS_LABELS[job.status]}** · `{job.id}` · {job.title} · {job.seconds:,.0f} วินาที")
+            if job.status not in FINISHED:
+                if job.cancel_requested:
+                    action.caption("กำลังยกเลิก...")
+                elif action.button("⛔ ยกเลิก", key=f"cancel_{job.id}", use_container_width=True):
+                    runner.cancel(job.id)
+            if job.status == RUNNING:
+                percent = min(job.done / job.total, 1.0) if job.total else 0.0
+                st.progress(percent, text=f"{job.stage} {job.done:,} / {job.total:,} แถว ({percent * 100:.1f}%)" if job.total else job.stage)
+            if job.result and job.result.get("db_count") is not None:
+                st.caption(f"ข้อมูลชุดนี้ {job.result['total_rows']:,} แถว | ยอดรวมใน Database {job.result['db_count']:,} แถว")
+            if job.messages:
+                # expander ซ้อนกันไม่ได้ จึงแสดงรายละเอียด error เป็น code แทน
+                with st.expander("ข้อความ", expanded=job.status == 'failed'):
+                    for level, payload in job.messages:
+                        if level == 'expander':
+                            st.code(payload[1])
+                        else:
+                            getattr(st, level)(payload)
+            if job.result and job.result.get("stages"):
+                with st.expander("⏱️ เวลาแต่ละขั้นตอนของการอัปโหลด"):
+                    st.dataframe(pd.DataFrame(job.result["stages"]), use_container_width=True)
+
+
+def job_panel(runner, report, limit=10, interval=2):
+    # สถานะงานอัปโหลดเบื้องหลัง: ถ้ามีงานค้างอยู่จะ poll ใหม่ทุก interval วินาที (เฉพาะส่วนนี้ ไม่ rerun ทั้งหน้า)
+    st.subheader("📋 งานอัปโหลด (ทำงานเบื้องหลัง)")
+    fragment = getattr(st, "fragment", None)
+    if fragment is None:
+        _render_jobs(runner, report, limit)
+        st.button("🔄 รีเฟรชสถานะ", key=f"jobs_refresh_{report}")
+        return
+    fragment(run_every=interval if runner.active(report) else None)(_render_jobs)(runner, report, limit)
+
+
+def resume_panel(runner, report, url):
+    # งานนำเข้าที่ล้มเหลว/ถูกยกเลิกแต่มี checkpoint: ทำต่อจากชุดล่าสุดที่ commit แล้ว (ไม่ลบข้อมูลเดิมซ้ำ) หรือทิ้ง
+    loads = pending_loads(report)
+    if not loads:
+        return
+    st.subheader("💾 งานนำเข้าที่ค้าง (ทำต่อได้)")
+    for meta in loads:
+        load_id = meta["load_id"]
+        with st.container(border=True):
+            info, resume_col, drop_col = st.columns([4, 1, 1])
+            info.markdown(f"`{load_id}` · {meta['table_name']} · {meta['mode']} · {meta['total_rows']:,} แถว · "
+                          f"{datetime.fromtimestamp(meta['created']):%d/%m/%Y %H:%M}")
+            info.caption(meta["db"])
+            if resume_col.button("▶️ ทำต่อ", key=f"resume_{load_id}", use_container_width=True):
+                if claim_load(load_id):
+                    job = runner.submit(f"ทำต่อ {load_id} → {meta['table_name']} ({meta['total_rows']:,} แถว)",
+                                        resume_upload, load_id, url, report=report)
+                    st.success(f"📨 ส่งงาน `{job.id}` เข้าคิวแล้ว (ทำต่อจาก checkpoint ล่าสุด)")
+                else:
+                    st.info("งานนี้กำลังทำต่ออยู่แล้ว")
+            if drop_col.button("🗑️ ทิ้ง", key=f"abandon_{load_id}", use_container_width=True):
+                abandon_load(load_id, get_engine(url))
+                st.rerun()